@@ -1,9 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable
 import os
 import asyncio
-import httpx
 import json
 import time
 import re
@@ -17,76 +16,55 @@ from docx.text.paragraph import Paragraph
 from docx.oxml.table import CT_Tbl
 from docx.oxml.text.paragraph import CT_P
 from app.core.config import settings
-from app.services.rag_service import retrieve_documents
+from app.services.rag_service import retrieve_many
 from app.core.logger import activity_logger
+from app.core.masking import drafting_masker
+from app.core.metrics import StageTimer, timed_call, timed_stage
+from app.services.llm_gateway import llm_gateway
+from app.services.completion_cache import cache_scope
+from app.services.rate_limiter import count_text_tokens
+from app.services.retry_policy import LLMUnavailableError
 
 # Helper to resolve logo paths
 _HERE = Path(__file__).parent
-_SEMAPHORE = asyncio.Semaphore(5)
 
 def apply_safety_mask(text: str) -> str:
     """Mask sensitive legal terms that might trigger AI content filters."""
     if not isinstance(text, str): return text
-    masks = {
-        r'\bsexual\b': 's-e-x-u-a-l', r'\bharassment\b': 'har*ssment',
-        r'\brape\b': 'r*pe', r'\bassault\b': 'ass*ult', r'\bviolence\b': 'vi*lence',
-        r'\bsex\b': 's*x', r'\bracial\b': 'rac*al', r'\bdiscrimination\b': 'discrim*nation',
-        r'\bcolor\b': 'col*r', r'\brace\b': 'ra*e', r'\bblack\b': 'bl*ck'
-    }
-    processed = text
-    for pattern, replacement in masks.items():
-        processed = re.sub(pattern, replacement, processed, flags=re.IGNORECASE)
-    return processed
+    return drafting_masker.mask(text)
 
 def restore_safety_mask(text: Any) -> Any:
     """Restore masked terms to their original professional legal versions."""
-    if isinstance(text, list):
-        return [restore_safety_mask(i) for i in text]
-    if isinstance(text, dict):
-        return {k: restore_safety_mask(v) for k, v in text.items()}
-    if not isinstance(text, str): return text
-    
-    restores = {
-        's-e-x-u-a-l': 'sexual', 'har*ssment': 'harassment',
-        'r*pe': 'rape', 'ass*ult': 'assault', 'vi*lence': 'violence',
-        's*x': 'sex', 'rac*al': 'racial', 'discrim*nation': 'discrimination',
-        'col*r': 'color', 'ra*e': 'race', 'bl*ck': 'black'
-    }
-    processed = text
-    for masked, original in restores.items():
-        processed = re.sub(re.escape(masked), original, processed, flags=re.IGNORECASE)
-    return processed
-
-async def call_llm_module(url: str, api_key: str, system_prompt: str, user_content: str, response_format: str = "json_object"):
-    """Async wrapper for Azure OpenAI calls with concurrency control and basic retry."""
-    headers = {"api-key": api_key, "Content-Type": "application/json"}
+    return drafting_masker.unmask(text)
+
+async def call_llm_module(url: str, api_key: str, system_prompt: str, user_content: str, response_format: str = "json_object", max_completion_tokens: int = 4096):
+    """
+    Async wrapper for Azure OpenAI calls. Rate limiting, retries and the circuit breaker come from the shared LLM gateway.
+    Returns None when a call fails (the module falls back), but raises LLMUnavailableError when the deployment is
+    unavailable so the draft fails visibly instead of being assembled from boilerplate.
+    """
     payload = {
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_content}
         ],
-        "max_completion_tokens": 4096,
+        "max_completion_tokens": max_completion_tokens,
         "temperature": 0.3
     }
     if response_format == "json_object":
         payload["response_format"] = {"type": "json_object"}
 
-    async with _SEMAPHORE:
-        async with httpx.AsyncClient() as client:
-            for attempt in range(2): # Simple 2-attempt retry
-                try:
-                    response = await client.post(url, headers=headers, json=payload, timeout=300.0)
-                    if response.status_code == 200:
-                        return response.json()["choices"][0]["message"]["content"]
-                    elif response.status_code == 429:
-                        await asyncio.sleep(2 * (attempt + 1))
-                        continue
-                    else:
-                        activity_logger.log_event("Drafting", "AI_ERROR", "LLM", f"Status {response.status_code}: {response.text}")
-                except Exception as e:
-                    activity_logger.log_event("Drafting", "AI_EXCEPTION", "LLM", str(e))
-                    await asyncio.sleep(1)
-            return None
+    try:
+        response = await llm_gateway.chat(url, payload, api_key=api_key, timeout=300.0)
+        if response.status_code == 200:
+            return response.json()["choices"][0]["message"]["content"]
+        activity_logger.log_event("Drafting", "AI_ERROR", "LLM", f"Status {response.status_code}: {response.text}")
+    except LLMUnavailableError as e:
+        activity_logger.log_ai_error(str(e))
+        raise
+    except Exception as e:
+        activity_logger.log_event("Drafting", "AI_EXCEPTION", "LLM", str(e))
+    return None
 
 # Navigate to backend/assets correctly (parent is api_v1, parent2 is api, parent3 is app, parent4 is backend)
 _ASSETS_DIR = _HERE.parent.parent.parent.parent / "assets"
@@ -232,6 +210,13 @@ def repair_json(json_str):
         json_str = json_str[:-3]
     return json_str.strip()
 
+_LABEL_NUMBER = re.compile(r'\d+')
+
+def point_sort_key(point: dict) -> int:
+    """Orders drafting points by the first number in their label; unnumbered labels sort last."""
+    match = _LABEL_NUMBER.search(str(point.get('label', '')))
+    return int(match.group(0)) if match else 999
+
 def chunk_text(text: str, max_chars: int = 6000, overlap: int = 500) -> list:
     """Split large text into overlapping chunks for reliable AI analysis."""
     chunks = []
@@ -258,6 +243,7 @@ def chunk_text(text: str, max_chars: int = 6000, overlap: int = 500) -> list:
             
     return chunks
 
+@timed_stage("drafting", "intro_history")
 async def generate_intro_history(url, key, cp, resp, brief_points, rag_context):
     """Generates Section I (Introduction) and II (Procedural History)."""
     system_prompt = f"[SENIOR DEFENSE COUNSEL] Draft Section I: INTRODUCTION and Section II: PROCEDURAL HISTORY for {resp}.\nSTRICT: Use formal US legal language and weave in-line citations of MCAD/EEOC regulations and relevant case law from the provided PRECEDENT.\nRETURN JSON: {{ \"introduction\": \"...\", \"procedural_history\": \"...\" }}"
@@ -272,6 +258,7 @@ async def generate_intro_history(url, key, cp, resp, brief_points, rag_context):
         activity_logger.log_event("Drafting", "MODULE_RESULT", "Intro/History", "FAIL_PARSE")
     return {}
 
+@timed_stage("drafting", "statement_of_facts")
 async def generate_facts(url, key, cp, resp, all_points, rag_context):
     """Generates Section III (Statement of Facts)."""
     system_prompt = f"[SENIOR DEFENSE COUNSEL] Draft Section III: STATEMENT OF FACTS for {resp}. Narrative paragraph style only. Weave in-line references to applicable laws or standards from the PRECEDENT to establish the factual defense.\nRETURN JSON: {{ \"statement_of_facts\": \"...\" }}"
@@ -300,6 +287,7 @@ async def generate_analysis_section(url, key, cp, resp, points, category, rag_co
         activity_logger.log_event("Drafting", "MODULE_RESULT", f"Analysis_{category}", "FAIL_PARSE")
     return ""
 
+@timed_stage("drafting", "conclusion_appendix")
 async def generate_conclusion_appendix(url, key, cp, resp):
     """Generates Section VII (Conclusion) and VIII (Appendix)."""
     prompt = f"[SENIOR DEFENSE COUNSEL] Draft Section VII: CONCLUSION and Section VIII: APPENDIX (Statutory Framework) for {resp}. Appendix should cite MCAD/EEOC regulations relevant to discrimination and retaliation. Return JSON: {{ \"conclusion\": \"...\", \"appendix\": \"...\" }}"
@@ -314,9 +302,34 @@ class CombinedDraftRequest(BaseModel):
     charging_party: str = Field("Unknown", description="Name of the charging party if known")
     respondent: str = Field("Boston Children's Hospital", description="Name of the respondent")
     case_number: Optional[str] = Field(None, description="MCAD/EEOC Case Number")
+    bypass_cache: bool = Field(False, description="Ignore cached LLM completions and regenerate every module (fresh results are still cached)")
+
+async def run_position_draft(request: CombinedDraftRequest, progress: Optional[Callable[[str, float], Awaitable[None]]] = None) -> dict:
+    """
+    Runs the drafting pipeline inside a completion cache scope, so identical module prompts from
+    earlier runs are answered from the cache, and logs the run's cache hit rate.
+    """
+    with cache_scope(bypass=request.bypass_cache) as cache_stats:
+        try:
+            return await _run_position_draft(request, progress)
+        finally:
+            activity_logger.log_event(
+                "Drafting", "CACHE_STATS", request.charging_party,
+                f"Completion cache: {cache_stats.hits} hit(s), {cache_stats.misses} miss(es), hit rate {cache_stats.hit_ratio:.0%}" + (" (bypassed)" if cache_stats.bypass else "")
+            )
+
+async def _run_position_draft(request: CombinedDraftRequest, progress: Optional[Callable[[str, float], Awaitable[None]]] = None) -> dict:
+    """
+    Runs the full analysis -> retrieval -> parallel drafting -> DOCX pipeline and returns the save result.
+    If `progress` is given it is awaited with (stage, percent_complete) at each step boundary.
+    """
+    stages = StageTimer("drafting")
+
+    async def _progress(stage: str, percent: float):
+        stages.enter(stage)
+        if progress:
+            await progress(stage, percent)
 
-@router.post("/generate_position_draft")
-async def generate_position_draft(request: CombinedDraftRequest):
     activity_logger.log_event("Drafting", "START", request.charging_party, "Executing Roxton-Style Point-by-Point Drafting")
     
     api_key = settings.AZURE_OPENAI_API_KEY
@@ -331,6 +344,7 @@ async def generate_position_draft(request: CombinedDraftRequest):
 
     try:
         # --- STEP 1: ADAPTIVE ANALYSIS (JSON-OR-UNSTRUCTURED) --- 
+        await _progress("analysis", 5)
         all_points = []
         
         # Sanitize raw_data: Remove problematic literal control characters that break JSON
@@ -364,22 +378,24 @@ async def generate_position_draft(request: CombinedDraftRequest):
                 try:
                     # Mask the chunk before sending to AI to bypass content filters
                     masked_chunk = apply_safety_mask(chunk)
-                    async with httpx.AsyncClient() as client:
-                        res1 = await client.post(
-                            final_url,
-                            headers={"api-key": api_key, "Content-Type": "application/json"},
-                            json={
-                                "messages": [{"role": "system", "content": analysis_prompt}, {"role": "user", "content": f"DATA (PART {idx+1}/{len(raw_chunks)}):\n{masked_chunk}"}],
-                                "response_format": { "type": "json_object" },
-                                "max_completion_tokens": 4096
-                            },
-                            timeout=300.0
-                        )
+                    res1 = await llm_gateway.chat(
+                        final_url,
+                        {
+                            "messages": [{"role": "system", "content": analysis_prompt}, {"role": "user", "content": f"DATA (PART {idx+1}/{len(raw_chunks)}):\n{masked_chunk}"}],
+                            "response_format": { "type": "json_object" },
+                            "max_completion_tokens": 4096
+                        },
+                        api_key=api_key,
+                        timeout=300.0
+                    )
                     if res1.status_code == 200:
                         # Restore any masked terms in the output JSON
                         chunk_json = restore_safety_mask(json.loads(repair_json(res1.json()["choices"][0]["message"]["content"])))
                         new_pts = chunk_json.get("points", [])
                         if isinstance(new_pts, list): all_points.extend(new_pts)
+                except LLMUnavailableError:
+                    # An outage is not a bad chunk: fail the draft as a 503 rather than "No allegations found"
+                    raise
                 except Exception as e:
                     activity_logger.log_event("Drafting", "ANALYSIS_WARN", request.charging_party, f"Part {idx+1} failed: {str(e)}")
 
@@ -387,6 +403,7 @@ async def generate_position_draft(request: CombinedDraftRequest):
             raise Exception("No allegations found in input.")
 
         # --- STEP 1d: POINT AUDIT & GAP RECOVERY (SAFETY NET) ---
+        await _progress("gap_recovery", 25)
         try:
             found_labels = []
             for p in all_points:
@@ -404,20 +421,19 @@ async def generate_position_draft(request: CombinedDraftRequest):
                     for gap in gaps[:10]: # Limit surgical recoveries
                         try:
                             masked_raw = apply_safety_mask(request.raw_data)
-                            async with httpx.AsyncClient() as client:
-                                recovery_res = await client.post(
-                                    final_url,
-                                    headers={"api-key": api_key, "Content-Type": "application/json"},
-                                    json={
-                                        "messages": [
-                                            {"role": "system", "content": f"[SURGICAL EXTRACTION] Extract EXACT VERBATIM the Allegation, Suggested Proof, and Response for Point No. {gap}. DO NOT summarize. Keep all names and quotes. Return JSON: {{ 'point': {{ 'label': '...', 'allegation': '...', 'suggested_proof': '...', 'response': '...' }} }}"},
-                                            {"role": "user", "content": f"FULL RAW DATA:\n{masked_raw}"}
-                                        ],
-                                        "response_format": { "type": "json_object" },
-                                        "max_completion_tokens": 1024
-                                    },
-                                    timeout=60.0
-                                )
+                            recovery_res = await llm_gateway.chat(
+                                final_url,
+                                {
+                                    "messages": [
+                                        {"role": "system", "content": f"[SURGICAL EXTRACTION] Extract EXACT VERBATIM the Allegation, Suggested Proof, and Response for Point No. {gap}. DO NOT summarize. Keep all names and quotes. Return JSON: {{ 'point': {{ 'label': '...', 'allegation': '...', 'suggested_proof': '...', 'response': '...' }} }}"},
+                                        {"role": "user", "content": f"FULL RAW DATA:\n{masked_raw}"}
+                                    ],
+                                    "response_format": { "type": "json_object" },
+                                    "max_completion_tokens": 1024
+                                },
+                                api_key=api_key,
+                                timeout=60.0
+                            )
                             if recovery_res.status_code == 200:
                                 rec_json = restore_safety_mask(json.loads(repair_json(recovery_res.json()["choices"][0]["message"]["content"])))
                                 rec_p = rec_json.get("point") or rec_json.get("points", [{}])[0]
@@ -436,7 +452,7 @@ async def generate_position_draft(request: CombinedDraftRequest):
             if lbl not in unique_points or len(str(p.get('allegation',''))) > len(str(unique_points[lbl].get('allegation',''))):
                 unique_points[lbl] = p
 
-        final_points = sorted(unique_points.values(), key=lambda x: int(re.findall(r'\d+', str(x.get('label', '0')))[0]) if re.findall(r'\d+', str(x.get('label', ''))) else 999)
+        final_points = sorted(unique_points.values(), key=point_sort_key)
 
         # --- STEP 1e: CRITICAL IDENTITY CHECK (THE "BETSY" MARKER) ---
         has_betsy_extracted = any("Betsy" in str(p.get("allegation", "")) or "Betsy" in str(p.get("response", "")) for p in final_points)
@@ -446,41 +462,41 @@ async def generate_position_draft(request: CombinedDraftRequest):
             activity_logger.log_event("Drafting", "BETSY_LOST", request.charging_party, "Critical 'Betsy' point missing from extraction. Triggering Surgical Identity Recovery...")
             try:
                 masked_raw = apply_safety_mask(request.raw_data)
-                async with httpx.AsyncClient() as client:
-                    recovery_res = await client.post(
-                        final_url,
-                        headers={"api-key": api_key, "Content-Type": "application/json"},
-                        json={
-                            "messages": [
-                                {"role": "system", "content": "[SURGICAL IDENTITY RECOVERY] Verbatim Extract the specific Index Point, Allegation, and Suggested Proof containing the name 'Betsy'. DO NOT summarize. Return JSON: { 'point': { 'label': '...', 'allegation': '...', 'suggested_proof': '...', 'response': '...' } }"},
-                                {"role": "user", "content": f"FULL RAW DATA:\n{masked_raw}"}
-                            ],
-                            "response_format": { "type": "json_object" },
-                            "max_completion_tokens": 1024
-                        },
-                        timeout=120.0
-                    )
+                recovery_res = await llm_gateway.chat(
+                    final_url,
+                    {
+                        "messages": [
+                            {"role": "system", "content": "[SURGICAL IDENTITY RECOVERY] Verbatim Extract the specific Index Point, Allegation, and Suggested Proof containing the name 'Betsy'. DO NOT summarize. Return JSON: { 'point': { 'label': '...', 'allegation': '...', 'suggested_proof': '...', 'response': '...' } }"},
+                            {"role": "user", "content": f"FULL RAW DATA:\n{masked_raw}"}
+                        ],
+                        "response_format": { "type": "json_object" },
+                        "max_completion_tokens": 1024
+                    },
+                    api_key=api_key,
+                    timeout=120.0
+                )
                 if recovery_res.status_code == 200:
                     rec_json = restore_safety_mask(json.loads(repair_json(recovery_res.json()["choices"][0]["message"]["content"])))
                     rec_p = rec_json.get("point") or rec_json.get("points", [{}])[0]
                     if rec_p.get("allegation"): 
                         final_points.append(rec_p)
                         # Re-sort
-                        final_points = sorted(final_points, key=lambda x: int(re.findall(r'\d+', str(x.get('label', '0')))[0]) if re.findall(r'\d+', str(x.get('label', ''))) else 999)
+                        final_points = sorted(final_points, key=point_sort_key)
                         activity_logger.log_event("Drafting", "BETSY_RECOVERED", request.charging_party, "Successfully recovered Point 22 (Betsy) verbatim.")
             except: pass
 
         # --- STEP 2: RAG RETRIEVAL ---
-        rag_context = ""
-        unique_cats = set(p.get("legal_category") for p in final_points if p.get("legal_category"))
-        for cat in unique_cats:
-            try:
-                docs = await retrieve_documents(cat, k=2)
-                rag_context += "\n\n".join(d.page_content for d in docs)
-            except: break
+        await _progress("rag_retrieval", 35)
+        # Sorted so the prompt (and its completion cache key) is stable across runs
+        unique_cats = sorted(set(str(p.get("legal_category")) for p in final_points if p.get("legal_category")))
+        retrieval = await retrieve_many(unique_cats, k=2)
+        rag_context = "\n\n".join(hit["document"].page_content for hit in retrieval["documents"])
+        for cat, error in retrieval["errors"].items():
+            activity_logger.log_event("Drafting", "WARNING", request.charging_party, f"RAG retrieval failed for '{cat}': {error}")
         if not rag_context: rag_context = "Standard legal principles apply."
 
         # --- STEP 3: ASYNC PARALLEL DRAFTING ---
+        await _progress("drafting", 40)
         activity_logger.log_event("Drafting", "BATCH_START", request.charging_party, f"Parallel Drafting 10-Module Position Statement for {len(final_points)} points...")
         
         # 3a. Prepare Tasks for Global Modules
@@ -494,43 +510,103 @@ async def generate_position_draft(request: CombinedDraftRequest):
         for cat in analysis_categories:
             cat_points = [p for p in final_points if cat in str(p.get("legal_category", "")).lower()]
             if not cat_points: cat_points = final_points[:15] # Fallback to core narrative if not categorized
-            analysis_tasks[cat] = generate_analysis_section(final_url, api_key, request.charging_party, request.respondent, cat_points, cat, rag_context)
+            analysis_tasks[cat] = timed_call("drafting", f"analysis_{cat}", generate_analysis_section(final_url, api_key, request.charging_party, request.respondent, cat_points, cat, rag_context))
 
-        # 3c. Prepare Tasks for Individual Allegation Responses (Parallel)
-        async def draft_point_async(p):
-            prompt = "[SENIOR DEFENSE COUNSEL] Draft a professional, legal-grade response for ONE SPECIFIC allegation. Use 'The Respondent denies...' style. Use the provided 'Suggested Proofs' to bolster the factual basis of the response if relevant. Return JSON: { \"response_label\": \"Response No. X\", \"drafted_response\": \"...\" }"
-            data = f"ALLEGATION NO. {p.get('label')}: {p.get('allegation')}\nSUGGESTED PROOFS: {p.get('suggested_proof')}\nRESPONSE: {p.get('response')}\nLAW: {rag_context[:1000]}"
-            res = await call_llm_module(final_url, api_key, prompt, data)
-            if res:
-                p_json = json.loads(repair_json(res))
+        # 3c. Prepare Tasks for Individual Allegation Responses (Batched, Parallel)
+        def point_result(p, drafted=None):
+            if drafted is None:
                 return {
-                    "label": f"Allegation No. {p.get('label')}",
-                    "allegation": sanitize_xml(p.get('allegation')),
+                    "label": f"Allegation No. {p.get('label')}", 
+                    "allegation": sanitize_xml(p.get('allegation')), 
                     "suggested_proof": sanitize_xml(p.get('suggested_proof', '')),
-                    "response_label": sanitize_xml(p_json.get("response_label") or f"Response No. {p.get('label')}"),
-                    "response": sanitize_xml(p_json.get("drafted_response") or p.get('response'))
+                    "response": sanitize_xml(p.get('response'))
                 }
             return {
-                "label": f"Allegation No. {p.get('label')}", 
-                "allegation": sanitize_xml(p.get('allegation')), 
+                "label": f"Allegation No. {p.get('label')}",
+                "allegation": sanitize_xml(p.get('allegation')),
                 "suggested_proof": sanitize_xml(p.get('suggested_proof', '')),
-                "response": sanitize_xml(p.get('response'))
+                "response_label": sanitize_xml(drafted.get("response_label") or f"Response No. {p.get('label')}"),
+                "response": sanitize_xml(drafted.get("drafted_response") or p.get('response'))
             }
 
-        point_tasks = [draft_point_async(p) for p in final_points]
+        def point_data(p):
+            return f"ALLEGATION NO. {p.get('label')}: {p.get('allegation')}\nSUGGESTED PROOFS: {p.get('suggested_proof')}\nRESPONSE: {p.get('response')}"
+
+        async def draft_point_async(p):
+            prompt = "[SENIOR DEFENSE COUNSEL] Draft a professional, legal-grade response for ONE SPECIFIC allegation. Use 'The Respondent denies...' style. Use the provided 'Suggested Proofs' to bolster the factual basis of the response if relevant. Return JSON: { \"response_label\": \"Response No. X\", \"drafted_response\": \"...\" }"
+            data = f"{point_data(p)}\nLAW: {rag_context[:1000]}"
+            res = await call_llm_module(final_url, api_key, prompt, data)
+            if res:
+                try:
+                    return point_result(p, json.loads(repair_json(res)))
+                except Exception:
+                    pass
+            return point_result(p)
+
+        async def draft_point_batch(batch):
+            """One call for several allegations; a malformed or incomplete answer splits the batch in half and retries."""
+            if len(batch) == 1:
+                return [await draft_point_async(batch[0])]
+            prompt = (
+                "[SENIOR DEFENSE COUNSEL] Draft a professional, legal-grade response for EACH allegation below, independently. "
+                "Use 'The Respondent denies...' style. Use each allegation's 'Suggested Proofs' to bolster the factual basis of its response if relevant. "
+                "Do not merge, skip or renumber allegations. Return JSON: { \"responses\": [ { \"label\": \"<allegation number exactly as given>\", "
+                "\"response_label\": \"Response No. X\", \"drafted_response\": \"...\" }, ... ] } with one entry per allegation."
+            )
+            data = "\n\n".join(point_data(p) for p in batch) + f"\n\nLAW: {rag_context[:1000]}"
+            res = await call_llm_module(final_url, api_key, prompt, data, max_completion_tokens=settings.DRAFTING_POINT_BATCH_OUTPUT_TOKENS)
+            by_label = {}
+            try:
+                for item in json.loads(repair_json(res)).get("responses", []) if res else []:
+                    if isinstance(item, dict) and item.get("drafted_response"):
+                        by_label[str(item.get("label", "")).strip()] = item
+            except Exception:
+                by_label = {}
+            if all(str(p.get('label')).strip() in by_label for p in batch):
+                return [point_result(p, by_label[str(p.get('label')).strip()]) for p in batch]
+
+            activity_logger.log_event("Drafting", "BATCH_SPLIT", request.charging_party, f"Batch of {len(batch)} returned {len(by_label)} usable responses; splitting and retrying.")
+            mid = len(batch) // 2
+            halves = await asyncio.gather(draft_point_batch(batch[:mid]), draft_point_batch(batch[mid:]))
+            return halves[0] + halves[1]
+
+        # Batch size is bounded by the configured count, the completion cap and the input token budget
+        max_batch = max(1, min(settings.DRAFTING_POINT_BATCH_SIZE, settings.DRAFTING_POINT_BATCH_OUTPUT_TOKENS // max(1, settings.DRAFTING_POINT_RESPONSE_TOKENS)))
+        point_batches = []
+        batch_tokens = 0
+        for p in final_points:
+            p_tokens = count_text_tokens(point_data(p))
+            if point_batches and len(point_batches[-1]) < max_batch and batch_tokens + p_tokens <= settings.DRAFTING_POINT_BATCH_INPUT_TOKENS:
+                point_batches[-1].append(p)
+                batch_tokens += p_tokens
+            else:
+                point_batches.append([p])
+                batch_tokens = p_tokens
+
+        @timed_stage("drafting", "point_responses")
+        async def draft_all_points():
+            batches = await asyncio.gather(*[draft_point_batch(b) for b in point_batches])
+            return [r for b in batches for r in b]
+
+        activity_logger.log_event("Drafting", "POINT_BATCHES", request.charging_party, f"Drafting {len(final_points)} allegation responses in {len(point_batches)} call(s) (max {max_batch} per call).")
 
         # 3d. Gather All Results (Parallel Execution)
-        activity_logger.log_event("Drafting", "ASYNC_GATHER", request.charging_party, f"Launching {len(point_tasks) + 3 + len(analysis_tasks)} concurrent AI tasks...")
+        activity_logger.log_event("Drafting", "ASYNC_GATHER", request.charging_party, f"Launching {len(point_batches) + 3 + len(analysis_tasks)} concurrent AI tasks...")
         
         results = await asyncio.gather(
             task_intro,
             task_facts,
             task_ending,
             asyncio.gather(*analysis_tasks.values()),
-            asyncio.gather(*point_tasks),
+            draft_all_points(),
             return_exceptions=True
         )
 
+        # An unavailable deployment fails the whole draft rather than filling every section with fallbacks
+        unavailable = next((r for r in results if isinstance(r, LLMUnavailableError)), None)
+        if unavailable is not None:
+            raise unavailable
+
         # 3e. Map Results back to State
         # Results indices: 0=intro, 1=facts, 2=ending, 3=analysis_results_list, 4=processed_points
         intro_res = results[0] if not isinstance(results[0], Exception) else {}
@@ -573,6 +649,7 @@ async def generate_position_draft(request: CombinedDraftRequest):
 
 
         # --- STEP 4: DOCX GENERATION (TEMPLATE-FIRST) ---
+        await _progress("docx_build", 85)
         # _HERE is .../backend/app/api/api_v1/endpoints
         template_path = Path(_HERE).parent.parent.parent.parent / "assets" / "templates" / "Legal_Template.docx"
         
@@ -744,6 +821,7 @@ async def generate_position_draft(request: CombinedDraftRequest):
         add_body_paragraph(appendix_text)
 
         # --- SAVE ---
+        await _progress("save", 95)
         default_dir = Path(_HERE).parent.parent.parent.parent / "Drafts"
         try:
             f_dir = Path(request.folder_path) if request.folder_path else default_dir
@@ -759,7 +837,18 @@ async def generate_position_draft(request: CombinedDraftRequest):
         activity_logger.log_event("Drafting", "END", request.charging_party, f"Successfully saved to: {str(fpath)}")
         return {"status": "success", "file_path": str(fpath)}
 
+    except LLMUnavailableError as e:
+        stages.close(e)
+        activity_logger.log_event("Drafting", "ERROR", request.charging_party, str(e))
+        raise HTTPException(status_code=503, detail="AI service is temporarily unavailable. Please try again later.")
     except Exception as e:
         import traceback
+        stages.close(e)
         activity_logger.log_event("Drafting", "ERROR", request.charging_party, f"Critical: {str(e)}\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        stages.close()
+
+@router.post("/generate_position_draft")
+async def generate_position_draft(request: CombinedDraftRequest):
+    return await run_position_draft(request)
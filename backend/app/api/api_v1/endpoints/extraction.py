@@ -1,60 +1,42 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Callable, Awaitable, Literal
 import os
 import json
-import base64
 import re
 import asyncio
-import requests
-import fitz # PyMuPDF
-from openai import AsyncAzureOpenAI
+from pathlib import Path
 from json_repair import repair_json
 from app.core.config import settings
 from app.core.logger import activity_logger
+from app.core.masking import extraction_masker
+from app.core.metrics import StageTimer
+from app.services.ocr_cache import ocr_cache
+from app.services import page_renderer
+from app.services.dedup import deduplicate_allegations
+from app.services.llm_gateway import llm_gateway
+from app.services.page_packing import pack_pages
+from app.services.rate_limiter import count_text_tokens
 
 router = APIRouter()
 
+# Page render settings for vision OCR; part of the OCR cache key so a change invalidates old entries
+OCR_RENDER_SCALE = 2.0
+OCR_RENDER_SETTINGS = f"png@{OCR_RENDER_SCALE}x;prompt=v1"
+
 class ExtractionRequest(BaseModel):
     file_path: Optional[str] = Field(None, description="Absolute local path to the PDF file")
     file_id: Optional[str] = Field(None, description="Existing Azure OpenAI File ID")
+    capture_mode: Literal["hybrid", "vision"] = Field("hybrid", description="'hybrid' reads the PDF text layer where usable and OCRs only scanned/garbled pages; 'vision' OCRs every page")
 
 def preprocess_text(text: str) -> str:
     """Mask sensitive legal terms that might trigger Azure content filters."""
-    toxic_patterns = {
-        r'\bfucking\b': 'f*cking', r'\bfuck\b': 'f*ck', r'\bbitch\b': 'b*tch',
-        r'\bsexual\b': 's-e-x-u-a-l', r'\bharassment\b': 'har*ssment',
-        r'\brape\b': 'r*pe', r'\bassault\b': 'ass*ult', r'\bviolence\b': 'vi*lence',
-        r'\bsex\b': 's*x', r'\bracial\b': 'rac*al', r'\bdiscrimination\b': 'discrim*nation',
-        r'\bcolor\b': 'col*r', r'\brace\b': 'ra*e', r'\bblack\b': 'bl*ck'
-    }
-    processed_text = text
-    for pattern, replacement in toxic_patterns.items():
-        processed_text = re.sub(pattern, replacement, processed_text, flags=re.IGNORECASE)
-    return processed_text
+    return extraction_masker.mask(text)
 
 def postprocess_unmask(obj: Any) -> Any:
     """Recursively restore masked terms to their original legal versions."""
-    unmask_map = {
-        'f*cking': 'fucking', 'f*ck': 'fuck', 'b*tch': 'bitch',
-        's-e-x-u-a-l': 'sexual', 'har*ssment': 'harassment',
-        'r*pe': 'rape', 'ass*ult': 'assault', 'vi*lence': 'violence',
-        's*x': 'sex', 'rac*al': 'racial', 'discrim*nation': 'discrimination',
-        'col*r': 'color', 'ra*e': 'race', 'bl*ck': 'black'
-    }
-    
-    if isinstance(obj, str):
-        result = obj
-        for masked, original in unmask_map.items():
-            # Use insensitive replace if possible, or just exact match for our specific tokens
-            result = re.sub(re.escape(masked), original, result, flags=re.IGNORECASE)
-        return result
-    elif isinstance(obj, list):
-        return [postprocess_unmask(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: postprocess_unmask(v) for k, v in obj.items()}
-    return obj
+    return extraction_masker.unmask(obj)
 
 def validate_extraction_format(data: dict) -> bool:
     """Verifies that the required top-level keys are present for relational mapping."""
@@ -70,9 +52,21 @@ def validate_extraction_format(data: dict) -> bool:
         
     return True
 
-@router.post("/extract")
-async def extract_allegations(request: ExtractionRequest):
+async def run_extraction(request: ExtractionRequest, emit: Optional[Callable[[dict], Awaitable[None]]] = None) -> dict:
+    """
+    Runs the full capture -> sanitize -> structure -> restore pipeline and returns the final JSON.
+    If `emit` is given it is awaited with progress events ('stage', 'page', 'allegations') as work completes.
+    """
     target = request.file_id or request.file_path
+
+    stages = StageTimer("extraction")
+
+    async def _emit(event: dict):
+        if event.get("event") == "stage":
+            stages.enter(event["stage"])
+        if emit:
+            await emit(event)
+
     activity_logger.log_event("Extraction", "START", target, "Executing Unlimited Multi-Page High-Fidelity Pipeline")
     
     # Credentials from Settings
@@ -81,43 +75,116 @@ async def extract_allegations(request: ExtractionRequest):
     resource_base = raw_endpoint.split("/openai")[0] if "/openai" in raw_endpoint else raw_endpoint
     api_version = re.search(r'api-version=([^&]+)', raw_endpoint).group(1) if "api-version=" in raw_endpoint else "2025-01-01-preview"
     deployment_id = settings.AZURE_OPENAI_MODEL
+    chat_url = f"{resource_base}/openai/deployments/{deployment_id}/chat/completions?api-version={api_version}"
 
     try:
         raw_full_text = ""
         
         # --- PASS 1: MULTI-PAGE VISION OCR (Images-to-Verbatim Text) ---
         if request.file_path and os.path.exists(request.file_path):
-            activity_logger.log_event("Extraction", "INFO", target, "Pass 1: Unlimited Multi-Page Capture")
-            doc = fitz.open(request.file_path)
-            # Process ALL pages in the document
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0))
-                b64 = base64.b64encode(pix.tobytes("png")).decode("utf-8")
-                
-                async with AsyncAzureOpenAI(azure_endpoint=resource_base, api_key=api_key, api_version=api_version) as cl:
-                    res_v = await cl.chat.completions.create(
-                        model=deployment_id,
-                        messages=[{"role": "user", "content": [{"type": "text", "text": f"Extract ALL text verbatim from page {page_num+1} of this legal document. Do not summarize."}, {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{b64}"}}]}],
-                        max_completion_tokens=4096
-                    )
-                    page_text = res_v.choices[0].message.content
-                    raw_full_text += f"\n--- PAGE {page_num+1} ---\n{page_text}"
-            doc.close()
+            await _emit({"event": "stage", "stage": "pass1_capture"})
+            concurrency = max(1, settings.EXTRACTION_OCR_CONCURRENCY)
+            render_workers = settings.EXTRACTION_RENDER_WORKERS
+            capture_mode = request.capture_mode
+            activity_logger.log_event("Extraction", "INFO", target, f"Pass 1: Unlimited Multi-Page Capture (mode={capture_mode}, concurrency={concurrency})")
+            thresholds = None
+            if capture_mode != "vision":
+                thresholds = (
+                    settings.EXTRACTION_NATIVE_MIN_CHAR_DENSITY,
+                    settings.EXTRACTION_NATIVE_MAX_IMAGE_COVERAGE,
+                    settings.EXTRACTION_NATIVE_MIN_GLYPH_RATIO,
+                )
+            page_total = await page_renderer.run_in_pool(render_workers, page_renderer.count_pages, request.file_path)
+            page_texts = [""] * page_total
+            cache_hits = []
+
+            # Rendering, PNG and base64 encoding run in the process pool; the bounded queue keeps at
+            # most EXTRACTION_RENDER_PREFETCH pages rendered ahead of the OCR workers
+            render_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.EXTRACTION_RENDER_PREFETCH))
+
+            async def produce_pages():
+                for page_num in range(page_total):
+                    fut = asyncio.ensure_future(page_renderer.run_in_pool(
+                        render_workers, page_renderer.capture_page, request.file_path, page_num, OCR_RENDER_SCALE, thresholds
+                    ))
+                    await render_queue.put(fut)
+                for _ in range(concurrency):
+                    await render_queue.put(None)
+
+            async def ocr_page(captured):
+                page_num = captured["page_num"]
+                if thresholds is not None:
+                    activity_logger.log_event("Extraction", "PAGE_CAPTURE", target, f"Page {page_num+1}: {captured['decision'].upper()} - {captured['reason']}")
+                if captured["decision"] == "native":
+                    return captured["text"], "native"
+
+                cache_key = None
+                if settings.OCR_CACHE_ENABLED:
+                    cache_key = ocr_cache.make_key(captured["png_sha256"], OCR_RENDER_SETTINGS, deployment_id)
+                    cached_text = await asyncio.to_thread(ocr_cache.get, cache_key)
+                    if cached_text is not None:
+                        cache_hits.append(page_num)
+                        return cached_text, "cache"
+
+                page_text = await llm_gateway.chat_completion(chat_url, {
+                    "messages": [{"role": "user", "content": [{"type": "text", "text": f"Extract ALL text verbatim from page {page_num+1} of this legal document. Do not summarize."}, {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{captured['png_b64']}"}}]}],
+                    "max_completion_tokens": 4096
+                }, api_key=api_key)
+                if cache_key and page_text:
+                    await asyncio.to_thread(ocr_cache.put, cache_key, page_text)
+                return page_text, "vision"
+
+            async def ocr_worker():
+                while True:
+                    fut = await render_queue.get()
+                    if fut is None:
+                        return
+                    captured = await fut
+                    page_text, source = await ocr_page(captured)
+                    page_texts[captured["page_num"]] = page_text
+                    await _emit({"event": "page", "page": captured["page_num"] + 1, "total": page_total, "source": source})
+
+            # `concurrency` OCR workers drain the render queue over the shared gateway connection pool
+            tasks = [asyncio.create_task(produce_pages())] + [asyncio.create_task(ocr_worker()) for _ in range(concurrency)]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for t in tasks:
+                    t.cancel()
+                while not render_queue.empty():
+                    fut = render_queue.get_nowait()
+                    if fut is not None:
+                        fut.cancel()
+                raise
+
+            if settings.OCR_CACHE_ENABLED:
+                activity_logger.log_event("Extraction", "INFO", target, f"Pass 1: OCR cache served {len(cache_hits)} page(s). Cache stats: {ocr_cache.stats()}")
+
+            # Reassemble in page order under the delimiters Pass 3 splits on
+            for page_num, page_text in enumerate(page_texts):
+                raw_full_text += f"\n--- PAGE {page_num+1} ---\n{page_text}"
 
         # Fallback to Native REST if path 1 failed or if only file_id provided
         if not raw_full_text:
             activity_logger.log_event("Extraction", "INFO", target, "Pass 1 (Fallback): Native REST Capture")
+            stages.enter("pass1_fallback")
             responses_url = f"{resource_base}/openai/v1/responses?api-version={api_version}"
             file_id = request.file_id
             if not file_id and request.file_path:
-                async with AsyncAzureOpenAI(azure_endpoint=resource_base, api_key=api_key, api_version=api_version) as cl:
-                    with open(request.file_path, "rb") as f:
-                        f_obj = await cl.files.create(file=f, purpose="assistants")
-                        file_id = f_obj.id
+                file_bytes = await asyncio.to_thread(Path(request.file_path).read_bytes)
+                f_res = await llm_gateway.post(
+                    f"{resource_base}/openai/files?api-version={api_version}",
+                    files={"file": (os.path.basename(request.file_path), file_bytes, "application/pdf")},
+                    data={"purpose": "assistants"},
+                    api_key=api_key
+                )
+                if f_res.status_code in (200, 201):
+                    file_id = f_res.json().get("id")
+                else:
+                    activity_logger.log_event("Extraction", "WARNING", target, f"File upload failed: {f_res.status_code} - {f_res.text}")
             if file_id:
                 raw_payload = {"model": deployment_id, "input": [{"role": "user", "content": [{"type": "input_text", "text": "Extract all text verbatim."}, {"type": "input_file", "file_id": file_id}]}], "max_completion_tokens": 4096}
-                r = requests.post(responses_url, headers={"api-key": api_key, "Content-Type": "application/json"}, json=raw_payload, timeout=1200)
+                r = await llm_gateway.post(responses_url, json=raw_payload, api_key=api_key, timeout=1200, deployment=deployment_id)
                 if r.status_code == 200:
                     for item in r.json().get("output", []):
                         if item.get("role") == "assistant":
@@ -128,10 +195,12 @@ async def extract_allegations(request: ExtractionRequest):
             raise Exception("Capture failed.")
 
         # --- PASS 2: SANITIZATION (Text-to-Masked Text) ---
+        await _emit({"event": "stage", "stage": "pass2_sanitize"})
         activity_logger.log_event("Extraction", "INFO", target, "Pass 2: Sanitization Layer")
         masked_text = preprocess_text(raw_full_text)
 
         # --- PASS 3: STRUCTURED REFINEMENT (Paginated Masked-to-JSON) ---
+        await _emit({"event": "stage", "stage": "pass3_structure"})
         activity_logger.log_event("Extraction", "INFO", target, "Pass 3: Paginated Allegation Structuring")
         
         system_prompt = """[SENIOR LEGAL DATA ENGINEER] Analyze the provided legal text and return a strict JSON object. 
@@ -190,37 +259,35 @@ Respond ONLY with the JSON object."""
         if not page_chunks: # Fallback if no page delimiters found
             page_chunks = [masked_text]
 
-        # Group chunks into manageable blocks (1 page per LLM call is safest for high-fidelity legal commentary)
-        chunk_groups = []
-        for i in range(0, len(page_chunks), 1):
-            chunk_groups.append(page_chunks[i])
+        # Pack consecutive pages into token-budgeted groups so short pages (signatures, continuations,
+        # exhibits) share one call and its system prompt; the verbatim JSON echo must fit the output cap.
+        output_tokens = settings.EXTRACTION_REFINE_OUTPUT_TOKENS
+        input_budget = min(settings.EXTRACTION_REFINE_INPUT_TOKENS, output_tokens // 2)
+        chunk_groups = pack_pages(page_chunks, input_budget, max_pages=settings.EXTRACTION_REFINE_MAX_PAGES)
+        prompt_tokens = len(chunk_groups) * count_text_tokens(system_prompt) + sum(count_text_tokens(g) for g in chunk_groups)
+        activity_logger.log_event("Extraction", "INFO", target, f"Packed {len(page_chunks)} page(s) into {len(chunk_groups)} group(s) (budget {input_budget} tokens, ~{prompt_tokens} prompt tokens).")
 
-        activity_logger.log_event("Extraction", "INFO", target, f"Processing {len(chunk_groups)} page chunks.")
+        refine_concurrency = max(1, settings.EXTRACTION_REFINE_CONCURRENCY)
+        activity_logger.log_event("Extraction", "INFO", target, f"Processing {len(chunk_groups)} page chunks (concurrency={refine_concurrency}).")
 
-        final_allegations = []
-        final_defense = []
-        final_metadata = {}
-        last_parsed = {}
+        refine_semaphore = asyncio.Semaphore(refine_concurrency)
 
-        for idx, chunk in enumerate(chunk_groups):
-            activity_logger.log_event("Extraction", "INFO", target, f"Refinement Pass: Processing Chunk {idx+1}/{len(chunk_groups)}")
-            
-            chunk_json = None
-            for attempt in range(2):
-                activity_logger.log_event("Extraction", "INFO", target, f"Chunk {idx+1} (Attempt {attempt+1})")
-                async with AsyncAzureOpenAI(azure_endpoint=resource_base, api_key=api_key, api_version=api_version) as cl_s:
+        async def refine_chunk(idx, chunk):
+            async with refine_semaphore:
+                activity_logger.log_event("Extraction", "INFO", target, f"Refinement Pass: Processing Chunk {idx+1}/{len(chunk_groups)}")
+                chunk_json = None
+                for attempt in range(2):
+                    activity_logger.log_event("Extraction", "INFO", target, f"Chunk {idx+1} (Attempt {attempt+1})")
                     try:
-                        res_f = await cl_s.chat.completions.create(
-                            model=deployment_id, 
-                            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": f"DATA (PART {idx+1}/{len(chunk_groups)}):\n{chunk}"}], 
-                            response_format={"type": "json_object"}, 
-                            max_completion_tokens=8192
-                        )
+                        content = await llm_gateway.chat_completion(chat_url, {
+                            "messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": f"DATA (PART {idx+1}/{len(chunk_groups)}):\n{chunk}"}],
+                            "response_format": {"type": "json_object"},
+                            "max_completion_tokens": output_tokens
+                        }, api_key=api_key)
                     except Exception as e:
                         activity_logger.log_event("Extraction", "RETRY_ERR", target, f"Completion error: {str(e)}")
                         continue
                     
-                    content = res_f.choices[0].message.content
                     if not content:
                         continue
                     
@@ -235,7 +302,27 @@ Respond ONLY with the JSON object."""
                             chunk_json = parsed_chunk
                     except:
                         continue
-            
+
+                # Stream this chunk's allegations as soon as it lands; final numbering comes with the result
+                batch = chunk_json.get("allegations_list", []) if isinstance(chunk_json, dict) else []
+                await _emit({
+                    "event": "allegations",
+                    "chunk": idx + 1,
+                    "total": len(chunk_groups),
+                    "allegations": postprocess_unmask(batch) if isinstance(batch, list) else []
+                })
+                return chunk_json
+
+        # Chunks are independent until the merge, so dispatch them together over the gateway pool
+        chunk_results = await asyncio.gather(*[refine_chunk(idx, chunk) for idx, chunk in enumerate(chunk_groups)])
+
+        final_allegations = []
+        final_defense = []
+        final_metadata = {}
+        last_parsed = {}
+
+        # Merge strictly in page order so metadata selection and allegation order match the serial pass
+        for chunk_idx, chunk_json in enumerate(chunk_results):
             if chunk_json:
                 last_parsed = chunk_json
                 # Extract metadata from the first chunk that has it
@@ -245,60 +332,24 @@ Respond ONLY with the JSON object."""
                     if m.get("charging_party") and "Name" not in m.get("charging_party"):
                         final_metadata = m
                 
-                # Append allegations and defense proofs
+                # Append allegations and defense proofs, tagged with their chunk (point_ref is only unique per chunk)
                 new_allegations = chunk_json.get("allegations_list", [])
                 if isinstance(new_allegations, list):
-                    final_allegations.extend(new_allegations)
+                    final_allegations.extend((chunk_idx, a) for a in new_allegations)
                 
                 new_defense = chunk_json.get("defense_and_proofs", [])
                 if isinstance(new_defense, list):
-                    final_defense.extend(new_defense)
+                    final_defense.extend((chunk_idx, d) for d in new_defense)
 
         # --- POST-PROCESSOR: REINDEX & CLEAN ---
-        if final_allegations:
-            activity_logger.log_event("Extraction", "INFO", target, "Executing Post-Processor: Re-indexing & Noise Reduction")
-            
-            cleaned_allegations = []
-            cleaned_proofs = []
-            seen_texts = set()
-            
-            # 1. Deduplicate and Filter Noise
-            for idx, item in enumerate(final_allegations):
-                txt = (item.get("allegation_text") or "").strip()
-                # Skip if empty or a generic placeholder
-                if not txt or len(txt) < 5 or txt.lower() in ["name", "none", "n/a", "date"]:
-                    continue
-                # Skip if it looks like a field label
-                if txt.endswith(":") and len(txt) < 30:
-                    continue
-                # Deduplicate by text content
-                if txt.lower() in seen_texts:
-                    continue
-                
-                seen_texts.add(txt.lower())
-                
-                # New sequential ID
-                new_id = str(len(cleaned_allegations) + 1)
-                
-                # Update current item
-                item["point_number"] = new_id
-                cleaned_allegations.append(item)
-                
-                # Try to find matching proofs from the original collected list
-                # This is heuristic but usually works if the AI followed order
-                old_ref = item.get("point_number")
-                matching_proof = next((p for p in final_defense if str(p.get("point_ref")) == str(old_ref)), None)
-                if matching_proof:
-                    cleaned_proofs.append({
-                        "point_ref": new_id,
-                        "suggested_proofs": matching_proof.get("suggested_proofs", [])
-                    })
-                else:
-                    # Fallback default proof
-                    cleaned_proofs.append({"point_ref": new_id, "suggested_proofs": ["Personnel file", "Policy documentation"]})
-
-            final_allegations = cleaned_allegations
-            final_defense = cleaned_proofs
+        activity_logger.log_event("Extraction", "INFO", target, "Executing Post-Processor: Re-indexing & Noise Reduction")
+        # CPU-bound on large documents: keep it off the event loop shared with other requests
+        final_allegations, final_defense, merges = await asyncio.to_thread(
+            deduplicate_allegations, final_allegations, final_defense, settings.EXTRACTION_DEDUP_THRESHOLD
+        )
+        if merges:
+            merge_report = "; ".join(f"into #{m['kept_point']} (sim {m['similarity']}): {m['dropped_text'][:60]}" for m in merges[:20])
+            activity_logger.log_event("Extraction", "DEDUP", target, f"Merged {len(merges)} duplicate allegation(s): {merge_report}")
 
         # Build final object
         if not final_metadata: # Final check
@@ -317,12 +368,71 @@ Respond ONLY with the JSON object."""
         }
         
         # --- PASS 4: RESTORATION (Unmasking) ---
+        await _emit({"event": "stage", "stage": "pass4_restore"})
         activity_logger.log_event("Extraction", "INFO", target, "Executing Post-Processor: Restoration Layer")
         final_json = postprocess_unmask(final_json)
 
         activity_logger.log_event("Extraction", "SUCCESS", target, f"Final Extraction Success. Total allegations: {len(final_allegations)}")
-        return JSONResponse(content=final_json)
+        return final_json
 
     except Exception as e:
+        stages.close(e)
         activity_logger.log_event("Extraction", "ERROR", target, f"Pipeline Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        stages.close()
+
+@router.post("/extract")
+async def extract_allegations(request: ExtractionRequest):
+    final_json = await run_extraction(request)
+    return JSONResponse(content=final_json)
+
+@router.post("/extract/stream")
+async def extract_allegations_stream(request: ExtractionRequest, format: str = "ndjson"):
+    """
+    Streaming variant of /extract. Emits progress and per-chunk allegation events as they complete,
+    heartbeats while idle, and a terminal 'result' (or 'error') event with the final document.
+    `format` is 'ndjson' (one JSON object per line) or 'sse' (text/event-stream).
+    """
+    use_sse = format.lower() == "sse"
+    heartbeat = max(1.0, settings.EXTRACTION_STREAM_HEARTBEAT_SECONDS)
+
+    def encode(event: dict) -> str:
+        if use_sse:
+            return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        return json.dumps(event) + "\n"
+
+    async def event_stream():
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def runner():
+            try:
+                final_json = await run_extraction(request, emit=queue.put)
+                await queue.put({"event": "result", "data": final_json})
+            except Exception as e:
+                await queue.put({"event": "error", "detail": getattr(e, "detail", str(e))})
+            finally:
+                await queue.put(None)
+
+        task = asyncio.create_task(runner())
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # Keep proxies from closing an idle connection during long LLM calls
+                    yield encode({"event": "heartbeat"})
+                    continue
+                if event is None:
+                    break
+                yield encode(event)
+        finally:
+            # Client went away: stop spending tokens on a result nobody will read
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -3,13 +3,14 @@ from pathlib import Path
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
-import requests
 import json
-import time
 from docx import Document
 from app.core.config import settings
 from app.services.rag_service import retrieve_documents, vector_store
 from app.core.logger import activity_logger
+from app.core.metrics import StageTimer
+from app.services.llm_gateway import llm_gateway
+from app.services.retry_policy import LLMUnavailableError
 
 router = APIRouter()
 
@@ -34,6 +35,16 @@ class GenerationRequest(BaseModel):
 
 @router.post("/generate_statement")
 async def generate_statement(request: GenerationRequest):
+    stages = StageTimer("generation")
+    try:
+        return await _generate_statement(request, stages)
+    except Exception as e:
+        stages.close(e)
+        raise
+    finally:
+        stages.close()
+
+async def _generate_statement(request: GenerationRequest, stages: StageTimer):
     party_name = request.document_metadata.charging_party
     activity_logger.log_event("Generation", "START", party_name, f"Generating Position Statement based on {len(request.allegations_list)} allegations.")
     
@@ -41,6 +52,7 @@ async def generate_statement(request: GenerationRequest):
     deployment_name = settings.AZURE_OPENAI_MODEL
     
     # 1. Prepare RAG Context
+    stages.enter("rag_retrieval")
     # We aggregate text from the allegations to query the vector store
     search_query = request.document_metadata.legal_case_summary
     for pt in request.allegations_list:
@@ -56,6 +68,7 @@ async def generate_statement(request: GenerationRequest):
         rag_context = "No additional context found."
 
     # 2. Build Prompt for Azure OpenAI
+    stages.enter("llm_generation")
     # We instruct the LLM to draft a formal Position Statement
     system_prompt = """You are a Senior Legal Counsel drafting a formal Position Statement on behalf of a Respondent employer.
 Your goal is to consume the structured facts (Allegations and User Responses) and the retrieved Legal Citations (RAG Context) to produce a cohesive, professional, and robust Position Statement suitable for submission to an agency (e.g., EEOC).
@@ -88,11 +101,6 @@ Categories: {request.document_metadata.all_detected_categories}
 
     # Call Azure OpenAI Chat Completions using exact endpoint
     chat_url = f"{settings.AZURE_OPENAI_ENDPOINT.rstrip('/')}/openai/deployments/{deployment_name}/chat/completions?api-version={settings.OPENAI_API_VERSION}"
-    
-    headers = {
-        "api-key": api_key,
-        "Content-Type": "application/json"
-    }
     payload = {
         "messages": [
             {"role": "system", "content": system_prompt},
@@ -100,36 +108,32 @@ Categories: {request.document_metadata.all_detected_categories}
         ]
     }
 
-    retry_delay = 5
-    attempt = 0
-    while True:
-        try:
-            # Standardized timeout to 1200s (20 minutes)
-            chat_res = requests.post(chat_url, headers=headers, json=payload, timeout=1200)
-            if chat_res.status_code != 200:
-                if chat_res.status_code in [401, 403]:
-                    err_msg = f"Chat generation failed due to credentials: {chat_res.status_code} - {chat_res.text}"
-                    activity_logger.log_event("Generation", "ERROR", party_name, err_msg)
-                    raise HTTPException(status_code=401, detail="Authentication failed. Please check AI credentials.")
-                    
-                err_msg = f"Chat generation failed: {chat_res.status_code} - {chat_res.text}"
-                activity_logger.log_event("Generation", "ERROR", party_name, err_msg)
-                raise Exception(err_msg)
-            
-            completion = chat_res.json()
-            generated_text = completion["choices"][0]["message"]["content"]
-            break # Loop break on success
-        except HTTPException as e:
-            raise e
-        except Exception as e:
-            err_msg = str(e)
-            activity_logger.log_ai_error(err_msg)
-            attempt += 1
-            activity_logger.log_event("Generation", "WARNING", party_name, f"Retrying infinite loop (attempt {attempt})...")
-            time.sleep(retry_delay)
-            continue
+    # Retries, backoff and the circuit breaker live in the gateway's retry policy; an exhausted
+    # policy surfaces here as a non-200 response or LLMUnavailableError instead of looping forever.
+    try:
+        # Standardized timeout to 1200s (20 minutes)
+        chat_res = await llm_gateway.chat(chat_url, payload, api_key=api_key, timeout=1200)
+    except LLMUnavailableError as e:
+        activity_logger.log_ai_error(str(e))
+        activity_logger.log_event("Generation", "ERROR", party_name, str(e))
+        raise HTTPException(status_code=503, detail="AI service is temporarily unavailable. Please try again later.")
+
+    if chat_res.status_code != 200:
+        if chat_res.status_code in [401, 403]:
+            err_msg = f"Chat generation failed due to credentials: {chat_res.status_code} - {chat_res.text}"
+            activity_logger.log_event("Generation", "ERROR", party_name, err_msg)
+            raise HTTPException(status_code=401, detail="Authentication failed. Please check AI credentials.")
+
+        err_msg = f"Chat generation failed: {chat_res.status_code} - {chat_res.text}"
+        activity_logger.log_ai_error(err_msg)
+        activity_logger.log_event("Generation", "ERROR", party_name, err_msg)
+        raise HTTPException(status_code=502, detail=err_msg)
+
+    completion = chat_res.json()
+    generated_text = completion["choices"][0]["message"]["content"]
 
     # 3. Create Word Document
+    stages.enter("docx_build_save")
     try:
         doc = Document()
         doc.add_heading('POSITION STATEMENT', 0)
@@ -0,0 +1,70 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from app.api.api_v1.endpoints.extraction import ExtractionRequest, run_extraction
+from app.api.api_v1.endpoints.drafting_generator import CombinedDraftRequest, run_position_draft
+from app.services.job_queue import job_manager
+
+router = APIRouter()
+
+# Share of the extraction job each pass accounts for when reporting percent complete
+_EXTRACTION_STAGE_PERCENT = {
+    "pass1_capture": 0,
+    "pass2_sanitize": 50,
+    "pass3_structure": 55,
+    "pass4_restore": 95,
+}
+
+async def _extraction_job(payload: dict, progress) -> dict:
+    # Pages and chunks finish out of order, so progress counts completions rather than using the finished index
+    done = {"page": 0, "allegations": 0}
+
+    async def emit(event: dict):
+        kind = event.get("event")
+        if kind == "stage":
+            await progress(event["stage"], _EXTRACTION_STAGE_PERCENT.get(event["stage"], 0))
+        elif kind == "page":
+            done["page"] += 1
+            await progress("pass1_capture", 50 * done["page"] / max(event["total"], 1))
+        elif kind == "allegations":
+            done["allegations"] += 1
+            await progress("pass3_structure", 55 + 40 * done["allegations"] / max(event["total"], 1))
+
+    return await run_extraction(ExtractionRequest(**payload), emit=emit)
+
+async def _drafting_job(payload: dict, progress) -> dict:
+    return await run_position_draft(CombinedDraftRequest(**payload), progress=progress)
+
+job_manager.register("extraction", _extraction_job)
+job_manager.register("drafting", _drafting_job)
+
+@router.post("/extraction")
+async def submit_extraction(request: ExtractionRequest):
+    """Queue an extraction; poll /jobs/{job_id} for progress."""
+    job_id = await job_manager.submit("extraction", request.model_dump())
+    return {"job_id": job_id, "status": "queued"}
+
+@router.post("/drafting")
+async def submit_drafting(request: CombinedDraftRequest):
+    """Queue a position statement draft; poll /jobs/{job_id} for progress."""
+    job_id = await job_manager.submit("drafting", request.model_dump())
+    return {"job_id": job_id, "status": "queued"}
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str):
+    """Status, current stage and percent complete for a submitted job."""
+    job = await asyncio.to_thread(job_manager.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Final pipeline output of a finished job."""
+    job = await asyncio.to_thread(job_manager.get, job_id, True)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']} ({job['stage']}, {job['percent']}%).")
+    return job["result"]
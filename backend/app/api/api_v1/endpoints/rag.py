@@ -1,6 +1,6 @@
 
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Dict, Any, Optional
 from app.services import rag_service
 from app.models.schemas import SearchResult, LegalAuditResponse
 
@@ -16,19 +16,23 @@ async def ingest_analysis(data: LegalAuditResponse):
         # (The service expects list of dicts based on current implementation, 
         #  or we could update service to take pydantic models)
         audit_dicts = [item.model_dump() for item in data.legal_audit]  # Pydantic v2
-        count = await rag_service.ingest_legal_analysis(audit_dicts)
-        return {"ingested_count": count}
+        counts = await rag_service.ingest_legal_analysis(audit_dicts)
+        return {"ingested_count": counts["inserted"] + counts["updated"], **counts}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/search", response_model=List[SearchResult])
-async def search_citations(query: str, limit: int = 5):
+async def search_citations(query: str, limit: int = 5, mode: Optional[str] = Query(None, pattern="^(vector|lexical|hybrid)$"),
+                           ef_search: Optional[int] = Query(None, ge=1, le=1000), probes: Optional[int] = Query(None, ge=1, le=10000)):
     """
-    Semantic search for legal citations.
+    Search for legal citations: vector (semantic), lexical (full-text, for exact citations) or hybrid
+    (both fused with reciprocal rank fusion); defaults to RAG_SEARCH_MODE ("vector"). similarity_score is the
+    cosine distance in vector mode and the rank score (higher is better) only when lexical/hybrid is requested.
+    ef_search (HNSW) and probes (IVFFlat) override the index's recall/speed defaults for this query.
     """
     try:
-        from app.db.vector_store import vector_store
-        docs_and_scores = await vector_store.asimilarity_search_with_score(query, k=limit)
+        from app.db.vector_store import search
+        docs_and_scores = await search(query, k=limit, mode=mode, ef_search=ef_search, probes=probes)
         
         results = []
         for doc, score in docs_and_scores:
@@ -21,6 +21,95 @@ class Settings(BaseSettings):
     AZURE_OPENAI_EMBEDDING_ENDPOINT: str
     AZURE_OPENAI_EMBEDDING_API_KEY: str # Added for separate embedding resource
     OPENAI_API_VERSION: str = "2025-01-01-preview"
+
+    # Shared LLM Gateway (pooled keep-alive connections to Azure OpenAI)
+    LLM_HTTP2: bool = True
+    LLM_MAX_CONNECTIONS: int = 50
+    LLM_MAX_KEEPALIVE: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_TIMEOUT_SECONDS: float = 1200.0 # Standardized 20-minute timeout
+    LLM_RPM_LIMIT: int = 300 # Starting requests-per-minute per deployment; recalibrated from x-ratelimit-* headers
+    LLM_TPM_LIMIT: int = 150000 # Starting tokens-per-minute per deployment; recalibrated from x-ratelimit-* headers
+    LLM_MAX_IN_FLIGHT: int = 8 # Concurrent requests per deployment across all endpoints
+    LLM_RETRY_MAX_ATTEMPTS: int = 5 # Attempts per call on 429/5xx/transport errors
+    LLM_RETRY_BASE_DELAY: float = 1.0 # Exponential backoff base (seconds, full jitter)
+    LLM_RETRY_MAX_DELAY: float = 30.0 # Backoff cap; Retry-After from Azure wins when longer
+    LLM_REQUEST_DEADLINE_SECONDS: float = 1500.0 # Total budget per call across all attempts
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5 # Consecutive 5xx/timeouts before a deployment's circuit opens
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 30.0 # Fail-fast window before a half-open probe is allowed
+
+    # Extraction Pipeline
+    EXTRACTION_OCR_CONCURRENCY: int = 4 # Max vision OCR calls in flight per document
+    EXTRACTION_REFINE_CONCURRENCY: int = 4 # Max Pass 3 structuring calls in flight per document
+    EXTRACTION_REFINE_INPUT_TOKENS: int = 3000 # Page text packed into one Pass 3 call (system prompt excluded)
+    EXTRACTION_REFINE_OUTPUT_TOKENS: int = 8192 # Pass 3 completion cap; allegations are echoed verbatim, so input is capped to fit
+    EXTRACTION_REFINE_MAX_PAGES: int = 6 # Upper bound on pages per Pass 3 call (0 = token budget only)
+    EXTRACTION_RENDER_WORKERS: int = 2 # Processes in the PDF render/encode pool
+    EXTRACTION_RENDER_PREFETCH: int = 8 # Pages rendered ahead of the OCR calls (bounded queue)
+    EXTRACTION_NATIVE_MIN_CHAR_DENSITY: float = 2.0 # Text-layer chars per square inch below which an image-heavy page is treated as scanned
+    EXTRACTION_NATIVE_MAX_IMAGE_COVERAGE: float = 0.5 # Fraction of the page covered by images that marks it as a scan candidate
+    EXTRACTION_NATIVE_MIN_GLYPH_RATIO: float = 0.85 # Share of clean, printable glyphs required to trust the text layer
+    EXTRACTION_DEDUP_THRESHOLD: float = 0.9 # Shingle Jaccard similarity at which adjacent-chunk allegations are merged (1.0 = exact matches only)
+    EXTRACTION_STREAM_HEARTBEAT_SECONDS: float = 15.0 # Idle interval after which /extract/stream sends a heartbeat event
+
+    # Position Draft Point Responses (section IV)
+    DRAFTING_POINT_BATCH_SIZE: int = 8 # Allegations drafted per LLM call (1 = one call per allegation)
+    DRAFTING_POINT_BATCH_INPUT_TOKENS: int = 6000 # Allegation text packed into one batched call (instructions and law excluded)
+    DRAFTING_POINT_BATCH_OUTPUT_TOKENS: int = 8192 # Completion cap for a batched call
+    DRAFTING_POINT_RESPONSE_TOKENS: int = 600 # Expected tokens per drafted response; bounds batch size by the completion cap
+
+    # Background Jobs (SQLite, defaults to <repo>/data/jobs.sqlite3)
+    JOBS_WORKERS: int = 2
+    JOBS_DB_PATH: str = ""
+
+    # Activity Log (CSV rows written by a background thread)
+    ACTIVITY_LOG_QUEUE_SIZE: int = 10000 # Rows buffered before overflow handling applies
+    ACTIVITY_LOG_BATCH_SIZE: int = 200 # Rows written per flush
+    ACTIVITY_LOG_FLUSH_SECONDS: float = 1.0 # Max time a queued row waits before it reaches disk
+    ACTIVITY_LOG_OVERFLOW: str = "drop" # "drop" (count and discard) or "block" (wait up to ACTIVITY_LOG_BLOCK_SECONDS, then drop; event-loop callers always drop)
+    ACTIVITY_LOG_BLOCK_SECONDS: float = 0.5
+
+    # OCR Page Cache (SQLite, defaults to <repo>/data/ocr_cache.sqlite3)
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_PATH: str = ""
+    OCR_CACHE_MAX_MB: int = 256
+    OCR_CACHE_MAX_ENTRIES: int = 50000
+
+    # LLM Completion Cache for drafting (memory LRU + SQLite, defaults to <repo>/data/completion_cache.sqlite3)
+    COMPLETION_CACHE_ENABLED: bool = True
+    COMPLETION_CACHE_PATH: str = ""
+    COMPLETION_CACHE_MAX_MB: int = 128
+    COMPLETION_CACHE_MAX_ENTRIES: int = 20000
+    COMPLETION_CACHE_TTL_HOURS: float = 168.0 # Entries older than a week are re-generated
+    COMPLETION_CACHE_MEMORY_ENTRIES: int = 512
+
+    # Embedding Cache (SQLite, defaults to <repo>/data/embedding_cache.sqlite3)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = ""
+    EMBEDDING_CACHE_MAX_MB: int = 512 # ~40k vectors of text-embedding-3-large (3072 x float32)
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 1024
+
+    # RAG Ingestion (embedding request limits per batch)
+    RAG_INGEST_BATCH_SIZE: int = 256 # Texts per embeddings request (Azure accepts up to 2048 inputs)
+    RAG_INGEST_BATCH_TOKENS: int = 100000 # Token budget per embeddings request
+
+    # RAG ANN Index (partial expression index on the legal_citations collection)
+    RAG_EMBEDDING_DIMENSIONS: int = 3072 # text-embedding-3-large; above 2000 the index is built on a halfvec cast
+    RAG_INDEX_TYPE: str = "hnsw" # "hnsw", "ivfflat" or "none" (PGVector's exact search)
+    RAG_INDEX_ON_STARTUP: bool = True # Create/validate the index in a background task at startup
+    RAG_INDEX_MAINTENANCE_WORK_MEM: str = "" # e.g. "2GB" to keep an HNSW build in memory
+    RAG_HNSW_M: int = 16
+    RAG_HNSW_EF_CONSTRUCTION: int = 64
+    RAG_HNSW_EF_SEARCH: int = 40 # Default per-query candidate list (raise for recall, lower for speed)
+    RAG_IVFFLAT_LISTS: int = 0 # 0 = rows/1000 (sqrt(rows) above 1M), fixed at build time
+    RAG_IVFFLAT_PROBES: int = 10 # Default lists scanned per query
+    RAG_RETRIEVE_CONCURRENCY: int = 5 # Concurrent searches in retrieve_many (SQLAlchemy's default pool size)
+
+    # RAG Search Mode (full-text column + GIN index alongside the ANN index)
+    RAG_SEARCH_MODE: str = "vector" # "vector", "lexical" or "hybrid" (reciprocal rank fusion of both; needs tools.vector_index run once)
+    RAG_FTS_CONFIG: str = "english" # Text search configuration of the generated tsvector column
+    RAG_HYBRID_CANDIDATES: int = 20 # Candidates taken from each list before fusion
+    RAG_RRF_K: int = 60 # Reciprocal rank fusion constant
     
     # Database
     DB_USER: str
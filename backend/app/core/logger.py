@@ -1,7 +1,13 @@
+import asyncio
+import atexit
 import csv
 import logging
+import queue
+import threading
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
 
 # Setup basic Python logger for console
 logger = logging.getLogger("legal_pleadings")
@@ -13,79 +19,194 @@ if not logger.handlers:
     ch.setFormatter(formatter)
     logger.addHandler(ch)
 
+_ACTIVITY_HEADERS = ["Timestamp", "Endpoint", "Status", "Target", "Details"]
+_AI_ERROR_HEADERS = ["Timestamp", "Error"]
+_STOP = object()
+
 class ActivityLogger:
-    def __init__(self, log_dir="logs"):
+    """
+    CSV activity log with a background writer. log_event/log_ai_error only timestamp the row and put it
+    on a bounded queue; a daemon thread batches rows, keeps one append handle per file (daily files are
+    rotated when the date changes) and flushes on batch size, on the flush interval and on close().
+    When the queue is full rows are dropped and counted ('drop'), or the caller waits briefly first ('block').
+    'block' only applies to sync and worker-thread callers: on a thread running an event loop the row is
+    dropped instead, since waiting there would stall every request.
+    """
+
+    def __init__(self, log_dir="logs", queue_size: int = 10000, batch_size: int = 200,
+                 flush_interval: float = 1.0, overflow: str = "drop", block_timeout: float = 0.5):
         """Initialize the logger, creating the log directory if it doesn't exist."""
         # Calculate absolute path relative to exactly this file's position inside backend/app/core/
         self.base_dir = Path(__file__).parent.parent.parent.parent
         self.log_dir = self.base_dir / log_dir
         self.log_dir.mkdir(parents=True, exist_ok=True)
-        
-    def _get_log_filename(self) -> str:
-        """Returns the current day's log filename."""
-        today = datetime.now().strftime("%Y-%m-%d")
-        return str(self.log_dir / f"activity_log_{today}.csv")
-
-    def _ensure_headers(self, file_path: str):
-        """Ensures the CSV has headers if the file is new."""
-        path = Path(file_path)
-        if not path.exists() or path.stat().st_size == 0:
-            with open(path, mode='w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Timestamp", "Endpoint", "Status", "Target", "Details"])
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.written = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._handles: Dict[Path, Tuple[object, object]] = {} # path -> (file, csv writer)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _get_log_filename(self, when: Optional[datetime] = None) -> Path:
+        """Returns the day's log filename."""
+        day = (when or datetime.now()).strftime("%Y-%m-%d")
+        return self.log_dir / f"activity_log_{day}.csv"
+
+    # --- Producer side (hot path: no disk I/O) ---
+
+    def _ensure_writer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+                self._thread.start()
+
+    @staticmethod
+    def _on_event_loop() -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    def _enqueue(self, row: tuple):
+        self._ensure_writer()
+        try:
+            if self.overflow == "block" and not self._on_event_loop():
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Activity log queue full; {self.dropped} row(s) dropped so far")
 
     def log_event(self, endpoint: str, status: str, target: str, details: str = ""):
         """
-        Logs an event to the daily CSV file.
-        
+        Queues an event for the daily CSV file.
+
         :param endpoint: Processing endpoint (e.g., 'Extraction' or 'Generation')
         :param status: 'START', 'SUCCESS', 'ERROR'
         :param target: File path, party name, or ID
         :param details: Optional JSON or exception string
         """
-        try:
-            filename = self._get_log_filename()
-            self._ensure_headers(filename)
-            
-            # Format safely
-            timestamp = datetime.now().isoformat()
-            
-            with open(filename, mode='a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([timestamp, endpoint, status, target, details])
-                
-            # Also log to console
-            logger.info(f"[{endpoint}] {status} - {target}")
-            if details and status == "ERROR":
-                logger.error(f"Details: {details}")
-                
-        except Exception as e:
-            # Fallback to standard console logger if file op fails
-            logger.error(f"Failed to write to activity CSV log: {e}")
+        self._enqueue(("event", datetime.now(), [endpoint, status, target, details]))
+
+        # Also log to console
+        logger.info(f"[{endpoint}] {status} - {target}")
+        if details and status == "ERROR":
+            logger.error(f"Details: {details}")
 
     def log_ai_error(self, error_message: str):
         """
-        Logs strictly AI-related errors to a single CSV file, with no daily rotation.
+        Queues an AI-related error for a single CSV file, with no daily rotation.
         Columns: Timestamp, Error
         """
+        self._enqueue(("ai", datetime.now(), [error_message]))
+        logger.error(f"[AI ERROR] {error_message}")
+
+    # --- Writer thread ---
+
+    def _writer_for(self, path: Path, headers: List[str], daily: bool):
+        handle = self._handles.get(path)
+        if handle is not None:
+            return handle[1]
+        if daily:
+            # Date rolled over: release the previous day's file
+            for old in [p for p in self._handles if p.name.startswith("activity_log_")]:
+                self._handles.pop(old)[0].close()
+        f = open(path, mode='a', newline='', encoding='utf-8')
+        writer = csv.writer(f)
+        if f.tell() == 0:
+            writer.writerow(headers)
+        self._handles[path] = (f, writer)
+        return writer
+
+    def _write_batch(self, rows: List[tuple]):
         try:
-            filename = self.log_dir / "ai_error_log.csv"
-            
-            # Ensure headers only if file is fresh
-            if not filename.exists() or filename.stat().st_size == 0:
-                with open(filename, mode='w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["Timestamp", "Error"])
-                    
-            timestamp = datetime.now().isoformat()
-            
-            with open(filename, mode='a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([timestamp, error_message])
-                
-            logger.error(f"[AI ERROR] {error_message}")
+            for kind, when, fields in rows:
+                if kind == "event":
+                    writer = self._writer_for(self._get_log_filename(when), _ACTIVITY_HEADERS, daily=True)
+                else:
+                    writer = self._writer_for(self.log_dir / "ai_error_log.csv", _AI_ERROR_HEADERS, daily=False)
+                writer.writerow([when.isoformat(), *fields])
+            for f, _ in self._handles.values():
+                f.flush()
+            self.written += len(rows)
         except Exception as e:
-            logger.error(f"Failed to write to AI error CSV log: {e}")
+            # Fallback to standard console logger if file op fails; reopen files on the next batch
+            logger.error(f"Failed to write to activity CSV log: {e}")
+            self._close_handles()
+
+    def _close_handles(self):
+        for f, _ in self._handles.values():
+            try:
+                f.close()
+            except Exception:
+                pass
+        self._handles.clear()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch, taken = [], 1
+            if first is _STOP:
+                stopping = True
+            else:
+                batch.append(first)
+            while len(batch) < self.batch_size and not stopping:
+                try:
+                    row = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if row is _STOP:
+                    stopping = True
+                else:
+                    batch.append(row)
+            if batch:
+                self._write_batch(batch)
+            for _ in range(taken):
+                self._queue.task_done()
+        self._close_handles()
+
+    # --- Lifecycle ---
+
+    def flush(self):
+        """Blocks until every queued row has been written."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self, timeout: float = 5.0):
+        """Writes out the queue, closes the files and stops the writer thread (restarted by the next log call)."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error("Activity log writer did not drain before shutdown")
+            return
+        thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
 
 # Global instance
-activity_logger = ActivityLogger()
+activity_logger = ActivityLogger(
+    queue_size=settings.ACTIVITY_LOG_QUEUE_SIZE,
+    batch_size=settings.ACTIVITY_LOG_BATCH_SIZE,
+    flush_interval=settings.ACTIVITY_LOG_FLUSH_SECONDS,
+    overflow=settings.ACTIVITY_LOG_OVERFLOW,
+    block_timeout=settings.ACTIVITY_LOG_BLOCK_SECONDS,
+)
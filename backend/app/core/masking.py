@@ -0,0 +1,75 @@
+import re
+from typing import Any, Dict
+
+# Sensitive legal terms -> masked forms that pass Azure content filters.
+# Extraction masks the full list; drafting historically leaves profanity untouched.
+EXTRACTION_MASKS = {
+    'fucking': 'f*cking', 'fuck': 'f*ck', 'bitch': 'b*tch',
+    'sexual': 's-e-x-u-a-l', 'harassment': 'har*ssment',
+    'rape': 'r*pe', 'assault': 'ass*ult', 'violence': 'vi*lence',
+    'sex': 's*x', 'racial': 'rac*al', 'discrimination': 'discrim*nation',
+    'color': 'col*r', 'race': 'ra*e', 'black': 'bl*ck'
+}
+DRAFTING_MASKS = {k: v for k, v in EXTRACTION_MASKS.items() if k not in ('fucking', 'fuck', 'bitch')}
+
+def _trie_pattern(words) -> str:
+    """
+    Builds a regex alternation shaped like a prefix trie ('f\\*ck(?:ing)?' rather than 'f\\*cking|f\\*ck'),
+    so the engine rejects most positions on the first character instead of trying every term.
+    Optional suffixes are greedy, so the longest term always wins.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in node.items() if ch]
+        if not branches:
+            return ""
+        if "" in node:
+            return "(?:" + "|".join(branches) + ")?"
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+class MaskingEngine:
+    """
+    Single-pass masking/unmasking over one precompiled alternation per direction.
+    Matches are resolved with a dict lookup instead of one re.sub per term, and unmasking
+    skips any string that cannot contain a masked token.
+    """
+
+    def __init__(self, masks: Dict[str, str]):
+        self._mask_map = {k.lower(): v for k, v in masks.items()}
+        self._unmask_map = {v.lower(): k for k, v in masks.items()}
+        self._mask_re = re.compile(r'\b(?:' + _trie_pattern(self._mask_map) + r')\b', re.IGNORECASE)
+        self._unmask_re = re.compile(_trie_pattern(self._unmask_map), re.IGNORECASE)
+        # Every masked token carries at least one of these; strings without them are returned as-is
+        self._sentinels = frozenset(c for t in self._unmask_map for c in t if not c.isalnum())
+
+    def mask(self, text: str) -> str:
+        """Mask sensitive terms in one scan of `text`."""
+        return self._mask_re.sub(lambda m: self._mask_map[m.group(0).lower()], text)
+
+    def unmask_text(self, text: str) -> str:
+        """Restore masked tokens in one scan of `text`."""
+        if not any(c in text for c in self._sentinels):
+            return text
+        return self._unmask_re.sub(lambda m: self._unmask_map[m.group(0).lower()], text)
+
+    def unmask(self, obj: Any) -> Any:
+        """Recursively restore masked tokens in every string value of a dict/list structure."""
+        if isinstance(obj, str):
+            return self.unmask_text(obj)
+        if isinstance(obj, list):
+            return [self.unmask(i) for i in obj]
+        if isinstance(obj, dict):
+            return {k: self.unmask(v) for k, v in obj.items()}
+        return obj
+
+# Global instances
+extraction_masker = MaskingEngine(EXTRACTION_MASKS)
+drafting_masker = MaskingEngine(DRAFTING_MASKS)
@@ -0,0 +1,179 @@
+import contextvars
+import functools
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from app.core.logger import logger
+
+try:
+    from opentelemetry import trace
+    _tracer = trace.get_tracer("legal_pleadings")
+except ImportError: # OpenTelemetry is optional; spans are still logged with their request id
+    _tracer = None
+
+# Pipeline stages run from sub-second (RAG) to tens of minutes (Pass 1 on large scans)
+_STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800)
+_LLM_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1200)
+
+STAGE_SECONDS = Histogram("legal_pipeline_stage_seconds", "Duration of each pipeline stage", ["pipeline", "stage"], buckets=_STAGE_BUCKETS)
+PIPELINE_IN_FLIGHT = Gauge("legal_pipeline_in_flight", "Pipeline runs currently executing", ["pipeline"])
+LLM_REQUEST_SECONDS = Histogram("legal_llm_request_seconds", "Latency of individual Azure OpenAI HTTP attempts", ["deployment", "route", "status"], buckets=_LLM_BUCKETS)
+LLM_TOKENS = Counter("legal_llm_tokens_total", "Tokens reported in Azure OpenAI usage blocks", ["deployment", "kind"])
+LLM_IN_FLIGHT = Gauge("legal_llm_in_flight", "Azure OpenAI requests currently on the wire", ["deployment"])
+
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def current_request_id() -> str:
+    return _request_id.get()
+
+@contextmanager
+def request_context(request_id: Optional[str] = None):
+    """Binds a request id to everything (including spawned tasks) run inside the block."""
+    token = _request_id.set(request_id or new_request_id())
+    try:
+        yield _request_id.get()
+    finally:
+        _request_id.reset(token)
+
+def _start_span(name: str, attributes: Dict[str, Any]):
+    if _tracer is None:
+        return None
+    return _tracer.start_span(name, attributes={**attributes, "request_id": current_request_id()})
+
+def _end_span(span, name: str, seconds: float, status: str):
+    if span is not None:
+        span.set_attribute("status", status)
+        span.end()
+    logger.info(f"[Span] request_id={current_request_id()} {name} {seconds * 1000:.0f}ms {status}")
+
+class StageTimer:
+    """
+    Times consecutive stages of one pipeline run: enter() closes the running stage and opens the next,
+    close() ends the run. Each stage is observed in the stage histogram and emitted as a span.
+    """
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self._stage: Optional[str] = None
+        self._started = 0.0
+        self._span = None
+        self._closed = False
+        PIPELINE_IN_FLIGHT.labels(pipeline).inc()
+
+    def _finish(self, status: str):
+        if self._stage is None:
+            return
+        seconds = time.monotonic() - self._started
+        STAGE_SECONDS.labels(self.pipeline, self._stage).observe(seconds)
+        _end_span(self._span, f"{self.pipeline}.{self._stage}", seconds, status)
+        self._stage = self._span = None
+
+    def enter(self, stage: str):
+        self._finish("ok")
+        self._stage = stage
+        self._started = time.monotonic()
+        self._span = _start_span(f"{self.pipeline}.{stage}", {"pipeline": self.pipeline, "stage": stage})
+
+    def close(self, error: Optional[BaseException] = None):
+        if self._closed:
+            return
+        self._closed = True
+        self._finish("error" if error else "ok")
+        PIPELINE_IN_FLIGHT.labels(self.pipeline).dec()
+
+@contextmanager
+def stage_span(pipeline: str, stage: str):
+    """Times one stage that runs concurrently with others (e.g. a drafting module)."""
+    started = time.monotonic()
+    span = _start_span(f"{pipeline}.{stage}", {"pipeline": pipeline, "stage": stage})
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        seconds = time.monotonic() - started
+        STAGE_SECONDS.labels(pipeline, stage).observe(seconds)
+        _end_span(span, f"{pipeline}.{stage}", seconds, status)
+
+def timed_stage(pipeline: str, stage: str):
+    """Decorator form of stage_span for async functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with stage_span(pipeline, stage):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+async def timed_call(pipeline: str, stage: str, awaitable):
+    """Awaits `awaitable` inside a stage span; for call sites where the stage name is only known at runtime."""
+    with stage_span(pipeline, stage):
+        return await awaitable
+
+def observe_llm_call(deployment: str, route: str, status: Any, seconds: float, usage: Optional[Dict[str, Any]] = None):
+    LLM_REQUEST_SECONDS.labels(deployment, route, str(status)).observe(seconds)
+    if usage:
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                LLM_TOKENS.labels(deployment, kind.split("_")[0]).inc(usage[kind])
+
+class SnapshotCollector:
+    """Exposes the caches', rate limiter's and retry policy's own counters at scrape time."""
+
+    def __init__(self):
+        self.caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self.retry_snapshot: Optional[Callable[[], Dict[str, Dict[str, Any]]]] = None
+        self.limiter_snapshot: Optional[Callable[[], Dict[str, Dict[str, Any]]]] = None
+
+    def collect(self):
+        hits = CounterMetricFamily("legal_cache_hits", "Cache hits since process start", labels=["cache"])
+        misses = CounterMetricFamily("legal_cache_misses", "Cache misses since process start", labels=["cache"])
+        ratio = GaugeMetricFamily("legal_cache_hit_ratio", "Cache hit ratio since process start", labels=["cache"])
+        entries = GaugeMetricFamily("legal_cache_entries", "Entries in the on-disk cache tier", labels=["cache"])
+        size = GaugeMetricFamily("legal_cache_bytes", "Bytes in the on-disk cache tier", labels=["cache"])
+        for name, stats_fn in self.caches.items():
+            try:
+                stats = stats_fn()
+            except Exception as e:
+                logger.warning(f"[Metrics] {name} stats unavailable: {e}")
+                continue
+            hits.add_metric([name], stats.get("hits", 0))
+            misses.add_metric([name], stats.get("misses", 0))
+            ratio.add_metric([name], stats.get("hit_ratio", 0.0))
+            entries.add_metric([name], stats.get("entries", 0))
+            size.add_metric([name], stats.get("bytes", 0))
+        yield from (hits, misses, ratio, entries, size)
+
+        if self.retry_snapshot is not None:
+            events = CounterMetricFamily("legal_llm_retry_events", "Retry policy events (retries, breaker trips, statuses)", labels=["deployment", "event"])
+            breaker = GaugeMetricFamily("legal_llm_breaker_open", "1 while a deployment's circuit breaker is open or half-open", labels=["deployment"])
+            for deployment, counters in self.retry_snapshot().items():
+                for event, value in counters.items():
+                    if event == "breaker_state":
+                        breaker.add_metric([deployment], 0 if value == "closed" else 1)
+                    else:
+                        events.add_metric([deployment, event], value)
+            yield from (events, breaker)
+
+        if self.limiter_snapshot is not None:
+            limiter = GaugeMetricFamily("legal_llm_limiter", "Rate limiter bucket state per deployment", labels=["deployment", "field"])
+            for deployment, fields in self.limiter_snapshot().items():
+                for field, value in fields.items():
+                    limiter.add_metric([deployment, field], value)
+            yield limiter
+
+def render_latest() -> tuple:
+    """(body, content_type) for the /metrics route."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+# Global instance
+snapshot_collector = SnapshotCollector()
+REGISTRY.register(snapshot_collector)
@@ -2,17 +2,33 @@
 from langchain_openai import AzureOpenAIEmbeddings
 from langchain_postgres import PGVector
 from app.core.config import settings
+from app.core.logger import activity_logger, logger
+from app.services.embedding_cache import CachedEmbeddings, embedding_store
+import asyncio
+import math
+import re
 import urllib.parse
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from sqlalchemy import text
+
+EMBEDDING_MODEL = "text-embedding-3-large"
 
 # Initialize Embeddings
-embeddings = AzureOpenAIEmbeddings(
-    azure_deployment="text-embedding-3-large",
+azure_embeddings = AzureOpenAIEmbeddings(
+    azure_deployment=EMBEDDING_MODEL,
     openai_api_version="2023-05-15",
     azure_endpoint=settings.AZURE_OPENAI_EMBEDDING_ENDPOINT,
     api_key=settings.AZURE_OPENAI_EMBEDDING_API_KEY,
     request_timeout=1200, # Standardized 20-minute timeout
 )
 
+# Repeated texts (drafting's category queries, re-ingested chunks) are served from the embedding cache
+embeddings = (
+    CachedEmbeddings(azure_embeddings, model=EMBEDDING_MODEL, store=embedding_store)
+    if settings.EMBEDDING_CACHE_ENABLED else azure_embeddings
+)
+
 from sqlalchemy.ext.asyncio import create_async_engine
 
 # Build connection URI with search_path forced to Legal_Pleadings
@@ -32,17 +48,348 @@ engine = create_async_engine(
     }
 )
 
+VECTOR_SCHEMA = "Legal_Pleadings"
+COLLECTION_NAME = "legal_citations"
+
 vector_store = PGVector(
     embeddings=embeddings,
-    collection_name="legal_citations",
+    collection_name=COLLECTION_NAME,
     connection=engine,
     use_jsonb=True,
     create_extension=False,
 )
 
-async def init_vector_store():
+# --- ANN index management ---
+# PGVector's own queries order by `embedding <=> :q` on an untyped column, which no ANN index can serve.
+# The index below is a per-collection partial expression index on the embedding cast to a fixed width
+# (halfvec above pgvector's 2000-dimension limit for vector indexes), and ann_search_by_vector() issues the
+# matching ORDER BY so the planner can use it.
+
+_collection_ids: Dict[str, str] = {}
+_index_tasks: Dict[str, "asyncio.Task"] = {}
+
+def _index_expression() -> Tuple[str, str, str]:
+    """(indexed expression, its type, cosine operator class) for the configured embedding width."""
+    dims = settings.RAG_EMBEDDING_DIMENSIONS
+    column_type = f"halfvec({dims})" if dims > 2000 else f"vector({dims})"
+    opclass = "halfvec_cosine_ops" if dims > 2000 else "vector_cosine_ops"
+    return f"(embedding::{column_type})", column_type, opclass
+
+def index_name(collection_name: str = COLLECTION_NAME, index_type: Optional[str] = None) -> str:
+    safe = re.sub(r"[^a-z0-9_]", "_", collection_name.lower())
+    return f"ix_{safe}_{index_type or settings.RAG_INDEX_TYPE}"[:63]
+
+def _ivfflat_lists(rows: int) -> int:
+    """pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond."""
+    if settings.RAG_IVFFLAT_LISTS > 0:
+        return settings.RAG_IVFFLAT_LISTS
+    return max(10, rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows)))
+
+async def _collection_id(conn, collection_name: str) -> Optional[str]:
+    if collection_name not in _collection_ids:
+        row = (await conn.execute(
+            text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"), {"name": collection_name}
+        )).first()
+        if row is None:
+            return None
+        _collection_ids[collection_name] = str(row[0])
+    return _collection_ids[collection_name]
+
+async def _index_state(conn, name: str) -> Optional[Tuple[bool, str]]:
+    """(indisvalid, definition) of an index in the vector schema, or None if it does not exist."""
+    return (await conn.execute(text(
+        "SELECT i.indisvalid, pg_get_indexdef(i.indexrelid) FROM pg_index i"
+        " JOIN pg_class c ON c.oid = i.indexrelid JOIN pg_namespace n ON n.oid = c.relnamespace"
+        " WHERE n.nspname = :schema AND c.relname = :name"
+    ), {"schema": VECTOR_SCHEMA, "name": name})).first()
+
+async def index_status(collection_name: str = COLLECTION_NAME) -> Dict[str, Any]:
+    """Collection row count plus name, validity and definition of its ANN index (if any)."""
+    name = index_name(collection_name)
+    async with engine.connect() as conn:
+        collection_id = await _collection_id(conn, collection_name)
+        rows = 0
+        if collection_id:
+            rows = (await conn.execute(
+                text("SELECT COUNT(*) FROM langchain_pg_embedding WHERE collection_id = :cid"), {"cid": collection_id}
+            )).scalar()
+        found = await _index_state(conn, name)
+    return {
+        "collection": collection_name,
+        "collection_id": collection_id,
+        "rows": rows,
+        "index": name,
+        "type": settings.RAG_INDEX_TYPE,
+        "exists": found is not None,
+        "valid": bool(found and found[0]),
+        "definition": found[1] if found else None,
+    }
+
+def _build_options(rows: int) -> str:
+    if settings.RAG_INDEX_TYPE == "hnsw":
+        return f"m = {settings.RAG_HNSW_M}, ef_construction = {settings.RAG_HNSW_EF_CONSTRUCTION}"
+    return f"lists = {_ivfflat_lists(rows)}"
+
+async def ensure_index(collection_name: str = COLLECTION_NAME, rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Creates the collection's ANN index if it is missing, invalid (an interrupted CONCURRENTLY build)
+    or built with different parameters, then checks that the planner uses it for ann_search_by_vector().
+    """
+    if settings.RAG_INDEX_TYPE not in ("hnsw", "ivfflat"):
+        return {"collection": collection_name, "type": settings.RAG_INDEX_TYPE, "skipped": "index disabled"}
+    status = await index_status(collection_name)
+    if not status["collection_id"]:
+        return {**status, "skipped": "collection does not exist yet"}
+
+    if settings.RAG_INDEX_TYPE == "ivfflat" and not status["rows"]:
+        return {**status, "skipped": "IVFFlat lists are trained on existing rows; ingest first"}
+
+    expression, column_type, opclass = _index_expression()
+    options = _build_options(status["rows"])
+    definition = (status["definition"] or "").replace(" ", "").replace("'", "")
+    # IVFFlat lists are derived from the row count at build time; only rebuild it on request
+    stale = status["exists"] and (
+        f"USING{settings.RAG_INDEX_TYPE}" not in definition
+        or column_type not in definition
+        or opclass not in definition
+        or (settings.RAG_INDEX_TYPE == "hnsw" and options.replace(" ", "") not in definition)
+    )
+    created = False
+    dropped = []
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        # An index left from a previous RAG_INDEX_TYPE still costs writes and can still be picked by the planner
+        for other in ("hnsw", "ivfflat"):
+            leftover = index_name(collection_name, other)
+            if other != settings.RAG_INDEX_TYPE and await _index_state(conn, leftover) is not None:
+                logger.info(f"[Vector Index] Dropping {leftover} (RAG_INDEX_TYPE is now {settings.RAG_INDEX_TYPE})")
+                await conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{VECTOR_SCHEMA}"."{leftover}"'))
+                dropped.append(leftover)
+    if rebuild or stale or (status["exists"] and not status["valid"]) or not status["exists"]:
+        qualified = f'"{VECTOR_SCHEMA}"."{status["index"]}"'
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            if status["exists"]:
+                logger.info(f"[Vector Index] Dropping {status['index']} (rebuild={rebuild}, stale={stale}, valid={status['valid']})")
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {qualified}"))
+            if settings.RAG_INDEX_MAINTENANCE_WORK_MEM:
+                await conn.execute(text(f"SET maintenance_work_mem = '{settings.RAG_INDEX_MAINTENANCE_WORK_MEM}'"))
+            logger.info(f"[Vector Index] Building {settings.RAG_INDEX_TYPE} index {status['index']} on {status['rows']} rows ({options})")
+            await conn.execute(text(
+                f'CREATE INDEX CONCURRENTLY {qualified} ON "{VECTOR_SCHEMA}".langchain_pg_embedding'
+                f" USING {settings.RAG_INDEX_TYPE} ({expression} {opclass}) WITH ({options})"
+                f" WHERE collection_id = '{status['collection_id']}'"
+            ))
+        created = True
+        status = await index_status(collection_name)
+
+    # Validate: with sequential scans priced out, the ANN query for this collection must be able to use the index
+    dims = settings.RAG_EMBEDDING_DIMENSIONS
+    probe = "[" + ",".join(["0"] * (dims - 1) + ["1"]) + "]"
+    async with engine.connect() as conn:
+        await conn.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = (await conn.execute(text("EXPLAIN " + _ann_sql(status["collection_id"])), {"q": probe, "k": 5})).scalars().all()
+    status["uses_index"] = any(status["index"] in line for line in plan)
+    status["created"] = created
+    status["dropped"] = dropped
+    if not status["valid"] or not status["uses_index"]:
+        logger.warning(f"[Vector Index] {status['index']} valid={status['valid']} uses_index={status['uses_index']}; searches may fall back to a sequential scan")
+    else:
+        logger.info(f"[Vector Index] {status['index']} ready on {status['rows']} rows")
+    return status
+
+def _ann_sql(collection_id: str) -> str:
+    expression, column_type, _ = _index_expression()
+    # The collection id is inlined (it comes from langchain_pg_collection) so the partial index predicate matches
+    return (
+        f"SELECT id, document, cmetadata, {expression} <=> CAST(:q AS {column_type}) AS distance"
+        f" FROM langchain_pg_embedding WHERE collection_id = '{collection_id}'"
+        f" ORDER BY distance LIMIT :k"
+    )
+
+async def ann_search_by_vector(vector: List[float], k: int = 4, collection_name: str = COLLECTION_NAME,
+                               ef_search: Optional[int] = None, probes: Optional[int] = None) -> List[Tuple[Document, float]]:
+    """
+    (Document, cosine distance) pairs for the k nearest rows, served by the ANN index.
+    `ef_search` (HNSW) and `probes` (IVFFlat) trade recall for speed on this query only.
+    """
+    if settings.RAG_INDEX_TYPE not in ("hnsw", "ivfflat") and collection_name == COLLECTION_NAME:
+        return await vector_store.asimilarity_search_with_score_by_vector(vector, k=k)
+    async with engine.connect() as conn:
+        collection_id = await _collection_id(conn, collection_name)
+        if collection_id is None:
+            return []
+        # SET LOCAL scopes the knobs to this connection's (auto-begun) transaction; values are ints so inlining is safe
+        await conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search or settings.RAG_HNSW_EF_SEARCH)}"))
+        await conn.execute(text(f"SET LOCAL ivfflat.probes = {int(probes or settings.RAG_IVFFLAT_PROBES)}"))
+        rows = (await conn.execute(
+            text(_ann_sql(collection_id)), {"q": "[" + ",".join(map(str, vector)) + "]", "k": k}
+        )).all()
+    return [(Document(id=row[0], page_content=row[1] or "", metadata=row[2] or {}), float(row[3])) for row in rows]
+
+# --- Full-text search ---
+# Exact citations ("M.G.L. c. 151B", "42 U.S.C. § 2000e") and case names embed poorly, so rows also carry a
+# generated tsvector over law_cited (weight A) and the page content (weight B), with a per-collection GIN index.
+
+TSV_COLUMN = "search_tsv"
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+def fts_index_name(collection_name: str = COLLECTION_NAME) -> str:
+    return index_name(collection_name, "fts")
+
+def _tsv_expression() -> str:
+    config = settings.RAG_FTS_CONFIG
+    return (
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce(cmetadata->>'law_cited', '')), 'A')"
+        f" || setweight(to_tsvector('{config}'::regconfig, coalesce(document, '')), 'B')"
+    )
+
+async def ensure_text_search(collection_name: str = COLLECTION_NAME, rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Adds the generated tsvector column to the embedding table (a one-off table rewrite; re-added when
+    RAG_FTS_CONFIG changes or on `rebuild`) and the collection's GIN index if missing or invalid.
+    A migration, so it runs from tools.vector_index rather than the app lifespan.
+    """
+    name = fts_index_name(collection_name)
+    async with engine.connect() as conn:
+        collection_id = await _collection_id(conn, collection_name)
+        column = (await conn.execute(text(
+            "SELECT generation_expression FROM information_schema.columns"
+            " WHERE table_schema = :schema AND table_name = 'langchain_pg_embedding' AND column_name = :column"
+        ), {"schema": VECTOR_SCHEMA, "column": TSV_COLUMN})).first()
+        found = await _index_state(conn, name)
+    if collection_id is None:
+        return {"collection": collection_name, "index": name, "skipped": "collection does not exist yet"}
+
+    stale = column is not None and f"'{settings.RAG_FTS_CONFIG}'" not in (column[0] or "")
+    table = f'"{VECTOR_SCHEMA}".langchain_pg_embedding'
+    qualified = f'"{VECTOR_SCHEMA}"."{name}"'
+    created = False
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if column is None or stale or rebuild:
+            logger.info(f"[Text Search] {'Re-adding' if column is not None else 'Adding'} {TSV_COLUMN} ({settings.RAG_FTS_CONFIG}) on {table}")
+            await conn.execute(text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {TSV_COLUMN}"))
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {TSV_COLUMN} tsvector GENERATED ALWAYS AS ({_tsv_expression()}) STORED"))
+            found = None # dropping the column dropped its indexes
+        if found is not None and not found[0]:
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {qualified}"))
+            found = None
+        if found is None:
+            logger.info(f"[Text Search] Building GIN index {name}")
+            await conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY {qualified} ON {table} USING gin ({TSV_COLUMN})"
+                f" WHERE collection_id = '{collection_id}'"
+            ))
+            created = True
+        found = await _index_state(conn, name)
+    return {"collection": collection_name, "index": name, "config": settings.RAG_FTS_CONFIG,
+            "valid": bool(found and found[0]), "created": created}
+
+def _lexical_sql(collection_id: str) -> str:
+    # plainto_tsquery ANDs every term; OR-ing them lets ts_rank_cd rank partial matches of long queries
+    return (
+        f"SELECT id, document, cmetadata, ts_rank_cd({TSV_COLUMN}, q.query) AS rank"
+        f" FROM langchain_pg_embedding,"
+        f" (SELECT CAST(replace(CAST(plainto_tsquery(CAST(:config AS regconfig), :q) AS text), '&', '|') AS tsquery) AS query) AS q"
+        f" WHERE collection_id = '{collection_id}' AND {TSV_COLUMN} @@ q.query"
+        f" ORDER BY rank DESC LIMIT :k"
+    )
+
+async def lexical_search(query: str, k: int = 4, collection_name: str = COLLECTION_NAME) -> List[Tuple[Document, float]]:
+    """(Document, ts_rank_cd) pairs for the k best full-text matches, served by the GIN index."""
+    async with engine.connect() as conn:
+        collection_id = await _collection_id(conn, collection_name)
+        if collection_id is None:
+            return []
+        rows = (await conn.execute(
+            text(_lexical_sql(collection_id)), {"config": settings.RAG_FTS_CONFIG, "q": query, "k": k}
+        )).all()
+    return [(Document(id=row[0], page_content=row[1] or "", metadata=row[2] or {}), float(row[3])) for row in rows]
+
+def reciprocal_rank_fusion(ranked_lists: List[List[Tuple[Document, float]]], k: int, rrf_k: int = 60) -> List[Tuple[Document, float]]:
+    """Fuses ranked result lists: each document scores sum(1 / (rrf_k + rank)) over the lists it appears in."""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for results in ranked_lists:
+        for rank, (doc, _) in enumerate(results, start=1):
+            key = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    ordered = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [(documents[key], round(scores[key], 6)) for key in ordered]
+
+async def search(query: str, k: int = 4, mode: Optional[str] = None, vector: Optional[List[float]] = None,
+                 collection_name: str = COLLECTION_NAME, ef_search: Optional[int] = None,
+                 probes: Optional[int] = None) -> List[Tuple[Document, float]]:
+    """
+    Top-k (Document, score) pairs for `query` in one of SEARCH_MODES (default RAG_SEARCH_MODE):
+    vector  - cosine distance, lower is closer (`vector` skips embedding the query again)
+    lexical - ts_rank_cd, higher is better
+    hybrid  - reciprocal rank fusion of both candidate lists, higher is better; vector-only if full-text search is unavailable
+    """
+    mode = mode or settings.RAG_SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}'; expected one of {', '.join(SEARCH_MODES)}")
+    if mode == "lexical":
+        return await lexical_search(query, k, collection_name)
+    if vector is None:
+        vector = await embeddings.aembed_query(query)
+    if mode == "vector":
+        return await ann_search_by_vector(vector, k, collection_name, ef_search, probes)
+
+    candidates = max(k, settings.RAG_HYBRID_CANDIDATES)
+    dense, sparse = await asyncio.gather(
+        ann_search_by_vector(vector, candidates, collection_name, ef_search, probes),
+        lexical_search(query, candidates, collection_name),
+        return_exceptions=True
+    )
+    if isinstance(dense, BaseException):
+        raise dense
+    if isinstance(sparse, BaseException):
+        logger.warning(f"[Hybrid Search] Full-text search unavailable, using vector results only: {sparse}")
+        # Still fused, so scores keep hybrid's meaning (higher is better) rather than turning into distances
+        return reciprocal_rank_fusion([dense], k, settings.RAG_RRF_K)
+    return reciprocal_rank_fusion([dense, sparse], k, settings.RAG_RRF_K)
+
+async def init_vector_store(rebuild: bool = False) -> Dict[str, Any]:
     """
-    Initializes the vector store tables inside Legal_Pleadings schema.
+    Initializes the vector store tables inside Legal_Pleadings schema and the collection's ANN index.
+    The full-text search column is added separately by ensure_text_search (see tools.vector_index).
     Requires: 'vector' extension enabled and Legal_Pleadings schema created first.
     """
-    pass
+    await vector_store.acreate_tables_if_not_exists()
+    await vector_store.acreate_collection()
+    return await ensure_index(COLLECTION_NAME, rebuild=rebuild)
+
+async def _build_in_background(collection_name: str, rebuild: bool):
+    try:
+        if collection_name == COLLECTION_NAME:
+            await init_vector_store(rebuild=rebuild)
+        else:
+            await ensure_index(collection_name, rebuild=rebuild)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Search still works without the index (sequential scan)
+        activity_logger.log_event("VectorIndex", "ERROR", collection_name, f"Index check failed: {e}")
+
+def schedule_index_build(collection_name: str = COLLECTION_NAME, rebuild: bool = False) -> "asyncio.Task":
+    """
+    Runs the index check/build for a collection as a background task (one at a time per collection), so
+    app startup and ingest requests never wait on an HNSW build. Searches use a sequential scan until it is done.
+    """
+    task = _index_tasks.get(collection_name)
+    if task is None or task.done():
+        task = asyncio.create_task(_build_in_background(collection_name, rebuild), name=f"vector-index-{collection_name}")
+        _index_tasks[collection_name] = task
+    return task
+
+async def cancel_index_builds():
+    """Stops running index tasks on shutdown; an interrupted CONCURRENTLY build is left invalid and rebuilt next time."""
+    tasks = [t for t in _index_tasks.values() if not t.done()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _index_tasks.clear()
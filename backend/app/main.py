@@ -7,16 +7,59 @@ _HERE = Path(__file__).parent.parent
 if str(_HERE) not in sys.path:
     sys.path.insert(0, str(_HERE))
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 import json
 from app.core.config import settings
-from app.api.api_v1.endpoints import rag, extraction, generation, drafting_generator
+from app.api.api_v1.endpoints import rag, extraction, generation, drafting_generator, jobs
 from app.core.logger import activity_logger
+from app.services.job_queue import job_manager
+from app.db.vector_store import cancel_index_builds, schedule_index_build
+from app.services import page_renderer
+from app.services.llm_gateway import llm_gateway
+from app.services.rate_limiter import rate_limiter
+from app.services.retry_policy import retry_policy
+from app.services.ocr_cache import ocr_cache
+from app.services.completion_cache import completion_cache
+from app.services.embedding_cache import embedding_store
+from app.core.metrics import request_context, render_latest, snapshot_collector
 
-app = FastAPI(title=settings.PROJECT_NAME)
+# Cache, retry and limiter counters are read from their owners at scrape time
+snapshot_collector.caches["ocr_pages"] = ocr_cache.stats
+snapshot_collector.caches["llm_completions"] = completion_cache.stats
+snapshot_collector.caches["embeddings"] = embedding_store.stats
+snapshot_collector.retry_snapshot = retry_policy.snapshot
+snapshot_collector.limiter_snapshot = rate_limiter.snapshot
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: open the shared LLM connection pool, start the ANN index check in the background, then resume durable jobs
+    await llm_gateway.start()
+    if settings.RAG_INDEX_ON_STARTUP:
+        schedule_index_build()
+    await job_manager.start()
+    yield
+    # Shutdown: stop workers; in-flight jobs are re-queued on next start
+    await job_manager.stop()
+    await cancel_index_builds()
+    page_renderer.shutdown_executor()
+    await llm_gateway.aclose()
+    # Write out any queued activity log rows
+    await asyncio.to_thread(activity_logger.close)
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
+
+@app.middleware("http")
+async def bind_request_id(request: Request, call_next):
+    """Tags every span and log line of a request with one id (client-supplied X-Request-ID or a new one)."""
+    with request_context(request.headers.get("x-request-id")) as request_id:
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -48,11 +91,23 @@ app.include_router(rag.router, prefix=f"{settings.API_V1_STR}/rag", tags=["RAG"]
 app.include_router(extraction.router, prefix=f"{settings.API_V1_STR}/extraction", tags=["Extraction"])
 app.include_router(generation.router, prefix=f"{settings.API_V1_STR}/generation", tags=["Generation"])
 app.include_router(drafting_generator.router, prefix=f"{settings.API_V1_STR}/drafting", tags=["Drafting"])
+app.include_router(jobs.router, prefix=f"{settings.API_V1_STR}/jobs", tags=["Jobs"])
 
 @app.get("/")
 def read_root():
     return {"message": f"Welcome to {settings.PROJECT_NAME}"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/llm/status")
+def llm_status():
+    """Per-deployment rate limiter state, retry counters and circuit breaker state."""
+    return {"rate_limiter": rate_limiter.snapshot(), "retry_policy": retry_policy.snapshot(), "activity_log": activity_logger.stats()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,264 @@
+import atexit
+import contextvars
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.logger import logger
+
+# Default location: <repo>/data/completion_cache.sqlite3 (next to the OCR page cache)
+_DEFAULT_DB_PATH = Path(__file__).parent.parent.parent.parent / "data" / "completion_cache.sqlite3"
+
+# Response body goes last so size/last_access never sit behind its overflow pages (see embedding_cache)
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS completions ("
+    " key TEXT PRIMARY KEY, size INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL,"
+    " hit_count INTEGER NOT NULL DEFAULT 0, body TEXT NOT NULL)"
+)
+
+# Hits only bump last_access in memory; the batch is written when it grows this large or this old
+_ACCESS_FLUSH_ROWS = 500
+_ACCESS_FLUSH_SECONDS = 30.0
+_EXPIRY_SWEEP_SECONDS = 300.0
+
+class CacheScope:
+    """Per-request cache settings and counters; shared by every task spawned inside the scope."""
+
+    def __init__(self, bypass: bool = False):
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return round(self.hits / lookups, 3) if lookups else 0.0
+
+_current_scope: contextvars.ContextVar[Optional[CacheScope]] = contextvars.ContextVar("completion_cache_scope", default=None)
+
+@contextmanager
+def cache_scope(bypass: bool = False):
+    """
+    Opts the enclosed LLM calls into the completion cache. With `bypass` the cache is not read,
+    but fresh completions are still written so the next run benefits.
+    """
+    scope = CacheScope(bypass)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+def current_scope() -> Optional[CacheScope]:
+    return _current_scope.get()
+
+def cacheable_body(body: str) -> bool:
+    """
+    Only complete answers are cached: every choice finished with "stop" and has content. A truncated
+    ("length") or filtered ("content_filter") answer would otherwise be replayed for every identical request.
+    """
+    try:
+        choices = json.loads(body).get("choices")
+    except (ValueError, AttributeError):
+        return False
+    if not isinstance(choices, list) or not choices:
+        return False
+    for choice in choices:
+        if not isinstance(choice, dict) or choice.get("finish_reason") != "stop":
+            return False
+        content = (choice.get("message") or {}).get("content")
+        if not isinstance(content, str) or not content.strip():
+            return False
+    return True
+
+class CompletionCache:
+    """
+    Two-tier cache of successful chat completion response bodies: an in-process LRU in front of a
+    SQLite store with a TTL and LRU eviction beyond the byte / entry budget. Entry count and byte total
+    are read once at startup and then kept up to date by put/evict; hits are batched.
+    """
+
+    def __init__(self, db_path: Path, max_bytes: int, max_entries: int, ttl_seconds: float, memory_entries: int):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict() # key -> (body, created_at)
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_table()
+        self.entries, self.bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+        self._touched: Dict[str, Tuple[float, int]] = {} # key -> (last access, hits since the last flush)
+        self._last_access_flush = time.monotonic()
+        self._last_expiry_sweep = 0.0
+        atexit.register(self.flush_access)
+
+    def _create_table(self):
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(completions)")]
+        if columns and columns[-1] != "body":
+            # Cache files from before the body moved last: copy once into the new layout
+            self._conn.execute("ALTER TABLE completions RENAME TO completions_old")
+            self._conn.execute(_SCHEMA)
+            self._conn.execute(
+                "INSERT INTO completions (key, size, created_at, last_access, hit_count, body)"
+                " SELECT key, size, created_at, last_access, hit_count, body FROM completions_old"
+            )
+            self._conn.execute("DROP TABLE completions_old")
+        else:
+            self._conn.execute(_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_completions_last_access ON completions (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(deployment: str, payload: Dict[str, Any]) -> str:
+        """Deployment plus a hash of everything in the payload that changes the completion."""
+        messages_hash = hashlib.sha256(
+            json.dumps(payload.get("messages") or [], sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        parts = [
+            deployment,
+            messages_hash,
+            str(payload.get("temperature")),
+            json.dumps(payload.get("response_format"), sort_keys=True),
+            str(payload.get("max_completion_tokens") or payload.get("max_tokens")),
+        ]
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, body: str, created_at: float):
+        self._memory[key] = (body, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _touch(self, key: str):
+        self._touched[key] = (time.time(), self._touched.get(key, (0.0, 0))[1] + 1)
+        if len(self._touched) >= _ACCESS_FLUSH_ROWS or time.monotonic() - self._last_access_flush >= _ACCESS_FLUSH_SECONDS:
+            self._flush_access()
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response body, or None on a miss or an expired entry."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[1]):
+                self._memory.move_to_end(key)
+                self._touch(key)
+                self.hits += 1
+                return entry[0]
+            self._memory.pop(key, None)
+
+            row = self._conn.execute("SELECT created_at, size, body FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None or self._expired(row[0]):
+                if row is not None:
+                    self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._touched.pop(key, None)
+                    self.entries -= 1
+                    self.bytes -= row[1]
+                self.misses += 1
+                return None
+            self._remember(key, row[2], row[0])
+            self._touch(key)
+            self.hits += 1
+            return row[2]
+
+    def put(self, key: str, body: str):
+        """Stores a response body in both tiers and evicts beyond the configured budget."""
+        if not body:
+            return
+        now = time.time()
+        size = len(body.encode("utf-8"))
+        with self._lock:
+            self._remember(key, body, now)
+            replaced = self._conn.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, size, created_at, last_access, hit_count, body) VALUES (?, ?, ?, ?, 0, ?)",
+                (key, size, now, now, body)
+            )
+            self._touched.pop(key, None)
+            self.entries += 0 if replaced else 1
+            self.bytes += size - (replaced[0] if replaced else 0)
+            self._evict(now)
+            self._conn.commit()
+
+    def _flush_access(self):
+        """Writes the batched last_access/hit_count bumps (caller holds the lock and commits)."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE completions SET last_access = ?, hit_count = hit_count + ? WHERE key = ?",
+                [(when, hits, key) for key, (when, hits) in self._touched.items()]
+            )
+            self._touched.clear()
+        self._last_access_flush = time.monotonic()
+
+    def flush_access(self):
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+
+    def _drop(self, key: str, size: int):
+        self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+        self._memory.pop(key, None)
+        self._touched.pop(key, None)
+        self.entries -= 1
+        self.bytes -= size
+
+    def _evict(self, now: float):
+        expired = 0
+        # Expired rows are also dropped lazily by get(); the full sweep only runs every few minutes
+        if self.ttl_seconds > 0 and time.monotonic() - self._last_expiry_sweep >= _EXPIRY_SWEEP_SECONDS:
+            self._last_expiry_sweep = time.monotonic()
+            for key, size in self._conn.execute(
+                "SELECT key, size FROM completions WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).fetchall():
+                self._drop(key, size)
+                expired += 1
+        evicted = 0
+        if self.entries > self.max_entries or self.bytes > self.max_bytes:
+            # Recent hits must be on disk before they are ranked
+            self._flush_access()
+            for key, size in self._conn.execute("SELECT key, size FROM completions ORDER BY last_access ASC").fetchall():
+                if self.entries <= self.max_entries and self.bytes <= self.max_bytes:
+                    break
+                self._drop(key, size)
+                evicted += 1
+        if expired or evicted:
+            logger.info(f"[Completion Cache] Dropped {expired} expired and {evicted} LRU entries; {self.entries} entries / {self.bytes} bytes remain")
+
+    def stats(self) -> dict:
+        """Process-lifetime hit/miss counters plus the current footprint of both tiers."""
+        with self._lock:
+            count, total = self.entries, self.bytes
+            memory = len(self._memory)
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": memory,
+            "entries": count,
+            "bytes": total
+        }
+
+# Global instance
+completion_cache = CompletionCache(
+    db_path=Path(settings.COMPLETION_CACHE_PATH) if settings.COMPLETION_CACHE_PATH else _DEFAULT_DB_PATH,
+    max_bytes=settings.COMPLETION_CACHE_MAX_MB * 1024 * 1024,
+    max_entries=settings.COMPLETION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.COMPLETION_CACHE_TTL_HOURS * 3600,
+    memory_entries=settings.COMPLETION_CACHE_MEMORY_ENTRIES,
+)
@@ -0,0 +1,174 @@
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+# Generic placeholders the structuring model emits instead of real allegations
+_NOISE_TEXTS = {"name", "none", "n/a", "date"}
+_DEFAULT_PROOFS = ["Personnel file", "Policy documentation"]
+
+# One-permutation MinHash / LSH layout: 64 bins in 16 bands x 4 rows puts the candidate cut-off near
+# 0.5 Jaccard, comfortably below any useful merge threshold, so near-duplicates are not missed.
+_NUM_BINS = 64
+_BANDS = 16
+_ROWS = _NUM_BINS // _BANDS
+_SHINGLE_SIZE = 5
+_EMPTY_BIN = 1 << 32
+
+_MONTHS = {"jan", "january", "feb", "february", "mar", "march", "apr", "april", "may", "jun", "june", "jul", "july",
+           "aug", "august", "sep", "sept", "september", "oct", "october", "nov", "november", "dec", "december"}
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text.lower())).strip()
+
+def _shingles(norm_text: str) -> set:
+    """Character k-grams; robust to the small rewordings adjacent chunks produce."""
+    if len(norm_text) <= _SHINGLE_SIZE:
+        return {norm_text}
+    return {norm_text[i:i + _SHINGLE_SIZE] for i in range(len(norm_text) - _SHINGLE_SIZE + 1)}
+
+def _minhash(shingles: set) -> List[int]:
+    """Each shingle is hashed once and only competes for the minimum of its own bin."""
+    signature = [_EMPTY_BIN] * _NUM_BINS
+    for s in shingles:
+        h = zlib.crc32(s.encode("utf-8"))
+        slot, value = h % _NUM_BINS, h // _NUM_BINS
+        if value < signature[slot]:
+            signature[slot] = value
+    return signature
+
+def _bands(signature: List[int]) -> set:
+    return {(band, tuple(signature[band * _ROWS:(band + 1) * _ROWS])) for band in range(_BANDS)}
+
+def _sketch(entry: dict) -> dict:
+    """Shingles and LSH bands of a kept entry, computed on first use only."""
+    if entry["shingles"] is None:
+        entry["shingles"] = _shingles(entry["norm"])
+        entry["bands"] = _bands(_minhash(entry["shingles"]))
+    return entry
+
+def _fact_tokens(norm_text: str) -> frozenset:
+    """Numbers, dates and month names: allegations that share a template but differ here are distinct incidents."""
+    return frozenset(t for t in norm_text.split() if t in _MONTHS or any(c.isdigit() for c in t))
+
+def _adjacent(sources: set, source: Any) -> bool:
+    """Near-duplicates only arise from overlapping/adjacent chunks, never within one chunk."""
+    for other in sources:
+        if isinstance(other, int) and isinstance(source, int):
+            if 0 < abs(other - source) <= 1:
+                return True
+        elif other != source:
+            return True
+    return False
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def deduplicate_allegations(
+    allegations: List[Tuple[Any, dict]],
+    proofs: List[Tuple[Any, dict]],
+    threshold: float = 0.9
+) -> Tuple[List[dict], List[dict], List[Dict[str, Any]]]:
+    """
+    Filters noise, merges exact and near-duplicate allegations, and re-numbers the survivors.
+
+    `allegations` and `proofs` are (source, item) pairs in page order, where `source` identifies the
+    chunk the item came from; point_ref values are only unique within a chunk, so proofs are indexed by
+    (source, point_ref). A near-duplicate is only merged when it comes from an adjacent chunk (integer
+    sources differing by 1, or any other source) and carries exactly the same numbers, dates and month
+    names, so templated allegations about separate incidents are never collapsed. Only items that have
+    such a candidate are sketched (character-shingle MinHash + LSH), and a match needs exact Jaccard
+    similarity >= `threshold` (use 1.0 to merge exact duplicates only).
+
+    Returns (allegations, defense_and_proofs, merges) where `merges` describes every dropped item.
+    """
+    proof_index: Dict[Tuple[Any, str], dict] = {}
+    for source, proof in proofs:
+        if isinstance(proof, dict):
+            proof_index.setdefault((source, str(proof.get("point_ref"))), proof)
+
+    kept: List[dict] = []          # {"item", "norm", "shingles", "bands", "facts", "sources", "proofs", "text_len"}
+    exact_index: Dict[str, int] = {}
+    by_facts: Dict[frozenset, List[int]] = {}
+    merges: List[Dict[str, Any]] = []
+    fuzzy = threshold < 1.0
+
+    for source, item in allegations:
+        if not isinstance(item, dict):
+            continue
+        txt = (item.get("allegation_text") or "").strip()
+        # Skip if empty or a generic placeholder
+        if not txt or len(txt) < 5 or txt.lower() in _NOISE_TEXTS:
+            continue
+        # Skip if it looks like a field label
+        if txt.endswith(":") and len(txt) < 30:
+            continue
+
+        norm = _normalize(txt)
+        facts = _fact_tokens(norm)
+        proof = proof_index.get((source, str(item.get("point_number"))))
+        item_proofs = list(proof.get("suggested_proofs") or []) if proof else []
+
+        match_idx: Optional[int] = exact_index.get(norm)
+        similarity = 1.0
+        shingles = bands = None
+        if match_idx is None and fuzzy:
+            pool = [i for i in by_facts.get(facts, []) if _adjacent(kept[i]["sources"], source)]
+            best = 0.0
+            if pool:
+                shingles = _shingles(norm)
+                bands = _bands(_minhash(shingles))
+                for i in pool:
+                    entry = _sketch(kept[i])
+                    if entry["bands"].isdisjoint(bands):
+                        continue
+                    score = _jaccard(shingles, entry["shingles"])
+                    if score > best:
+                        best, match_idx = score, i
+            if best < threshold:
+                match_idx = None
+            similarity = best
+
+        if match_idx is not None:
+            target = kept[match_idx]
+            target["sources"].add(source)
+            # Keep the first position, but prefer the fuller wording (page-boundary fragments lose text)
+            if len(txt) > target["text_len"]:
+                dropped_text = (target["item"].get("allegation_text") or "").strip()
+                for key in ("allegation_text", "lawyer_comment"):
+                    if item.get(key):
+                        target["item"][key] = item[key]
+                target["text_len"] = len(txt)
+                # Later items are matched against the wording actually kept
+                exact_index[norm] = match_idx
+                target.update(norm=norm, shingles=shingles, bands=bands)
+            else:
+                dropped_text = txt
+            for p in item_proofs:
+                if p not in target["proofs"]:
+                    target["proofs"].append(p)
+            merges.append({
+                "kept_index": match_idx,
+                "dropped_text": dropped_text[:120],
+                "similarity": round(similarity, 3)
+            })
+            continue
+
+        idx = len(kept)
+        kept.append({"item": item, "norm": norm, "shingles": shingles, "bands": bands, "facts": facts,
+                     "sources": {source}, "proofs": item_proofs, "text_len": len(txt)})
+        exact_index[norm] = idx
+        by_facts.setdefault(facts, []).append(idx)
+
+    cleaned_allegations = []
+    cleaned_proofs = []
+    for idx, entry in enumerate(kept):
+        new_id = str(idx + 1)
+        entry["item"]["point_number"] = new_id
+        cleaned_allegations.append(entry["item"])
+        cleaned_proofs.append({"point_ref": new_id, "suggested_proofs": entry["proofs"] or list(_DEFAULT_PROOFS)})
+    for merge in merges:
+        merge["kept_point"] = str(merge.pop("kept_index") + 1)
+
+    return cleaned_allegations, cleaned_proofs, merges
@@ -0,0 +1,245 @@
+import asyncio
+import atexit
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.core.logger import logger
+
+# Default location: <repo>/data/embedding_cache.sqlite3 (next to the OCR page and completion caches)
+_DEFAULT_DB_PATH = Path(__file__).parent.parent.parent.parent / "data" / "embedding_cache.sqlite3"
+
+_WHITESPACE = re.compile(r"\s+")
+
+# The vector blob goes last: SQLite reads a row's columns in order, so a column stored after a blob that
+# spills into overflow pages can only be reached by reading those pages
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS embeddings ("
+    " key TEXT PRIMARY KEY, model TEXT NOT NULL, size INTEGER NOT NULL,"
+    " created_at REAL NOT NULL, last_access REAL NOT NULL, vector BLOB NOT NULL)"
+)
+
+# Hits only bump last_access in memory; the batch is written when it grows this large or this old
+_ACCESS_FLUSH_ROWS = 500
+_ACCESS_FLUSH_SECONDS = 30.0
+
+def normalize_text(text: str) -> str:
+    """NFC and collapsed whitespace, so reflowed copies of the same text share one vector."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+class EmbeddingStore:
+    """
+    Two-tier vector store keyed by (model, normalized text): an in-process LRU in front of a SQLite
+    table of float32 blobs with LRU eviction beyond the byte budget. Embeddings are deterministic per
+    model, so entries have no TTL. Entry count and byte total are read once at startup and then kept
+    up to date by put/evict; last_access updates from hits are batched.
+    """
+
+    def __init__(self, db_path: Path, max_bytes: int, memory_entries: int):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_table()
+        self.entries, self.bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+        self._touched: Dict[str, float] = {}
+        self._last_access_flush = time.monotonic()
+        atexit.register(self.flush_access)
+
+    def _create_table(self):
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")]
+        if columns and columns[-1] != "vector":
+            # Cache files from before the blob moved last: copy once into the new layout
+            self._conn.execute("ALTER TABLE embeddings RENAME TO embeddings_old")
+            self._conn.execute(_SCHEMA)
+            self._conn.execute(
+                "INSERT INTO embeddings (key, model, size, created_at, last_access, vector)"
+                " SELECT key, model, size, created_at, last_access, vector FROM embeddings_old"
+            )
+            self._conn.execute("DROP TABLE embeddings_old")
+        else:
+            self._conn.execute(_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_access ON embeddings (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Cached vectors for whichever of `keys` are present."""
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                else:
+                    missing.append(key)
+            for start in range(0, len(missing), 500): # stay under SQLite's bound-parameter limit
+                chunk = missing[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f", blob).tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+            if found:
+                now = time.time()
+                self._touched.update((key, now) for key in found)
+                if len(self._touched) >= _ACCESS_FLUSH_ROWS or time.monotonic() - self._last_access_flush >= _ACCESS_FLUSH_SECONDS:
+                    self._flush_access()
+                    self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """Stores freshly computed vectors in both tiers and evicts beyond the byte budget."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            keys = list(items)
+            replaced: Dict[str, int] = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                replaced.update(self._conn.execute(
+                    f"SELECT key, size FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall())
+            rows = []
+            for key, vector in items.items():
+                self._remember(key, list(vector))
+                self._touched.pop(key, None)
+                blob = array("f", vector).tobytes()
+                rows.append((key, model, len(blob), now, now, blob))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, size, created_at, last_access, vector) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.entries += len(rows) - len(replaced)
+            self.bytes += sum(r[2] for r in rows) - sum(replaced.values())
+            self._evict()
+            self._conn.commit()
+
+    def _flush_access(self):
+        """Writes the batched last_access bumps (caller holds the lock and commits)."""
+        if self._touched:
+            self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+        self._last_access_flush = time.monotonic()
+
+    def flush_access(self):
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.bytes <= self.max_bytes:
+            return
+        # Recent hits must be on disk before they are ranked
+        self._flush_access()
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_access ASC").fetchall():
+            if self.bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            self.entries -= 1
+            self.bytes -= size
+            evicted += 1
+        logger.info(f"[Embedding Cache] Dropped {evicted} LRU entries; {self.entries} entries / {self.bytes} bytes remain")
+
+    def stats(self) -> dict:
+        """Process-lifetime hit/miss counters (per text) plus the current footprint of both tiers."""
+        with self._lock:
+            count, total = self.entries, self.bytes
+            memory = len(self._memory)
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": memory,
+            "entries": count,
+            "bytes": total
+        }
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain Embeddings wrapper that serves repeated texts from an EmbeddingStore and sends only the
+    misses (deduplicated, in one batch) to the wrapped model. Drop-in for PGVector's `embeddings`.
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, store: EmbeddingStore):
+        self.underlying = underlying
+        self.model = model
+        self.store = store
+
+    def _plan(self, texts: List[str]):
+        keys = [EmbeddingStore.make_key(self.model, t) for t in texts]
+        found = self.store.get_many(list(dict.fromkeys(keys)))
+        # One remote slot per distinct missing text; the first occurrence supplies the text sent
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return keys, found, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys, found, missing = self._plan(texts)
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.store.put_many(self.model, fresh)
+            found.update(fresh)
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys, found, missing = await asyncio.to_thread(self._plan, texts)
+        if missing:
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            await asyncio.to_thread(self.store.put_many, self.model, fresh)
+            found.update(fresh)
+        return [found[k] for k in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+# Global instance (wrapped around the Azure model in app.db.vector_store)
+embedding_store = EmbeddingStore(
+    db_path=Path(settings.EMBEDDING_CACHE_PATH) if settings.EMBEDDING_CACHE_PATH else _DEFAULT_DB_PATH,
+    max_bytes=settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+    memory_entries=settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+)
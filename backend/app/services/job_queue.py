@@ -0,0 +1,168 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+from app.core.logger import activity_logger, logger
+from app.core.metrics import request_context
+
+# Default location: <repo>/data/jobs.sqlite3
+_DEFAULT_DB_PATH = Path(__file__).parent.parent.parent.parent / "data" / "jobs.sqlite3"
+
+# Handler signature: (payload, progress) -> result, where progress(stage, percent) persists job status
+ProgressCallback = Callable[[str, float], Awaitable[None]]
+JobHandler = Callable[[dict, ProgressCallback], Awaitable[dict]]
+
+class JobStore:
+    """Durable SQLite record of every submitted job: request, status, stage, percent and result."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, stage TEXT, percent REAL NOT NULL DEFAULT 0,"
+            " request TEXT NOT NULL, result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    def create(self, kind: str, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, stage, percent, request, created_at, updated_at) VALUES (?, ?, 'queued', 'queued', 0, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), now, now)
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id: str, **fields):
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, stage, percent, request, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = {
+            "job_id": row[0], "kind": row[1], "status": row[2], "stage": row[3], "percent": row[4],
+            "error": row[7], "created_at": row[8], "updated_at": row[9]
+        }
+        if include_result:
+            job["request"] = json.loads(row[5])
+            job["result"] = json.loads(row[6]) if row[6] else None
+        return job
+
+    def pending(self) -> list:
+        """Jobs that were queued or mid-run when the process last stopped, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at ASC"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+class JobManager:
+    """
+    Submit/poll/fetch job runner. Submissions are persisted first, then executed by a fixed pool of
+    asyncio workers so throughput is bounded by the pool rather than by HTTP connection lifetimes.
+    Jobs interrupted by a restart are re-queued from the store on the next start().
+    """
+
+    def __init__(self, store: JobStore, workers: int):
+        self.store = store
+        self.workers = max(1, workers)
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        resumed = await asyncio.to_thread(self.store.pending)
+        for job_id in resumed:
+            self._queue.put_nowait(job_id)
+        if resumed:
+            logger.info(f"[Jobs] Re-queued {len(resumed)} unfinished job(s) from the store")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, payload: dict) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._queue is None:
+            raise RuntimeError("Job manager is not running.")
+        job_id = await asyncio.to_thread(self.store.create, kind, payload)
+        await self._queue.put(job_id)
+        activity_logger.log_event("Jobs", "QUEUED", job_id, f"{kind} job submitted")
+        return job_id
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id, include_result=include_result)
+
+    async def _worker(self, worker_idx: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await asyncio.to_thread(self.store.get, job_id, True)
+        if job is None:
+            return
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            await asyncio.to_thread(self.store.update, job_id, status="failed", error=f"No handler for job kind '{job['kind']}'")
+            return
+
+        async def progress(stage: str, percent: float):
+            await asyncio.to_thread(self.store.update, job_id, stage=stage, percent=round(min(max(percent, 0.0), 100.0), 1))
+
+        await asyncio.to_thread(self.store.update, job_id, status="running", stage="starting", percent=0)
+        activity_logger.log_event("Jobs", "START", job_id, f"Running {job['kind']} job")
+        try:
+            # The job id doubles as the request id for the spans the pipeline emits
+            with request_context(job_id):
+                result = await handler(job["request"], progress)
+            await asyncio.to_thread(self.store.update, job_id, status="succeeded", stage="done", percent=100, result=result)
+            activity_logger.log_event("Jobs", "SUCCESS", job_id, f"{job['kind']} job finished")
+        except asyncio.CancelledError:
+            # Shutdown mid-run: leave the row as 'running' so start() picks it up again
+            raise
+        except Exception as e:
+            await asyncio.to_thread(self.store.update, job_id, status="failed", error=str(getattr(e, "detail", e)))
+            activity_logger.log_event("Jobs", "ERROR", job_id, f"{job['kind']} job failed: {str(e)}")
+
+# Global instance
+job_manager = JobManager(
+    store=JobStore(Path(settings.JOBS_DB_PATH) if settings.JOBS_DB_PATH else _DEFAULT_DB_PATH),
+    workers=settings.JOBS_WORKERS,
+)
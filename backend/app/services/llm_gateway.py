@@ -0,0 +1,158 @@
+import asyncio
+import re
+import time
+from typing import Any, Dict, Optional
+import httpx
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import LLM_IN_FLIGHT, observe_llm_call
+from app.services.rate_limiter import rate_limiter, estimate_tokens
+from app.services.retry_policy import retry_policy
+from app.services.completion_cache import cacheable_body, completion_cache, current_scope
+
+class LLMResponseError(Exception):
+    """Raised by LLMGateway.chat_completion when Azure answers with a non-200 status."""
+
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"Status {status_code}: {body}")
+        self.status_code = status_code
+        self.body = body
+
+def deployment_from_url(url: str) -> Optional[str]:
+    match = re.search(r"/deployments/([^/?]+)", url)
+    return match.group(1) if match else None
+
+def route_from_url(url: str) -> str:
+    for route in ("chat/completions", "embeddings", "responses", "files"):
+        if f"/{route}" in url:
+            return route.split("/")[0]
+    return "other"
+
+class LLMGateway:
+    """
+    Application-scoped gateway for every Azure OpenAI call (chat, responses, files).
+    Owns one pooled keep-alive httpx.AsyncClient (HTTP/2 when the 'h2' package is available),
+    created on app startup and closed on shutdown, so calls stop paying connection setup each time.
+    Model calls acquire RPM/TPM capacity from the shared rate limiter before they are sent and are
+    retried under the shared retry policy (backoff, Retry-After, deadline, per-deployment circuit breaker).
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = settings.LLM_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("[LLM Gateway] 'h2' not installed; falling back to HTTP/1.1 (pip install 'httpx[http2]')")
+                http2 = False
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=10.0)
+        )
+
+    async def start(self):
+        if self._client is None:
+            self._client = self._build_client()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Lazily created for callers outside the app lifespan (CLI runs, background scripts)
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    async def _send(self, url: str, deployment: str, **kwargs) -> httpx.Response:
+        """One HTTP attempt, observed in the LLM latency histogram, in-flight gauge and token counters."""
+        route = route_from_url(url)
+        started = time.monotonic()
+        status: Any = "error"
+        LLM_IN_FLIGHT.labels(deployment).inc()
+        try:
+            response = await self.client.post(url, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            LLM_IN_FLIGHT.labels(deployment).dec()
+            usage = None
+            if status == 200 and route in ("chat", "responses", "embeddings"):
+                try:
+                    usage = response.json().get("usage")
+                except ValueError:
+                    pass
+            observe_llm_call(deployment, route, status, time.monotonic() - started, usage)
+
+    async def post(
+        self,
+        url: str,
+        *,
+        json: Optional[Dict[str, Any]] = None,
+        files: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        deployment: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> httpx.Response:
+        """
+        Raw authenticated POST against an Azure OpenAI route. Model calls pass `deployment` so each
+        attempt acquires RPM/TPM capacity from the shared rate limiter, feeds its rate-limit headers
+        back, and is retried under the retry policy within `deadline` seconds (settings default).
+        Raises LLMUnavailableError when the deployment's circuit is open or the deadline runs out.
+        """
+        headers = {"api-key": api_key or settings.AZURE_OPENAI_API_KEY}
+        request_timeout = timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        if not deployment:
+            return await self._send(url, "-", headers=headers, json=json, files=files, data=data, timeout=request_timeout)
+
+        async def send_once() -> httpx.Response:
+            async with rate_limiter.slot(deployment, estimate_tokens(json)) as limiter:
+                response = await self._send(url, deployment, headers=headers, json=json, files=files, data=data, timeout=request_timeout)
+                limiter.observe(response.status_code, response.headers)
+                return response
+
+        return await retry_policy.run(deployment, send_once, deadline=deadline)
+
+    async def chat(self, url: str, payload: Dict[str, Any], *, api_key: Optional[str] = None, timeout: Optional[float] = None, deadline: Optional[float] = None) -> httpx.Response:
+        """
+        POST a chat completions payload and return the raw response for callers that inspect status codes.
+        Inside a completion_cache.cache_scope() complete answers are served from / written to the cache.
+        """
+        deployment = deployment_from_url(url) or payload.get("model") or settings.AZURE_OPENAI_MODEL
+        scope = current_scope() if settings.COMPLETION_CACHE_ENABLED else None
+        if scope is None:
+            return await self.post(url, json=payload, api_key=api_key, timeout=timeout, deployment=deployment, deadline=deadline)
+
+        key = completion_cache.make_key(deployment, payload)
+        if not scope.bypass:
+            body = await asyncio.to_thread(completion_cache.get, key)
+            if body is not None:
+                scope.hits += 1
+                return httpx.Response(200, content=body.encode("utf-8"), headers={"content-type": "application/json", "x-cache": "hit"})
+        scope.misses += 1
+        response = await self.post(url, json=payload, api_key=api_key, timeout=timeout, deployment=deployment, deadline=deadline)
+        if response.status_code == 200 and cacheable_body(response.text):
+            await asyncio.to_thread(completion_cache.put, key, response.text)
+        return response
+
+    async def chat_completion(self, url: str, payload: Dict[str, Any], *, api_key: Optional[str] = None, timeout: Optional[float] = None, deadline: Optional[float] = None) -> str:
+        """POST a chat completions payload and return the first choice's content; raises LLMResponseError otherwise."""
+        response = await self.chat(url, payload, api_key=api_key, timeout=timeout, deadline=deadline)
+        if response.status_code != 200:
+            raise LLMResponseError(response.status_code, response.text)
+        return response.json()["choices"][0]["message"]["content"]
+
+# Global instance
+llm_gateway = LLMGateway()
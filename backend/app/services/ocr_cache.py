@@ -0,0 +1,149 @@
+import atexit
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.logger import logger
+
+# Default location: <repo>/data/ocr_cache.sqlite3 (same root the ActivityLogger resolves for logs/)
+_DEFAULT_DB_PATH = Path(__file__).parent.parent.parent.parent / "data" / "ocr_cache.sqlite3"
+
+# Page text goes last so size/last_access never sit behind its overflow pages (see embedding_cache)
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS ocr_pages ("
+    " key TEXT PRIMARY KEY, size INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL,"
+    " hit_count INTEGER NOT NULL DEFAULT 0, text TEXT NOT NULL)"
+)
+
+# Hits only bump last_access in memory; the batch is written when it grows this large or this old
+_ACCESS_FLUSH_ROWS = 500
+_ACCESS_FLUSH_SECONDS = 30.0
+
+class OcrCache:
+    """
+    Content-addressed, size-bounded SQLite cache of vision OCR results per rendered PDF page.
+    Entries are evicted least-recently-used first once the byte or entry budget is exceeded. Entry count
+    and byte total are read once at startup and then kept up to date by put/evict; hits are batched.
+    """
+
+    def __init__(self, db_path: Path, max_bytes: int, max_entries: int):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_table()
+        self.entries, self.bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_pages").fetchone()
+        self._touched: Dict[str, Tuple[float, int]] = {} # key -> (last access, hits since the last flush)
+        self._last_access_flush = time.monotonic()
+        atexit.register(self.flush_access)
+
+    def _create_table(self):
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(ocr_pages)")]
+        if columns and columns[-1] != "text":
+            # Cache files from before the text moved last: copy once into the new layout
+            self._conn.execute("ALTER TABLE ocr_pages RENAME TO ocr_pages_old")
+            self._conn.execute(_SCHEMA)
+            self._conn.execute(
+                "INSERT INTO ocr_pages (key, size, created_at, last_access, hit_count, text)"
+                " SELECT key, size, created_at, last_access, hit_count, text FROM ocr_pages_old"
+            )
+            self._conn.execute("DROP TABLE ocr_pages_old")
+        else:
+            self._conn.execute(_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_ocr_pages_last_access ON ocr_pages (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(image_sha256: str, render_settings: str, deployment: str) -> str:
+        """Hash of the rendered page bytes (pre-hashed by the renderer) plus everything that changes the OCR output."""
+        return hashlib.sha256(f"{image_sha256}\x00{render_settings}\x00{deployment}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached page text, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM ocr_pages WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._touched[key] = (time.time(), self._touched.get(key, (0.0, 0))[1] + 1)
+            if len(self._touched) >= _ACCESS_FLUSH_ROWS or time.monotonic() - self._last_access_flush >= _ACCESS_FLUSH_SECONDS:
+                self._flush_access()
+                self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, text: str):
+        """Stores a page text and evicts LRU entries beyond the configured budget."""
+        if not text:
+            return
+        now = time.time()
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM ocr_pages WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_pages (key, size, created_at, last_access, hit_count, text) VALUES (?, ?, ?, ?, 0, ?)",
+                (key, size, now, now, text)
+            )
+            self._touched.pop(key, None)
+            self.entries += 0 if replaced else 1
+            self.bytes += size - (replaced[0] if replaced else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _flush_access(self):
+        """Writes the batched last_access/hit_count bumps (caller holds the lock and commits)."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE ocr_pages SET last_access = ?, hit_count = hit_count + ? WHERE key = ?",
+                [(when, hits, key) for key, (when, hits) in self._touched.items()]
+            )
+            self._touched.clear()
+        self._last_access_flush = time.monotonic()
+
+    def flush_access(self):
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.entries <= self.max_entries and self.bytes <= self.max_bytes:
+            return
+        # Recent hits must be on disk before they are ranked
+        self._flush_access()
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM ocr_pages ORDER BY last_access ASC").fetchall():
+            if self.entries <= self.max_entries and self.bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM ocr_pages WHERE key = ?", (key,))
+            self.entries -= 1
+            self.bytes -= size
+            evicted += 1
+        logger.info(f"[OCR Cache] Evicted {evicted} page(s); {self.entries} entries / {self.bytes} bytes remain")
+
+    def stats(self) -> dict:
+        """Process-lifetime hit/miss counters plus the current on-disk footprint."""
+        with self._lock:
+            count, total = self.entries, self.bytes
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": count,
+            "bytes": total
+        }
+
+# Global instance
+ocr_cache = OcrCache(
+    db_path=Path(settings.OCR_CACHE_PATH) if settings.OCR_CACHE_PATH else _DEFAULT_DB_PATH,
+    max_bytes=settings.OCR_CACHE_MAX_MB * 1024 * 1024,
+    max_entries=settings.OCR_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,61 @@
+from typing import Callable, List
+from app.services.rate_limiter import count_text_tokens
+
+# Tried in order when a single page exceeds the budget: paragraphs, lines, sentences, words
+_SPLIT_SEPARATORS = ["\n\n", "\n", ". ", " "]
+_GROUP_JOINER = "\n\n"
+
+def split_oversized(text: str, budget: int, count: Callable[[str], int] = count_text_tokens) -> List[str]:
+    """
+    Splits `text` into pieces of at most `budget` tokens, preferring the coarsest natural boundary
+    so allegations are not cut mid-sentence; falls back to a proportional character cut.
+    """
+    if count(text) <= budget or len(text) <= 1:
+        return [text]
+    for sep in _SPLIT_SEPARATORS:
+        parts = text.split(sep)
+        if len(parts) < 2:
+            continue
+        # The separator's non-whitespace part ('.' of '. ') stays with the text before it
+        keep = sep.rstrip()
+        joiner = sep[len(keep):]
+        parts = [part + keep for part in parts[:-1]] + parts[-1:]
+        pieces: List[str] = []
+        current = ""
+        for part in parts:
+            candidate = f"{current}{joiner}{part}" if current else part
+            if current and count(candidate) > budget:
+                pieces.extend(split_oversized(current, budget, count))
+                current = part
+            else:
+                current = candidate
+        if current:
+            pieces.extend(split_oversized(current, budget, count))
+        return [p for p in pieces if p.strip()]
+    # No separators left: cut proportionally to the token overshoot
+    cut = max(1, len(text) * budget // max(count(text), 1))
+    return split_oversized(text[:cut], budget, count) + split_oversized(text[cut:], budget, count)
+
+def pack_pages(pages: List[str], budget: int, max_pages: int = 0, count: Callable[[str], int] = count_text_tokens) -> List[str]:
+    """
+    Greedily packs consecutive pages into groups of at most `budget` tokens (and at most `max_pages`
+    pages when > 0), preserving page order. Oversized pages are split and their pieces packed like pages.
+    """
+    budget = max(1, budget)
+    groups: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    joiner_tokens = count(_GROUP_JOINER)
+
+    for page in pages:
+        for piece in split_oversized(page, budget, count):
+            piece_tokens = count(piece)
+            fits = current_tokens + joiner_tokens + piece_tokens <= budget
+            if current and (not fits or (max_pages > 0 and len(current) >= max_pages)):
+                groups.append(_GROUP_JOINER.join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens + (joiner_tokens if len(current) > 1 else 0)
+    if current:
+        groups.append(_GROUP_JOINER.join(current))
+    return groups
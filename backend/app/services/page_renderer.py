@@ -0,0 +1,100 @@
+"""
+PDF page capture that runs in a process pool, off the event loop.
+
+Everything in this module that is submitted to the pool must stay importable without the app
+settings (the pool re-imports it in spawned worker processes), so thresholds are passed in as
+arguments rather than read from `app.core.config`.
+"""
+import asyncio
+import base64
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+import fitz # PyMuPDF
+
+# Per-process cache of open documents so consecutive pages of one PDF don't reparse the file
+_OPEN_DOCS = {}
+_MAX_OPEN_DOCS = 4
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def classify_page(page, min_char_density: float, max_image_coverage: float, min_glyph_ratio: float) -> Tuple[str, str, str]:
+    """
+    Decides locally whether a PDF page can use its embedded text layer or needs vision OCR.
+    Returns (decision, reason, native_text) where decision is 'native' or 'vision'.
+    """
+    native_text = page.get_text("text") or ""
+    glyphs = [c for c in native_text if not c.isspace()]
+    if not glyphs:
+        return "vision", "no text layer", ""
+
+    # Glyph sanity: unmapped fonts come back as U+FFFD, control or private-use codepoints
+    clean = sum(1 for c in glyphs if c.isprintable() and c != "\ufffd" and not ("\ue000" <= c <= "\uf8ff"))
+    glyph_ratio = clean / len(glyphs)
+    if glyph_ratio < min_glyph_ratio:
+        return "vision", f"garbled text layer (glyph ratio {glyph_ratio:.2f})", native_text
+
+    # Text density (chars per square inch) against image coverage (fraction of page area)
+    page_area = max(page.rect.width * page.rect.height, 1.0)
+    density = len(glyphs) / (page_area / (72.0 * 72.0))
+    image_area = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page.rect
+        if not bbox.is_empty:
+            image_area += bbox.width * bbox.height
+    coverage = min(image_area / page_area, 1.0)
+    if coverage >= max_image_coverage and density < min_char_density:
+        return "vision", f"scanned page (image coverage {coverage:.0%}, {density:.1f} chars/sq in)", native_text
+
+    return "native", f"text layer ({len(glyphs)} glyphs, image coverage {coverage:.0%})", native_text
+
+def _open_doc(file_path: str):
+    key = (file_path, os.path.getmtime(file_path))
+    doc = _OPEN_DOCS.get(key)
+    if doc is None:
+        while len(_OPEN_DOCS) >= _MAX_OPEN_DOCS:
+            _OPEN_DOCS.pop(next(iter(_OPEN_DOCS))).close()
+        doc = fitz.open(file_path)
+        _OPEN_DOCS[key] = doc
+    return doc
+
+def count_pages(file_path: str) -> int:
+    return len(_open_doc(file_path))
+
+def capture_page(file_path: str, page_num: int, scale: float, thresholds: Optional[tuple] = None) -> dict:
+    """
+    Worker entry point. Classifies the page when `thresholds` is given (hybrid mode) and, if it needs
+    vision OCR, renders it to PNG and returns the base64 payload plus the SHA-256 of the PNG bytes.
+    """
+    page = _open_doc(file_path).load_page(page_num)
+    result = {"page_num": page_num, "decision": "vision", "reason": "vision mode", "text": "", "png_b64": None, "png_sha256": None}
+    if thresholds is not None:
+        decision, reason, native_text = classify_page(page, *thresholds)
+        result.update(decision=decision, reason=reason)
+        if decision == "native":
+            result["text"] = native_text
+            return result
+
+    png_bytes = page.get_pixmap(matrix=fitz.Matrix(scale, scale)).tobytes("png")
+    result["png_sha256"] = hashlib.sha256(png_bytes).hexdigest()
+    result["png_b64"] = base64.b64encode(png_bytes).decode("utf-8")
+    return result
+
+def get_executor(max_workers: int) -> ProcessPoolExecutor:
+    """Lazily creates the shared render pool."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max(1, max_workers))
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def run_in_pool(max_workers: int, fn, *args):
+    """Runs a module-level function from this file in the render pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(max_workers), fn, *args)
@@ -1,20 +1,78 @@
 
-from typing import List
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional
 from langchain_core.documents import Document
-from app.db.vector_store import vector_store
+from app.core.config import settings
+from app.db.vector_store import embeddings, schedule_index_build, search, vector_store
+from app.services.embedding_cache import normalize_text
+from app.services.rate_limiter import count_text_tokens
 
 # --- LangChain Logic ---
 # This service uses LangChain components directly to perform tasks.
 
-async def retrieve_documents(query: str, k: int = 4) -> List[Document]:
+async def retrieve_documents(query: str, k: int = 4, mode: Optional[str] = None) -> List[Document]:
     """
-    Retrieves relevant documents from the vector store using LangChain.
+    Retrieves relevant documents from the vector store (vector, lexical or hybrid; default RAG_SEARCH_MODE).
     """
     print(f"Service: Retrieving top {k} documents for query: '{query}'")
     
-    # vector_store is a LangChain PGVector object
-    docs = await vector_store.asimilarity_search(query, k=k)
-    return docs
+    # ANN index and/or full-text GIN index over the collection, fused with RRF in hybrid mode
+    docs_and_scores = await search(query, k=k, mode=mode)
+    return [doc for doc, _ in docs_and_scores]
+
+async def retrieve_many(queries: List[str], k: int = 4, mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Retrieves the top-k documents for several queries in one pass: every query is embedded in a single
+    batched call (through the embedding cache) and the searches run concurrently over the pool.
+    Returns {"documents": [{"document", "score", "queries"}], "by_query": {query: [doc ids]}, "errors": {query: message}}
+    with each document listed once, in first-hit order, carrying every query that retrieved it and the
+    score (as returned by vector_store.search for `mode`) from its best-ranked hit.
+    A failing query is reported in "errors" and does not affect the others.
+    """
+    unique = list(dict.fromkeys(q for q in queries if q and q.strip()))
+    result: Dict[str, Any] = {"documents": [], "by_query": {}, "errors": {}}
+    if not unique:
+        return result
+    print(f"Service: Retrieving top {k} documents for {len(unique)} queries")
+
+    mode = mode or settings.RAG_SEARCH_MODE
+    vectors: List[Optional[List[float]]] = [None] * len(unique)
+    if mode != "lexical":
+        try:
+            vectors = await embeddings.aembed_documents(unique)
+        except Exception as e:
+            result["errors"] = {q: f"embedding failed: {e}" for q in unique}
+            return result
+
+    semaphore = asyncio.Semaphore(max(1, settings.RAG_RETRIEVE_CONCURRENCY))
+
+    async def run_query(query: str, vector: Optional[List[float]]):
+        async with semaphore:
+            return await search(query, k=k, mode=mode, vector=vector)
+
+    outcomes = await asyncio.gather(*(run_query(q, v) for q, v in zip(unique, vectors)), return_exceptions=True)
+
+    hits: Dict[str, Dict[str, Any]] = {}
+    for query, outcome in zip(unique, outcomes):
+        if isinstance(outcome, BaseException):
+            result["errors"][query] = str(outcome)
+            continue
+        ids = []
+        for rank, (doc, score) in enumerate(outcome):
+            key = doc.id or content_id(doc.page_content)
+            hit = hits.get(key)
+            if hit is None:
+                hits[key] = {"document": doc, "score": score, "rank": rank, "queries": [query]}
+            else:
+                if rank < hit["rank"]:
+                    hit["score"], hit["rank"] = score, rank
+                if query not in hit["queries"]:
+                    hit["queries"].append(query)
+            ids.append(key)
+        result["by_query"][query] = ids
+    result["documents"] = list(hits.values())
+    return result
 
 async def generate_answer(query: str, context: List[Document]) -> str:
     """
@@ -54,11 +112,33 @@ async def generate_answer(query: str, context: List[Document]) -> str:
     response = await chain.ainvoke({"context": context_str, "question": query})
     return response.content
 
-async def ingest_legal_analysis(legal_audit: List[dict]) -> int:
+def content_id(content: str) -> str:
+    """Stable row id for an ingested text: re-ingesting the same content maps onto the same row."""
+    return hashlib.sha256(normalize_text(content).encode("utf-8")).hexdigest()
+
+def _embedding_batches(documents: List[Document]) -> List[List[Document]]:
+    """Splits documents into batches within the per-request input count and token budget."""
+    batches, current, tokens = [], [], 0
+    for doc in documents:
+        doc_tokens = count_text_tokens(doc.page_content)
+        if current and (len(current) >= settings.RAG_INGEST_BATCH_SIZE or tokens + doc_tokens > settings.RAG_INGEST_BATCH_TOKENS):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(doc)
+        tokens += doc_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+async def ingest_legal_analysis(legal_audit: List[dict]) -> Dict[str, int]:
     """
-    Ingests legal audit list into the vector store.
+    Ingests legal audit list into the vector store, idempotently.
+    Rows are keyed by a hash of their content: unchanged items are skipped, items whose metadata
+    changed are updated in place (their vector comes from the embedding cache), and only new texts
+    are embedded, in batches sized to the embedding API limits.
     """
-    documents = []
+    documents: Dict[str, Document] = {}
+    duplicates = 0
     for item in legal_audit:
         # Create content string
         content = f"Law: {item.get('law_cited', '')}\n" \
@@ -73,11 +153,35 @@ async def ingest_legal_analysis(legal_audit: List[dict]) -> int:
             "citation_context": item.get("citation_context")
         }
         
-        documents.append(Document(page_content=content, metadata=metadata))
-    
-    if documents:
-        print(f"Service: Adding {len(documents)} documents to vector store...")
-        # Add documents to vector store
-        await vector_store.aadd_documents(documents)
-        return len(documents)
-    return 0
+        doc_id = content_id(content)
+        if doc_id in documents:
+            duplicates += 1 # repeated within this payload; the last occurrence wins
+        documents[doc_id] = Document(id=doc_id, page_content=content, metadata=metadata)
+
+    counts = {"inserted": 0, "updated": 0, "skipped": duplicates}
+    if not documents:
+        return counts
+
+    existing = {doc.id: doc for doc in await vector_store.aget_by_ids(list(documents))}
+    pending = []
+    for doc_id, doc in documents.items():
+        stored = existing.get(doc_id)
+        if stored is None:
+            counts["inserted"] += 1
+        elif stored.metadata == doc.metadata:
+            counts["skipped"] += 1
+            continue
+        else:
+            counts["updated"] += 1
+        pending.append(doc)
+
+    batches = _embedding_batches(pending)
+    print(f"Service: Upserting {len(pending)} documents in {len(batches)} batch(es) "
+          f"({counts['inserted']} new, {counts['updated']} updated, {counts['skipped']} skipped)...")
+    for batch in batches:
+        # PGVector upserts on id, so a retried ingest cannot create duplicates
+        await vector_store.aadd_documents(batch, ids=[doc.id for doc in batch])
+    if counts["inserted"]:
+        # The first ingest may have created the collection (or, for IVFFlat, its first rows): index it in the background
+        schedule_index_build()
+    return counts
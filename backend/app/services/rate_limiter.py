@@ -0,0 +1,192 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.core.logger import logger
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception: # tiktoken missing or encoding not downloadable offline
+    _ENCODING = None
+
+# Azure bills each image input at a fixed high-detail cost; a flat estimate is enough for admission control
+_IMAGE_TOKEN_ESTIMATE = 1100
+# Azure enforces RPM/TPM over 10-second windows, so bursts above 1/6 of the minute quota are rejected
+_BURST_FRACTION = 1.0 / 6.0
+
+def count_text_tokens(text: str) -> int:
+    """o200k_base token count, or a ~4 chars/token estimate when tiktoken is unavailable."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+def estimate_tokens(payload: Optional[Dict[str, Any]]) -> int:
+    """
+    Up-front token cost of a chat/responses payload as Azure counts it against TPM:
+    prompt tokens plus the requested completion budget.
+    """
+    if not payload:
+        return 0
+    prompt = 0
+    for message in payload.get("messages") or payload.get("input") or []:
+        content = message.get("content") if isinstance(message, dict) else message
+        if isinstance(content, str):
+            prompt += count_text_tokens(content)
+        elif isinstance(content, list):
+            for part in content:
+                if not isinstance(part, dict):
+                    continue
+                if part.get("type") in ("image_url", "input_image", "input_file"):
+                    prompt += _IMAGE_TOKEN_ESTIMATE
+                else:
+                    prompt += count_text_tokens(part.get("text") or "")
+        prompt += 4 # per-message framing
+    if "response_format" in payload:
+        prompt += count_text_tokens(json.dumps(payload["response_format"]))
+    completion = payload.get("max_completion_tokens") or payload.get("max_tokens") or payload.get("max_output_tokens") or 0
+    return prompt + int(completion)
+
+class TokenBucket:
+    """Continuous-refill bucket; may go negative so oversized requests are admitted once and then paid back."""
+
+    def __init__(self, per_minute: float):
+        self.set_rate(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def set_rate(self, per_minute: float):
+        self.per_minute = max(per_minute, 1.0)
+        self.rate = self.per_minute / 60.0
+        self.capacity = max(self.per_minute * _BURST_FRACTION, 1.0)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        need = min(amount, self.capacity)
+        return 0.0 if self.tokens >= need else (need - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def clamp(self, remaining: float):
+        """Server-reported remaining quota is authoritative in both directions (within capacity)."""
+        self._refill()
+        self.tokens = min(max(remaining, -self.capacity), self.capacity)
+
+class DeploymentLimiter:
+    """RPM + TPM buckets, an in-flight cap and a Retry-After block for one Azure deployment."""
+
+    def __init__(self, name: str, rpm: int, tpm: int, max_in_flight: int):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.in_flight = asyncio.Semaphore(max(1, max_in_flight))
+        self.blocked_until = 0.0
+        self._admission = asyncio.Lock() # FIFO admission so large requests are not starved by small ones
+
+    async def acquire(self, est_tokens: int):
+        async with self._admission:
+            while True:
+                wait = max(
+                    self.blocked_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(est_tokens)
+                )
+                if wait <= 0:
+                    self.requests.consume(1)
+                    self.tokens.consume(est_tokens)
+                    return
+                await asyncio.sleep(min(wait, 5.0))
+
+    def observe(self, status_code: int, headers):
+        """Recalibrate from Azure's x-ratelimit-* and Retry-After response headers."""
+        limit_requests = _header_float(headers, "x-ratelimit-limit-requests")
+        limit_tokens = _header_float(headers, "x-ratelimit-limit-tokens")
+        if limit_requests:
+            self.requests.set_rate(limit_requests)
+        if limit_tokens:
+            self.tokens.set_rate(limit_tokens)
+
+        remaining_requests = _header_float(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _header_float(headers, "x-ratelimit-remaining-tokens")
+        if remaining_requests is not None:
+            self.requests.clamp(remaining_requests)
+        if remaining_tokens is not None:
+            self.tokens.clamp(remaining_tokens)
+
+        retry_after = retry_after_seconds(headers)
+        if status_code == 429:
+            retry_after = retry_after if retry_after is not None else 2.0
+        if retry_after is not None and retry_after > 0:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            logger.warning(f"[Rate Limiter] {self.name}: backing off {retry_after:.1f}s (status {status_code})")
+
+def _header_float(headers, name: str) -> Optional[float]:
+    value = headers.get(name) if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Retry-After in seconds, preferring Azure's millisecond header when present."""
+    ms = _header_float(headers, "retry-after-ms")
+    if ms is not None:
+        return ms / 1000.0
+    return _header_float(headers, "retry-after")
+
+class RateLimiter:
+    """Shared per-deployment limiter every LLM call acquires capacity from."""
+
+    def __init__(self, rpm: int, tpm: int, max_in_flight: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_in_flight = max_in_flight
+        self._deployments: Dict[str, DeploymentLimiter] = {}
+
+    def for_deployment(self, deployment: str) -> DeploymentLimiter:
+        limiter = self._deployments.get(deployment)
+        if limiter is None:
+            limiter = DeploymentLimiter(deployment, self.rpm, self.tpm, self.max_in_flight)
+            self._deployments[deployment] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, deployment: str, est_tokens: int):
+        """
+        Waits for RPM/TPM capacity and an in-flight slot, then yields the deployment limiter so the
+        caller can feed the response back through `observe(status_code, headers)`.
+        """
+        limiter = self.for_deployment(deployment)
+        async with limiter.in_flight:
+            await limiter.acquire(est_tokens)
+            yield limiter
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "requests_available": round(l.requests.tokens, 1),
+                "tokens_available": round(l.tokens.tokens, 1),
+                "rpm": l.requests.per_minute,
+                "tpm": l.tokens.per_minute,
+                "blocked_for_s": round(max(l.blocked_until - time.monotonic(), 0.0), 1)
+            }
+            for name, l in self._deployments.items()
+        }
+
+# Global instance
+rate_limiter = RateLimiter(
+    rpm=settings.LLM_RPM_LIMIT,
+    tpm=settings.LLM_TPM_LIMIT,
+    max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+)
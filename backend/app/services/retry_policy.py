@@ -0,0 +1,177 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Optional
+import httpx
+from app.core.config import settings
+from app.core.logger import activity_logger, logger
+from app.services.rate_limiter import retry_after_seconds
+
+# Throttling and transient server errors are retried; anything else is returned to the caller as-is
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+class LLMUnavailableError(Exception):
+    """The deployment's circuit is open, the request deadline ran out, or transport errors exhausted all attempts."""
+
+    def __init__(self, deployment: str, reason: str):
+        super().__init__(f"LLM deployment '{deployment}' unavailable: {reason}")
+        self.deployment = deployment
+        self.reason = reason
+
+class CircuitBreaker:
+    """
+    Per-deployment breaker. Opens after `failure_threshold` consecutive outage-type failures
+    (5xx, timeouts, connection errors - not 429s), rejects calls for `cooldown` seconds, then lets
+    a single half-open probe through; the probe's outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self):
+        """The probe ended without a verdict (cancelled, or an unexpected error): let the next call probe instead."""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_throttle(self):
+        """A 429 proves the endpoint is reachable: release the probe without changing state."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Returns True if this failure tripped the breaker open."""
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+class RetryPolicy:
+    """
+    Bounded retries with exponential backoff and full jitter, honoring Retry-After, under a total
+    per-request deadline, with per-deployment circuit breakers. Counters are kept for export.
+    """
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float, deadline: float,
+                 failure_threshold: int, cooldown: float):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.metrics: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def breaker(self, deployment: str) -> CircuitBreaker:
+        if deployment not in self._breakers:
+            self._breakers[deployment] = CircuitBreaker(self.failure_threshold, self.cooldown)
+        return self._breakers[deployment]
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _count(self, deployment: str, name: str):
+        self.metrics[deployment][name] += 1
+
+    async def run(self, deployment: str, send: Callable[[], Awaitable[httpx.Response]], deadline: Optional[float] = None) -> httpx.Response:
+        """
+        Calls `send` until it returns a non-retryable response or attempts run out; the last response
+        is returned so callers keep their own status handling. Raises LLMUnavailableError when the
+        circuit is open, the deadline would be exceeded, or every attempt failed at the transport level.
+        """
+        breaker = self.breaker(deployment)
+        budget = deadline if deadline is not None else self.deadline
+        started = time.monotonic()
+        last_response: Optional[httpx.Response] = None
+        last_error = "no attempts made"
+
+        for attempt in range(self.max_attempts):
+            if not breaker.allow():
+                self._count(deployment, "breaker_rejections")
+                raise LLMUnavailableError(deployment, "circuit open")
+            remaining = budget - (time.monotonic() - started)
+            if remaining <= 0:
+                self._count(deployment, "deadline_exceeded")
+                raise LLMUnavailableError(deployment, f"deadline of {budget:.0f}s exceeded")
+
+            retry_after = None
+            try:
+                last_response = await asyncio.wait_for(send(), timeout=remaining)
+            except (httpx.TransportError, asyncio.TimeoutError) as e:
+                last_error = f"{type(e).__name__}: {e}"
+                outage = True
+            except BaseException:
+                # Cancellation (gather teardown, client disconnect, shutdown) or a bug in send(): no verdict
+                # on the deployment, but a half-open probe slot must not stay taken or the circuit never closes
+                breaker.release_probe()
+                raise
+            else:
+                status = last_response.status_code
+                self._count(deployment, f"status_{status}")
+                if status not in RETRYABLE_STATUS:
+                    breaker.record_success()
+                    return last_response
+                last_error = f"status {status}"
+                outage = status != 429
+                retry_after = retry_after_seconds(last_response.headers)
+
+            if outage and breaker.record_failure():
+                self._count(deployment, "breaker_trips")
+                activity_logger.log_event("LLM", "CIRCUIT_OPEN", deployment, f"Breaker opened after {breaker.failures} consecutive failures ({last_error}). Cooling down {self.cooldown:.0f}s.")
+            if not outage:
+                breaker.record_throttle()
+
+            if attempt == self.max_attempts - 1:
+                break
+            delay = max(retry_after or 0.0, self._backoff(attempt))
+            if time.monotonic() - started + delay >= budget:
+                self._count(deployment, "deadline_exceeded")
+                raise LLMUnavailableError(deployment, f"deadline of {budget:.0f}s exceeded after {attempt + 1} attempt(s) ({last_error})")
+            self._count(deployment, "retries")
+            logger.warning(f"[LLM Retry] {deployment}: attempt {attempt + 1} failed ({last_error}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+        self._count(deployment, "retries_exhausted")
+        if last_response is not None:
+            return last_response
+        raise LLMUnavailableError(deployment, f"all {self.max_attempts} attempts failed ({last_error})")
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """Retry/breaker counters and current breaker state per deployment."""
+        out = {}
+        for deployment in set(self.metrics) | set(self._breakers):
+            out[deployment] = dict(self.metrics.get(deployment, {}))
+            out[deployment]["breaker_state"] = self.breaker(deployment).state
+        return out
+
+# Global instance
+retry_policy = RetryPolicy(
+    max_attempts=settings.LLM_RETRY_MAX_ATTEMPTS,
+    base_delay=settings.LLM_RETRY_BASE_DELAY,
+    max_delay=settings.LLM_RETRY_MAX_DELAY,
+    deadline=settings.LLM_REQUEST_DEADLINE_SECONDS,
+    failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+    cooldown=settings.LLM_BREAKER_COOLDOWN_SECONDS,
+)
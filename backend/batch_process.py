@@ -0,0 +1,228 @@
+"""
+Offline bulk processing for a directory of charge PDFs.
+
+Runs the same pipeline functions as the API (run_extraction -> run_position_draft) for every PDF,
+several documents at a time. All LLM calls share the gateway's rate limiter, so --llm-concurrency is
+one global in-flight budget across pages and drafting modules of every document. Completed stages are
+recorded in <output>/manifest.json; re-running the command skips them unless the PDF changed.
+
+Usage (from backend/):
+    python batch_process.py ./charges --output ./charges/batch_output --documents 4 --llm-concurrency 16
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Ensure the backend directory is in the sys.path
+_HERE = Path(__file__).parent
+if str(_HERE) not in sys.path:
+    sys.path.insert(0, str(_HERE))
+
+from fastapi import HTTPException
+from app.core.metrics import request_context
+from app.api.api_v1.endpoints.extraction import ExtractionRequest, run_extraction
+from app.api.api_v1.endpoints.drafting_generator import CombinedDraftRequest, run_position_draft
+from app.services import page_renderer
+from app.services.llm_gateway import llm_gateway
+from app.services.rate_limiter import rate_limiter
+from app.services.retry_policy import retry_policy
+
+STAGES = ("extraction", "drafting")
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def extraction_to_points(extraction: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Maps the extraction response onto the structured `points` input the drafting pipeline accepts."""
+    proofs = {str(p.get("point_ref")): p.get("suggested_proofs") or [] for p in extraction.get("defense_and_proofs", []) if isinstance(p, dict)}
+    points = []
+    for item in extraction.get("allegations_list", []):
+        label = str(item.get("point_number"))
+        points.append({
+            "label": label,
+            "allegation": item.get("allegation_text", ""),
+            "suggested_proof": "; ".join(str(p) for p in proofs.get(label, [])),
+            "response": item.get("lawyer_comment", "")
+        })
+    return points
+
+class Manifest:
+    """Resumable record of completed stages per document, rewritten atomically after every change."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = asyncio.Lock()
+        self.data: Dict[str, Any] = {"documents": {}}
+        if path.exists():
+            self.data = json.loads(path.read_text(encoding="utf-8"))
+
+    def document(self, key: str, sha256: str, source: str) -> Dict[str, Any]:
+        doc = self.data["documents"].get(key)
+        if doc is None or doc.get("sha256") != sha256:
+            # New or changed PDF: every stage has to run again
+            doc = {"source": source, "sha256": sha256, "stages": {}}
+            self.data["documents"][key] = doc
+        return doc
+
+    async def record(self, doc: Dict[str, Any], stage: str, **fields):
+        async with self._lock:
+            doc["stages"][stage] = {**fields, "updated_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.data, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+def stage_done(doc: Dict[str, Any], stage: str) -> bool:
+    entry = doc["stages"].get(stage) or {}
+    return entry.get("status") == "done" and bool(entry.get("output")) and Path(entry["output"]).exists()
+
+async def process_document(pdf: Path, out_root: Path, manifest: Manifest, stages: List[str], counters: Dict[str, Any], bypass_cache: bool):
+    key = pdf.stem
+    doc = manifest.document(key, await asyncio.to_thread(file_sha256, pdf), str(pdf))
+    out_dir = out_root / key
+    out_dir.mkdir(parents=True, exist_ok=True)
+    extraction_path = out_dir / "extraction.json"
+
+    if "extraction" in stages:
+        if stage_done(doc, "extraction"):
+            counters["skipped_stages"] += 1
+        else:
+            pages = 0
+
+            async def emit(event: dict):
+                nonlocal pages
+                if event.get("event") == "page":
+                    pages += 1
+
+            started = time.monotonic()
+            try:
+                result = await run_extraction(ExtractionRequest(file_path=str(pdf)), emit=emit)
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                await manifest.record(doc, "extraction", status="failed", error=str(detail))
+                counters["failed"].append(f"{key}: extraction: {detail}")
+                return
+            extraction_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+            elapsed = time.monotonic() - started
+            counters["pages"] += pages
+            counters["extraction_seconds"] += elapsed
+            await manifest.record(doc, "extraction", status="done", output=str(extraction_path), pages=pages,
+                                  allegations=len(result.get("allegations_list", [])), seconds=round(elapsed, 1))
+            print(f"[extraction] {key}: {pages} page(s), {len(result.get('allegations_list', []))} allegation(s) in {elapsed:.1f}s")
+
+    if "drafting" in stages:
+        if stage_done(doc, "drafting"):
+            counters["skipped_stages"] += 1
+            return
+        if not extraction_path.exists():
+            counters["failed"].append(f"{key}: drafting: no extraction output")
+            return
+        extraction = json.loads(extraction_path.read_text(encoding="utf-8"))
+        points = extraction_to_points(extraction)
+        if not points:
+            await manifest.record(doc, "drafting", status="failed", error="no allegations extracted")
+            counters["failed"].append(f"{key}: drafting: no allegations extracted")
+            return
+        metadata = extraction.get("document_metadata") or {}
+        request = CombinedDraftRequest(
+            raw_data=json.dumps({"points": points}),
+            folder_path=str(out_dir),
+            charging_party=metadata.get("charging_party") or "Unknown",
+            bypass_cache=bypass_cache,
+            **({"respondent": metadata["respondent"]} if metadata.get("respondent") else {})
+        )
+        started = time.monotonic()
+        try:
+            result = await run_position_draft(request)
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            await manifest.record(doc, "drafting", status="failed", error=str(detail))
+            counters["failed"].append(f"{key}: drafting: {detail}")
+            return
+        elapsed = time.monotonic() - started
+        counters["drafting_seconds"] += elapsed
+        await manifest.record(doc, "drafting", status="done", output=result.get("file_path"), seconds=round(elapsed, 1))
+        print(f"[drafting] {key}: saved {result.get('file_path')} in {elapsed:.1f}s")
+
+async def run_batch(input_dir: Path, out_root: Path, documents: int, llm_concurrency: Optional[int], stages: List[str], bypass_cache: bool) -> Dict[str, Any]:
+    if llm_concurrency:
+        # Must be set before the first call creates a deployment limiter; shared by every document
+        rate_limiter.max_in_flight = llm_concurrency
+    pdfs = sorted(p for p in input_dir.iterdir() if p.suffix.lower() == ".pdf")
+    out_root.mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(out_root / "manifest.json")
+    counters: Dict[str, Any] = {"pages": 0, "skipped_stages": 0, "failed": [], "extraction_seconds": 0.0, "drafting_seconds": 0.0}
+    doc_slots = asyncio.Semaphore(max(1, documents))
+
+    async def guarded(pdf: Path):
+        async with doc_slots:
+            try:
+                with request_context(f"batch-{pdf.stem}"):
+                    await process_document(pdf, out_root, manifest, stages, counters, bypass_cache)
+            except Exception as e:
+                counters["failed"].append(f"{pdf.stem}: {e}")
+
+    await llm_gateway.start()
+    started = time.monotonic()
+    try:
+        await asyncio.gather(*[guarded(pdf) for pdf in pdfs])
+    finally:
+        page_renderer.shutdown_executor()
+        await llm_gateway.aclose()
+    wall = time.monotonic() - started
+
+    summary = {
+        "documents": len(pdfs),
+        "failed": len(counters["failed"]),
+        "skipped_stages": counters["skipped_stages"],
+        "pages": counters["pages"],
+        "wall_seconds": round(wall, 1),
+        "pages_per_minute": round(counters["pages"] / wall * 60, 1) if wall else 0.0,
+        "documents_per_hour": round((len(pdfs) - len(counters["failed"])) / wall * 3600, 1) if wall else 0.0,
+        "extraction_seconds": round(counters["extraction_seconds"], 1),
+        "drafting_seconds": round(counters["drafting_seconds"], 1),
+        "errors": counters["failed"],
+        "llm": {"rate_limiter": rate_limiter.snapshot(), "retry_policy": retry_policy.snapshot()}
+    }
+    (out_root / "summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and draft position statements for every PDF in a directory.")
+    parser.add_argument("input_dir", type=Path, help="Directory containing charge PDFs")
+    parser.add_argument("--output", type=Path, default=None, help="Output directory (default: <input_dir>/batch_output)")
+    parser.add_argument("--documents", type=int, default=4, help="Documents processed concurrently")
+    parser.add_argument("--llm-concurrency", type=int, default=None, help="Global in-flight LLM request budget (default: LLM_MAX_IN_FLIGHT)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to run: extraction,drafting")
+    parser.add_argument("--bypass-cache", action="store_true", help="Regenerate drafting modules instead of reusing cached completions")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    if not args.input_dir.is_dir():
+        parser.error(f"not a directory: {args.input_dir}")
+
+    summary = asyncio.run(run_batch(
+        args.input_dir, args.output or args.input_dir / "batch_output",
+        args.documents, args.llm_concurrency, stages, args.bypass_cache
+    ))
+    print(f"\nProcessed {summary['documents']} document(s), {summary['pages']} page(s) in {summary['wall_seconds']}s "
+          f"({summary['pages_per_minute']} pages/min, {summary['documents_per_hour']} docs/hour); "
+          f"{summary['skipped_stages']} stage(s) resumed, {summary['failed']} failure(s).")
+    for err in summary["errors"]:
+        print(f"  FAILED {err}")
+    sys.exit(1 if summary["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
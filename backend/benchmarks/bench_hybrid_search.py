@@ -0,0 +1,90 @@
+"""
+Latency and hit rate of vector, lexical and hybrid search on the live legal_citations collection.
+
+Queries default to the stored law_cited values (e.g. "M.G.L. c. 151B", "42 U.S.C. § 2000e"), each
+expected to retrieve its own row; --queries-file adds natural-language cases as JSONL lines of
+{"query": ..., "expected_law_cited": ...}. Read-only: run tools.vector_index first so both indexes exist.
+Query embeddings go through the embedding cache, so only the first run pays for them.
+
+Usage (from backend/):
+    python -m benchmarks.bench_hybrid_search --sample 100 --k 5
+    python -m benchmarks.bench_hybrid_search --queries-file benchmarks/citation_queries.jsonl
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+from app.db import vector_store
+
+async def load_cases(args) -> List[Tuple[str, str]]:
+    """(query, expected law_cited) pairs."""
+    cases = []
+    if args.queries_file:
+        for line in Path(args.queries_file).read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                item = json.loads(line)
+                cases.append((item["query"], item["expected_law_cited"]))
+    if args.sample:
+        async with vector_store.engine.connect() as conn:
+            collection_id = await vector_store._collection_id(conn, vector_store.COLLECTION_NAME)
+            rows = (await conn.execute(text(
+                "SELECT DISTINCT cmetadata->>'law_cited' FROM langchain_pg_embedding"
+                " WHERE collection_id = :cid AND coalesce(cmetadata->>'law_cited', '') <> ''"
+            ), {"cid": collection_id})).scalars().all() if collection_id else []
+        rng = random.Random(args.seed)
+        cases.extend((law, law) for law in rng.sample(rows, min(args.sample, len(rows))))
+    return cases
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def bench_mode(mode: str, cases: List[Tuple[str, str]], k: int) -> Dict:
+    latencies, hits, reciprocal_ranks = [], 0, []
+    for query, expected in cases:
+        start = time.perf_counter()
+        results = await vector_store.search(query, k=k, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+        laws = [(doc.metadata or {}).get("law_cited") for doc, _ in results]
+        rank = next((i for i, law in enumerate(laws, start=1) if law == expected), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    return {"mode": mode, "p50": statistics.median(latencies), "p95": percentile(latencies, 95),
+            "hit_rate": hits / len(cases), "mrr": statistics.mean(reciprocal_ranks)}
+
+async def run(args):
+    try:
+        cases = await load_cases(args)
+        if not cases:
+            print("No queries: the collection has no law_cited metadata and no --queries-file was given.")
+            return
+        # Warm the embedding cache so vector/hybrid latency measures search, not the first embeddings call
+        await vector_store.embeddings.aembed_documents([q for q, _ in cases])
+        results = [await bench_mode(mode, cases, args.k) for mode in args.modes]
+    finally:
+        await vector_store.engine.dispose()
+    print(f"\n{len(cases)} queries, k={args.k}")
+    print(f"  {'mode':<8} {'p50 ms':>9} {'p95 ms':>9} {'hit@' + str(args.k):>8} {'MRR':>7}")
+    for r in results:
+        print(f"  {r['mode']:<8} {r['p50']:9.2f} {r['p95']:9.2f} {r['hit_rate']:8.3f} {r['mrr']:7.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector, lexical and hybrid retrieval on citation queries.")
+    parser.add_argument("--sample", type=int, default=100, help="Stored law_cited values to use as exact-citation queries (0 = none)")
+    parser.add_argument("--queries-file", default=None)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--modes", type=lambda v: v.split(","), default=list(vector_store.SEARCH_MODES))
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
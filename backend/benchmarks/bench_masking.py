@@ -0,0 +1,112 @@
+"""
+Microbenchmark: legacy per-term re.sub masking vs the single-pass MaskingEngine.
+
+Covers a synthetic 200-page OCR document (mask + unmask) and a large extraction response JSON
+(recursive unmask). Also asserts that both implementations produce identical output.
+
+Usage (from backend/):
+    python -m benchmarks.bench_masking --pages 200 --allegations 150 --repeat 5
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.masking import EXTRACTION_MASKS, extraction_masker
+
+# --- Pre-change implementations (verbatim logic from extraction.py) ---
+def legacy_preprocess_text(text: str) -> str:
+    processed_text = text
+    for term, replacement in EXTRACTION_MASKS.items():
+        processed_text = re.sub(r'\b' + term + r'\b', replacement, processed_text, flags=re.IGNORECASE)
+    return processed_text
+
+def legacy_postprocess_unmask(obj: Any) -> Any:
+    if isinstance(obj, str):
+        result = obj
+        for original, masked in EXTRACTION_MASKS.items():
+            result = re.sub(re.escape(masked), original, result, flags=re.IGNORECASE)
+        return result
+    elif isinstance(obj, list):
+        return [legacy_postprocess_unmask(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: legacy_postprocess_unmask(v) for k, v in obj.items()}
+    return obj
+
+_WORDS = (
+    "the charging party alleges that respondent supervisor engaged in sexual harassment and "
+    "racial discrimination based on race and color including assault and violence after she "
+    "reported the conduct to human resources on or about march black employees were treated "
+    "differently than similarly situated coworkers who did not complain about sex based comments"
+).split()
+
+def build_document(pages: int, words_per_page: int = 450) -> str:
+    rng = random.Random(7)
+    out = []
+    for n in range(pages):
+        body = " ".join(rng.choice(_WORDS) for _ in range(words_per_page))
+        out.append(f"\n--- PAGE {n+1} ---\n{body}")
+    return "".join(out)
+
+def build_response(allegations: int) -> dict:
+    rng = random.Random(11)
+    masked = lambda n: legacy_preprocess_text(" ".join(rng.choice(_WORDS) for _ in range(n)))
+    return {
+        "document_metadata": {
+            "charging_party": "Jane Doe", "respondent": "Respondent", "date_filed": "2025-03-01",
+            "all_detected_categories": ["Harassment", "Discrimination", "Retaliation"],
+            "legal_case_summary": masked(120)
+        },
+        "allegations_list": [
+            {"point_number": str(i + 1), "allegation_text": masked(60), "lawyer_comment": masked(45)}
+            for i in range(allegations)
+        ],
+        "defense_and_proofs": [
+            {"point_ref": str(i + 1), "suggested_proofs": ["Personnel file", "Policy documentation", masked(12)]}
+            for i in range(allegations)
+        ]
+    }
+
+def best_of(fn, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--allegations", type=int, default=150)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    document = build_document(args.pages)
+    masked_document = legacy_preprocess_text(document)
+    response = build_response(args.allegations)
+
+    assert extraction_masker.mask(document) == masked_document, "mask output differs from legacy"
+    assert extraction_masker.unmask(masked_document) == legacy_postprocess_unmask(masked_document), "unmask output differs from legacy"
+    assert extraction_masker.unmask(response) == legacy_postprocess_unmask(response), "JSON unmask output differs from legacy"
+
+    cases = [
+        (f"mask {args.pages}-page document", legacy_preprocess_text, extraction_masker.mask, document),
+        (f"unmask {args.pages}-page document", legacy_postprocess_unmask, extraction_masker.unmask_text, masked_document),
+        (f"unmask response JSON ({args.allegations} allegations)", legacy_postprocess_unmask, extraction_masker.unmask, response),
+    ]
+    print(f"document: {len(document):,} chars, response: {len(json.dumps(response)):,} chars, best of {args.repeat}")
+    print(f"{'case':<45}{'legacy_ms':>12}{'engine_ms':>12}{'speedup':>10}")
+    for name, legacy_fn, new_fn, arg in cases:
+        legacy_ms = best_of(legacy_fn, arg, args.repeat)
+        new_ms = best_of(new_fn, arg, args.repeat)
+        print(f"{name:<45}{legacy_ms:>12.2f}{new_ms:>12.2f}{legacy_ms / max(new_ms, 1e-9):>9.1f}x")
+
+if __name__ == "__main__":
+    main()
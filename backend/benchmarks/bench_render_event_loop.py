@@ -0,0 +1,129 @@
+"""
+Event-loop lag while Pass 1 renders a PDF: inline rendering (old behaviour) vs the process pool.
+
+A ticker coroutine sleeps 10 ms in a loop and records how late it wakes up; that overshoot is the
+latency any other request on the same uvicorn worker (e.g. /rag/search) would see. No LLM calls
+are made, only the render/PNG/base64 work that used to run on the loop.
+
+Usage (from backend/):
+    python -m benchmarks.bench_render_event_loop --pages 40 --workers 2 --prefetch 8
+    python -m benchmarks.bench_render_event_loop --pdf path/to/charge.pdf
+"""
+import argparse
+import asyncio
+import base64
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fitz # PyMuPDF
+from app.services import page_renderer
+
+TICK_SECONDS = 0.010
+RENDER_SCALE = 2.0
+
+def build_synthetic_pdf(path: str, pages: int):
+    """Letter-size pages with dense body text and a full-page raster, roughly like a scanned charge."""
+    doc = fitz.open()
+    noise = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 1275, 1650), 0)
+    noise.set_rect(noise.irect, (235, 235, 235))
+    for n in range(pages):
+        page = doc.new_page(width=612, height=792)
+        page.insert_image(page.rect, pixmap=noise)
+        body = "\n".join(f"{n+1}.{i} The Charging Party alleges that on or about March {i % 28 + 1}, 2025 the Respondent ..." for i in range(45))
+        page.insert_textbox(fitz.Rect(54, 54, 558, 738), body, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+async def measure_lag(work):
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append((time.perf_counter() - start - TICK_SECONDS) * 1000.0)
+
+    tick_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick_task
+    lags.sort()
+    return {
+        "wall_s": round(elapsed, 3),
+        "lag_p50_ms": round(statistics.median(lags), 2) if lags else 0.0,
+        "lag_p95_ms": round(lags[int(len(lags) * 0.95) - 1], 2) if lags else 0.0,
+        "lag_max_ms": round(lags[-1], 2) if lags else 0.0,
+        "ticks": len(lags),
+    }
+
+async def render_inline(pdf_path: str):
+    """Pre-change Pass 1: render and encode every page synchronously inside the coroutine."""
+    doc = fitz.open(pdf_path)
+    for page_num in range(len(doc)):
+        pix = doc.load_page(page_num).get_pixmap(matrix=fitz.Matrix(RENDER_SCALE, RENDER_SCALE))
+        base64.b64encode(pix.tobytes("png")).decode("utf-8")
+        await asyncio.sleep(0) # the old loop yielded only at the OCR await
+    doc.close()
+
+async def render_pooled(pdf_path: str, workers: int, prefetch: int):
+    """Post-change Pass 1: process pool fed through a bounded prefetch queue."""
+    page_total = await page_renderer.run_in_pool(workers, page_renderer.count_pages, pdf_path)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+
+    async def produce():
+        for page_num in range(page_total):
+            await queue.put(asyncio.ensure_future(page_renderer.run_in_pool(
+                workers, page_renderer.capture_page, pdf_path, page_num, RENDER_SCALE, None
+            )))
+        await queue.put(None)
+
+    async def consume():
+        while True:
+            fut = await queue.get()
+            if fut is None:
+                return
+            await fut
+
+    await asyncio.gather(produce(), consume())
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="Existing PDF to render (default: generate a synthetic one)")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--prefetch", type=int, default=8)
+    args = parser.parse_args()
+
+    tmp_path = None
+    pdf_path = args.pdf
+    if not pdf_path:
+        fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        build_synthetic_pdf(tmp_path, args.pages)
+        pdf_path = tmp_path
+
+    try:
+        # Warm the pool so process start-up isn't billed to the measurement
+        await page_renderer.run_in_pool(args.workers, page_renderer.count_pages, pdf_path)
+        inline = await measure_lag(lambda: render_inline(pdf_path))
+        pooled = await measure_lag(lambda: render_pooled(pdf_path, args.workers, args.prefetch))
+    finally:
+        page_renderer.shutdown_executor()
+        if tmp_path:
+            os.remove(tmp_path)
+
+    print(f"{'mode':<10}{'wall_s':>10}{'lag_p50_ms':>12}{'lag_p95_ms':>12}{'lag_max_ms':>12}{'ticks':>8}")
+    for name, r in (("inline", inline), ("pooled", pooled)):
+        print(f"{name:<10}{r['wall_s']:>10}{r['lag_p50_ms']:>12}{r['lag_p95_ms']:>12}{r['lag_max_ms']:>12}{r['ticks']:>8}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+"""
+p50/p95 similarity-search latency against corpus size: exact scan vs the ANN index, with recall@k.
+
+For each corpus size a scratch PGVector collection (bench_ann_<size>) is filled with synthetic
+clustered vectors of the configured width (RAG_EMBEDDING_DIMENSIONS), indexed with the same code the
+app uses (vector_store.ensure_index), queried, and dropped again unless --keep. No embedding API
+calls are made. Needs the Postgres database from .env with the vector extension.
+
+Usage (from backend/):
+    python -m benchmarks.bench_vector_search --sizes 1000,10000,50000 --queries 200
+    python -m benchmarks.bench_vector_search --type ivfflat --probes 1,10,40
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_postgres import PGVector
+from sqlalchemy import text
+from app.core.config import settings
+from app.db import vector_store
+
+def make_vectors(count: int, dims: int, clusters: int, rng: random.Random) -> List[List[float]]:
+    """Near-duplicate groups like real citation chunks: cluster centres with a few coordinates perturbed."""
+    centres = [[rng.gauss(0, 1) for _ in range(dims)] for _ in range(clusters)]
+    out = []
+    for _ in range(count):
+        vec = list(rng.choice(centres))
+        for i in rng.sample(range(dims), 64):
+            vec[i] += rng.gauss(0, 1)
+        out.append(vec)
+    return out
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def exact_search(vector: List[float], k: int, collection: str) -> List[str]:
+    """Same SQL as ann_search_by_vector with index scans disabled: the ground truth."""
+    async with vector_store.engine.connect() as conn:
+        collection_id = await vector_store._collection_id(conn, collection)
+        await conn.execute(text("SET LOCAL enable_indexscan = off"))
+        rows = (await conn.execute(text(vector_store._ann_sql(collection_id)),
+                                   {"q": "[" + ",".join(map(str, vector)) + "]", "k": k})).all()
+    return [row[0] for row in rows]
+
+async def timed(fn, queries: List[List[float]]) -> tuple:
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(await fn(q))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, results
+
+async def bench_size(size: int, args, rng: random.Random) -> List[Dict]:
+    collection = f"bench_ann_{size}"
+    store = PGVector(embeddings=vector_store.embeddings, collection_name=collection, connection=vector_store.engine,
+                     use_jsonb=True, create_extension=False, pre_delete_collection=True)
+    dims = settings.RAG_EMBEDDING_DIMENSIONS
+    vectors = make_vectors(size, dims, max(10, size // 50), rng)
+    start = time.perf_counter()
+    for i in range(0, size, 500):
+        chunk = vectors[i:i + 500]
+        await store.aadd_embeddings(texts=[f"doc {i + j}" for j in range(len(chunk))], embeddings=chunk,
+                                    metadatas=[{} for _ in chunk], ids=[str(uuid.uuid4()) for _ in chunk])
+    print(f"\n[{size} rows] inserted in {time.perf_counter() - start:.1f}s")
+    vector_store._collection_ids.pop(collection, None)
+
+    start = time.perf_counter()
+    status = await vector_store.ensure_index(collection, rebuild=True)
+    print(f"[{size} rows] {settings.RAG_INDEX_TYPE} build {time.perf_counter() - start:.1f}s, valid={status.get('valid')} uses_index={status.get('uses_index')}")
+
+    queries = [list(v) for v in rng.sample(vectors, min(args.queries, size))]
+    for q in queries: # query near, not at, a stored vector
+        for i in rng.sample(range(dims), 32):
+            q[i] += rng.gauss(0, 1)
+
+    rows = []
+    exact_ms, truth = await timed(lambda q: exact_search(q, args.k, collection), queries)
+    rows.append({"size": size, "mode": "exact", "p50": statistics.median(exact_ms), "p95": percentile(exact_ms, 95), "recall": 1.0})
+    knob = "ef_search" if settings.RAG_INDEX_TYPE == "hnsw" else "probes"
+    for value in (args.ef_search if knob == "ef_search" else args.probes):
+        ms, found = await timed(lambda q: vector_store.ann_search_by_vector(q, args.k, collection, **{knob: value}), queries)
+        recall = statistics.mean(len(set(t) & {d.id for d, _ in f}) / max(1, len(t)) for t, f in zip(truth, found))
+        rows.append({"size": size, "mode": f"{settings.RAG_INDEX_TYPE} {knob}={value}", "p50": statistics.median(ms), "p95": percentile(ms, 95), "recall": recall})
+
+    if not args.keep:
+        async with vector_store.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{vector_store.VECTOR_SCHEMA}"."{vector_store.index_name(collection)}"'))
+        await store.adelete_collection()
+        vector_store._collection_ids.pop(collection, None)
+    return rows
+
+async def run(args):
+    rng = random.Random(args.seed)
+    results = []
+    try:
+        for size in args.sizes:
+            results.extend(await bench_size(size, args, rng))
+    finally:
+        await vector_store.engine.dispose()
+    print(f"\n  {'rows':>8}  {'mode':<24} {'p50 ms':>9} {'p95 ms':>9} {'recall@' + str(args.k):>10}")
+    for r in results:
+        print(f"  {r['size']:>8}  {r['mode']:<24} {r['p50']:9.2f} {r['p95']:9.2f} {r['recall']:10.3f}")
+
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Similarity-search latency vs corpus size, exact vs ANN index.")
+    parser.add_argument("--sizes", type=int_list, default=[1000, 5000, 20000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--type", choices=["hnsw", "ivfflat"], default=None, help="Defaults to RAG_INDEX_TYPE")
+    parser.add_argument("--ef-search", type=int_list, default=[20, 40, 100])
+    parser.add_argument("--probes", type=int_list, default=[1, 10, 40])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="Leave the scratch collections and indexes in place")
+    args = parser.parse_args()
+    settings.RAG_INDEX_TYPE = args.type or (settings.RAG_INDEX_TYPE if settings.RAG_INDEX_TYPE in ("hnsw", "ivfflat") else "hnsw")
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Tests run from backend/ (like the app); make `app` importable from any working directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings has required fields with no defaults; give them dummies so importing app modules never needs a real .env,
+# and keep the SQLite caches out of <repo>/data
+_TMP = tempfile.mkdtemp(prefix="legal_pleadings_tests_")
+for name, value in {
+    "AZURE_OPENAI_API_KEY": "test-key",
+    "AZURE_OPENAI_ENDPOINT": "http://127.0.0.1:9",
+    "AZURE_OPENAI_EMBEDDING_ENDPOINT": "http://127.0.0.1:9",
+    "AZURE_OPENAI_EMBEDDING_API_KEY": "test-key",
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "DB_HOST": "127.0.0.1",
+    "DB_PORT": "5432",
+    "DB_NAME": "test",
+    "JOBS_DB_PATH": os.path.join(_TMP, "jobs.sqlite3"),
+    "OCR_CACHE_PATH": os.path.join(_TMP, "ocr_cache.sqlite3"),
+    "COMPLETION_CACHE_PATH": os.path.join(_TMP, "completion_cache.sqlite3"),
+    "EMBEDDING_CACHE_PATH": os.path.join(_TMP, "embedding_cache.sqlite3"),
+}.items():
+    os.environ.setdefault(name, value)
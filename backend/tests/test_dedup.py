@@ -0,0 +1,76 @@
+from app.services.dedup import deduplicate_allegations
+
+def _allegation(text: str, number: str = "1") -> dict:
+    return {"point_number": number, "allegation_text": text, "lawyer_comment": ""}
+
+def _texts(allegations):
+    return [a["allegation_text"] for a in allegations]
+
+_TEMPLATE = "On {date}, the supervisor made derogatory remarks about the Charging Party during the team meeting."
+
+def test_templated_incidents_with_different_dates_are_kept():
+    dates = ["March 3, 2023", "March 10, 2023", "April 14, 2023", "March 3, 2022", "March 10, 2022", "April 14, 2022"]
+    # Spread over adjacent chunks too: the fact tokens, not the chunk, must keep them apart
+    allegations = [(i // 2, _allegation(_TEMPLATE.format(date=d), str(i % 2 + 1))) for i, d in enumerate(dates)]
+
+    kept, proofs, merges = deduplicate_allegations(allegations, [], threshold=0.7)
+
+    assert merges == []
+    assert _texts(kept) == [_TEMPLATE.format(date=d) for d in dates]
+    assert [p["point_ref"] for p in proofs] == ["1", "2", "3", "4", "5", "6"]
+
+def test_near_duplicates_within_one_chunk_are_kept():
+    first = "The Respondent denied the Charging Party's request for a schedule change in writing."
+    second = "The Respondent denied the Charging Party's request for a schedule change in an email."
+    kept, _, merges = deduplicate_allegations([(0, _allegation(first)), (0, _allegation(second, "2"))], [], threshold=0.7)
+
+    assert merges == []
+    assert _texts(kept) == [first, second]
+
+_FULL = ("On March 3, 2023 the supervisor issued a written warning to the Charging Party for alleged tardiness, "
+         "which the Respondent contends was unrelated to any protected complaint.")
+_FRAGMENT = _FULL.rsplit(" ", 2)[0] # cut at a page boundary
+
+def test_ocr_variant_in_adjacent_chunk_is_merged_at_default_threshold():
+    variant = _FULL.replace("tardiness", "tardyness")
+    kept, _, merges = deduplicate_allegations([(0, _allegation(_FULL)), (1, _allegation(variant))], [])
+
+    assert len(merges) == 1
+    assert _texts(kept) == [_FULL]
+
+def test_page_boundary_repeat_in_adjacent_chunk_is_merged_with_fuller_wording():
+    kept, proofs, merges = deduplicate_allegations(
+        [(0, _allegation(_FRAGMENT)), (1, _allegation(_FULL))],
+        [(0, {"point_ref": "1", "suggested_proofs": ["Warning letter"]}), (1, {"point_ref": "1", "suggested_proofs": ["Attendance log"]})],
+        threshold=0.85,
+    )
+
+    assert len(merges) == 1
+    assert _texts(kept) == [_FULL]
+    assert proofs[0]["suggested_proofs"] == ["Warning letter", "Attendance log"]
+
+def test_distant_chunks_are_not_merged():
+    kept, _, merges = deduplicate_allegations([(0, _allegation(_FRAGMENT)), (3, _allegation(_FULL))], [], threshold=0.85)
+
+    assert merges == []
+    assert len(kept) == 2
+
+def test_swapped_wording_is_used_for_later_exact_matches():
+    # Chunk 2 repeats the fuller wording exactly; it must hit the exact index after the swap
+    kept, _, merges = deduplicate_allegations(
+        [(0, _allegation(_FRAGMENT)), (1, _allegation(_FULL)), (2, _allegation(_FULL))], [], threshold=0.85
+    )
+
+    assert _texts(kept) == [_FULL]
+    assert len(merges) == 2
+    assert merges[1]["similarity"] == 1.0
+
+def test_swapped_wording_updates_shingles_for_fuzzy_matches():
+    reworded = _FULL.replace("contends", "asserts")
+    kept, _, merges = deduplicate_allegations(
+        [(0, _allegation(_FRAGMENT)), (1, _allegation(_FULL)), (2, _allegation(reworded))], [], threshold=0.85
+    )
+
+    # The chunk-2 copy is only close enough to the fuller wording kept after the swap, not to the original fragment
+    assert _texts(kept) == [_FULL]
+    assert len(merges) == 2
@@ -0,0 +1,141 @@
+"""
+pytest-benchmark microbenchmarks for the CPU-bound helpers.
+
+Cases run on synthetic inputs: a 300-page OCR text and a 150-allegation case. The LLM is replaced by
+the fake server's canned responder at zero latency and RAG returns nothing, so the drafting case
+measures only sorting, batching and DOCX assembly.
+
+Usage (from the repo root):
+    pytest backend/tests/test_hotspots.py --benchmark-autosave                               # record a baseline
+    pytest backend/tests/test_hotspots.py --benchmark-compare --benchmark-compare-fail=median:20%  # gate on regressions
+    pytest --benchmark-skip                                                                  # functional tests only
+"""
+import asyncio
+import copy
+import json
+import random
+from typing import List, Tuple
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+PAGES = 300
+ALLEGATIONS = 150
+
+_SENSITIVE = ["sexual harassment", "racial discrimination", "assault", "violence", "black", "color", "race", "sex"]
+_FILLER = ("the Charging Party alleges that on or about the stated date the supervisor", "made remarks regarding",
+           "during a scheduled meeting with the department manager", "and subsequently issued a written warning",
+           "which the Respondent contends was unrelated to any protected activity")
+
+def make_ocr_text(pages: int, seed: int = 7) -> str:
+    """Page-delimited OCR output as Pass 1 produces it, with sensitive terms and stray control characters."""
+    rng = random.Random(seed)
+    out = []
+    for page in range(pages):
+        lines = []
+        for n in range(rng.randint(12, 20)):
+            words = " ".join(rng.choice(_FILLER) for _ in range(rng.randint(2, 5)))
+            lines.append(f"{page * 20 + n + 1}. {words} {rng.choice(_SENSITIVE)}.{chr(rng.choice([11, 12])) if rng.random() < 0.02 else ''}")
+        out.append(f"\n--- PAGE {page + 1} ---\n" + "\n".join(lines))
+    return "".join(out)
+
+def make_case(allegations: int, seed: int = 11) -> Tuple[List[tuple], List[tuple], List[dict]]:
+    """Chunk-tagged extraction allegations/proofs (with ~20% near-duplicates) and the matching drafting points."""
+    rng = random.Random(seed)
+    tagged, proofs, points = [], [], []
+    for i in range(allegations):
+        text = f"On {rng.randint(1, 12)}/{rng.randint(1, 28)}/2023 " + " ".join(rng.choice(_FILLER) for _ in range(rng.randint(3, 8)))
+        chunk = i // 5
+        tagged.append((chunk, {"point_number": str(i % 5 + 1), "allegation_text": text, "lawyer_comment": "The Respondent denies this allegation."}))
+        proofs.append((chunk, {"point_ref": str(i % 5 + 1), "suggested_proofs": [f"Email {i}", "Personnel file"]}))
+        if rng.random() < 0.2: # page-boundary repeat in the next chunk with slightly different wording
+            tagged.append((chunk + 1, {"point_number": "9", "allegation_text": text.rstrip(".") + " as stated", "lawyer_comment": ""}))
+        points.append({"label": str(i + 1), "allegation": text, "suggested_proof": f"Email {i}; Personnel file",
+                       "response": "Denied.", "legal_category": rng.choice(["discrimination", "retaliation", "disability"])})
+    rng.shuffle(points)
+    return tagged, proofs, points
+
+@pytest.fixture(scope="module")
+def ocr() -> str:
+    return make_ocr_text(PAGES)
+
+@pytest.fixture(scope="module")
+def case() -> Tuple[List[tuple], List[tuple], List[dict]]:
+    return make_case(ALLEGATIONS)
+
+@pytest.fixture(scope="module")
+def points(case) -> List[dict]:
+    return case[2]
+
+@pytest.fixture(scope="module")
+def broken(points) -> str:
+    """A large fenced, truncated LLM JSON answer, as the repair helpers see it."""
+    body = json.dumps({"allegations_list": [{"point_number": p["label"], "allegation_text": p["allegation"]} for p in points]}, indent=2)
+    return "```json\n" + body[:-40] + "\n```"
+
+@pytest.fixture
+def drafting():
+    return pytest.importorskip("app.api.api_v1.endpoints.drafting_generator")
+
+# --- Masking --------------------------------------------------------------------
+
+def test_mask_300_pages(benchmark, ocr):
+    from app.core.masking import extraction_masker
+    benchmark(extraction_masker.mask, ocr)
+
+def test_unmask_300_pages(benchmark, ocr):
+    from app.core.masking import extraction_masker
+    benchmark(extraction_masker.unmask_text, extraction_masker.mask(ocr))
+
+def test_unmask_extraction_json(benchmark, points):
+    from app.core.masking import extraction_masker
+    payload = {"allegations_list": [{k: extraction_masker.mask(str(v)) for k, v in p.items()} for p in points]}
+    benchmark(extraction_masker.unmask, payload)
+
+# --- Extraction post-processing -------------------------------------------------
+
+def test_dedup_allegations(benchmark, case):
+    from app.services.dedup import deduplicate_allegations
+    tagged, proofs, _ = case
+    benchmark(lambda: deduplicate_allegations(copy.deepcopy(tagged), proofs))
+
+def test_json_repair_extraction(benchmark, broken):
+    repair_json = pytest.importorskip("json_repair").repair_json
+    benchmark(repair_json, broken)
+
+# --- Drafting -------------------------------------------------------------------
+
+def test_chunk_text_300_pages(benchmark, drafting, ocr):
+    benchmark(drafting.chunk_text, ocr, 2500, 500)
+
+def test_sanitize_xml_300_pages(benchmark, drafting, ocr):
+    benchmark(drafting.sanitize_xml, ocr)
+
+def test_repair_json_drafting(benchmark, drafting, broken):
+    benchmark(drafting.repair_json, broken)
+
+def test_sort_points_by_label(benchmark, drafting, points):
+    benchmark(sorted, points, key=drafting.point_sort_key)
+
+def test_copy_standard_first_page(benchmark, drafting):
+    Document = pytest.importorskip("docx").Document
+    benchmark(lambda: drafting.copy_standard_first_page(Document(), "Jane Doe", "Boston Children's Hospital"))
+
+def test_position_draft_docx_assembly(benchmark, drafting, points, monkeypatch, tmp_path):
+    from tools.fake_azure_openai import canned_chat_content
+
+    async def fake_llm(url, api_key, system_prompt, user_content, response_format="json_object", max_completion_tokens=4096):
+        return canned_chat_content({"messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_content}],
+                                    "response_format": {"type": response_format}})
+
+    async def no_documents(queries, k=4):
+        return {"documents": [], "by_query": {}, "errors": {}}
+
+    # Module attributes are resolved at call time, so this swaps the network calls out for the whole pipeline
+    monkeypatch.setattr(drafting, "call_llm_module", fake_llm)
+    monkeypatch.setattr(drafting, "retrieve_many", no_documents)
+    request = drafting.CombinedDraftRequest(raw_data=json.dumps({"points": points}), folder_path=str(tmp_path),
+                                            charging_party="Jane Doe", bypass_cache=True)
+
+    benchmark.pedantic(lambda: asyncio.run(drafting.run_position_draft(request)), rounds=5, warmup_rounds=1)
@@ -0,0 +1,92 @@
+import random
+import re
+from typing import Any, Dict
+
+import pytest
+
+from app.core.masking import DRAFTING_MASKS, EXTRACTION_MASKS, MaskingEngine, drafting_masker, extraction_masker
+
+# --- Pre-engine implementations: one re.sub per term, in vocabulary order (extraction.py / drafting_generator.py) ---
+
+def legacy_mask(masks: Dict[str, str], text: str) -> str:
+    for term, replacement in masks.items():
+        text = re.sub(r'\b' + term + r'\b', replacement, text, flags=re.IGNORECASE)
+    return text
+
+def legacy_unmask(masks: Dict[str, str], obj: Any) -> Any:
+    if isinstance(obj, str):
+        for original, masked in masks.items():
+            obj = re.sub(re.escape(masked), original, obj, flags=re.IGNORECASE)
+        return obj
+    if isinstance(obj, list):
+        return [legacy_unmask(masks, i) for i in obj]
+    if isinstance(obj, dict):
+        return {k: legacy_unmask(masks, v) for k, v in obj.items()}
+    return obj
+
+ENGINES = [(EXTRACTION_MASKS, extraction_masker), (DRAFTING_MASKS, drafting_masker)]
+
+PLAIN = [
+    "The Charging Party alleges SEXUAL Harassment and Racial discrimination.",
+    # Longer and shorter terms sharing a prefix, and every term at a word edge
+    "sex sexual sexually Sex-based race racial races racecar color colorful Black blackmail",
+    "fuck fucking fucked FUCKING bitch bitchy rape raped assault assaulted violence",
+    "Essex embrace watercolor unblack discriminations",
+    "race/color, (sex) 'rape' \"violence\"; assault.harassment",
+    "",
+]
+
+MASKED = [
+    "f*cking f*ck F*CK b*tch s-e-x-u-a-l har*ssment r*pe ass*ult vi*lence s*x rac*al discrim*nation col*r ra*e bl*ck",
+    # Masked tokens inside longer words and run together
+    "f*ckingly bl*ckened har*ssments s*xs-e-x-u-a-l f*ckingf*ck ra*erac*al",
+    "RAC*AL Discrim*Nation S-E-X-U-A-L",
+    # Sentinel characters with no masked token
+    "page 3 - item * see note - a*b",
+]
+
+@pytest.mark.parametrize("masks,engine", ENGINES)
+@pytest.mark.parametrize("text", PLAIN + MASKED)
+def test_mask_matches_per_term_substitution(masks, engine, text):
+    assert engine.mask(text) == legacy_mask(masks, text)
+
+@pytest.mark.parametrize("masks,engine", ENGINES)
+@pytest.mark.parametrize("text", PLAIN + MASKED)
+def test_unmask_matches_per_term_substitution(masks, engine, text):
+    assert engine.unmask_text(text) == legacy_unmask(masks, text)
+
+@pytest.mark.parametrize("masks,engine", ENGINES)
+def test_round_trip_matches_on_random_text(masks, engine):
+    rng = random.Random(3)
+    words = list(EXTRACTION_MASKS) + list(EXTRACTION_MASKS.values()) + ["Sexy", "Essex", "races", "the", "-", "*", "Black."]
+    for _ in range(200):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 12)))
+        masked = engine.mask(text)
+        assert masked == legacy_mask(masks, text)
+        assert engine.unmask_text(masked) == legacy_unmask(masks, masked)
+
+@pytest.mark.parametrize("masks,engine", ENGINES)
+def test_unmask_nested_json_matches(masks, engine):
+    payload = {
+        "document_metadata": {"charging_party": "Jane Doe", "all_detected_categories": ["har*ssment", "rac*al discrim*nation"],
+                              "legal_case_summary": "Alleged s-e-x-u-a-l har*ssment and f*cking slurs."},
+        "allegations_list": [
+            {"point_number": 1, "allegation_text": "bl*ck employees, ass*ult", "proofs": [["r*pe kit"], {"note": "vi*lence"}]},
+            {"point_number": "2", "allegation_text": "plain text", "resolved": None, "flag": True, "score": 0.5},
+        ],
+        "defense_and_proofs": [],
+    }
+    assert engine.unmask(payload) == legacy_unmask(masks, payload)
+
+def test_unmask_skips_strings_without_sentinels():
+    text = "No masked tokens in this sentence about race and color."
+    # The fast path hands back the very same object instead of running the regex
+    assert extraction_masker.unmask_text(text) is text
+
+def test_drafting_vocabulary_leaves_profanity_alone():
+    assert drafting_masker.mask("fuck sex") == "fuck s*x"
+    assert drafting_masker.unmask_text("f*ck s*x") == "f*ck sex"
+
+def test_engine_accepts_custom_vocabulary():
+    engine = MaskingEngine({"kill": "k*ll", "killer": "k*ller"})
+    assert engine.mask("Killer kill skill") == legacy_mask({"kill": "k*ll", "killer": "k*ller"}, "Killer kill skill")
@@ -0,0 +1,66 @@
+from app.services.page_packing import pack_pages, split_oversized
+
+def chars(text: str) -> int:
+    """Stub tokenizer: one token per character, so joiners cost exactly len('\\n\\n')."""
+    return len(text)
+
+def words(text: str) -> int:
+    return len(text.split())
+
+def _squash(text: str) -> str:
+    # Splitting may drop whitespace at the cut, never anything else
+    return "".join(text.split())
+
+def _page(n: int, sentences: int = 12) -> str:
+    body = " ".join(f"Allegation {n}.{i} states the supervisor issued a written warning." for i in range(sentences))
+    return f"Page {n}\n\n{body}\nEnd of page {n}"
+
+def test_small_pages_are_packed_in_order_and_round_trip():
+    pages = [f"page {i} text" for i in range(10)]
+    groups = pack_pages(pages, budget=40, count=chars)
+
+    assert all(chars(g) <= 40 for g in groups)
+    assert "\n\n".join(groups) == "\n\n".join(pages)
+
+def test_joiner_counts_against_the_budget():
+    pages = ["a" * 10, "b" * 10]
+    # 10 + 2 (joiner) + 10 fits exactly; one token less and the pages go into separate groups
+    assert pack_pages(pages, budget=22, count=chars) == ["a" * 10 + "\n\n" + "b" * 10]
+    assert pack_pages(pages, budget=21, count=chars) == ["a" * 10, "b" * 10]
+
+def test_max_pages_caps_each_group():
+    pages = [f"p{i}" for i in range(7)]
+    groups = pack_pages(pages, budget=1000, max_pages=3, count=chars)
+
+    assert groups == ["p0\n\np1\n\np2", "p3\n\np4\n\np5", "p6"]
+
+def test_oversized_pages_are_split_within_budget_and_keep_their_text():
+    pages = [_page(n) for n in range(3)]
+    for count, budget in ((chars, 150), (words, 20)):
+        groups = pack_pages(pages, budget=budget, count=count)
+
+        assert all(count(g) <= budget for g in groups)
+        assert _squash("".join(groups)) == _squash("".join(pages))
+
+def test_sentence_split_keeps_the_full_stop():
+    text = "First sentence here. Second sentence here. Third sentence here."
+    pieces = split_oversized(text, budget=25, count=chars)
+
+    assert pieces == ["First sentence here.", "Second sentence here.", "Third sentence here."]
+
+def test_separator_fallback_goes_from_paragraphs_to_words():
+    text = "one two three four five six seven eight"
+    pieces = split_oversized(text, budget=3, count=words)
+
+    assert pieces == ["one two three", "four five six", "seven eight"]
+
+def test_page_without_separators_is_cut_proportionally():
+    text = "x" * 1000
+    pieces = split_oversized(text, budget=64, count=chars)
+
+    assert len(pieces) > 1
+    assert all(chars(p) <= 64 for p in pieces)
+    assert "".join(pieces) == text
+
+def test_single_character_over_budget_is_returned_as_is():
+    assert split_oversized("§", budget=1, count=lambda t: 3 * len(t)) == ["§"]
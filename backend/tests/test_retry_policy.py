@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.retry_policy import LLMUnavailableError, RetryPolicy
+
+def _policy() -> RetryPolicy:
+    return RetryPolicy(max_attempts=1, base_delay=0, max_delay=0, deadline=10, failure_threshold=1, cooldown=0)
+
+async def _refused():
+    raise httpx.ConnectError("connection refused")
+
+async def _ok():
+    return httpx.Response(200)
+
+def test_cancelled_half_open_probe_releases_the_slot():
+    async def scenario():
+        policy = _policy()
+        with pytest.raises(LLMUnavailableError):
+            await policy.run("gpt", _refused)
+        assert policy.breaker("gpt").state == "open"
+
+        started = asyncio.Event()
+        async def hanging():
+            started.set()
+            await asyncio.sleep(60)
+
+        probe = asyncio.ensure_future(policy.run("gpt", hanging))
+        await started.wait()
+        assert policy.breaker("gpt").state == "half_open"
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        # The cancelled probe gave no verdict; the next call must be let through as the new probe
+        response = await policy.run("gpt", _ok)
+        assert response.status_code == 200
+        assert policy.breaker("gpt").state == "closed"
+
+    asyncio.run(scenario())
+
+def test_unexpected_error_in_probe_releases_the_slot():
+    async def scenario():
+        policy = _policy()
+        with pytest.raises(LLMUnavailableError):
+            await policy.run("gpt", _refused)
+
+        async def broken():
+            raise ValueError("bad payload")
+
+        with pytest.raises(ValueError):
+            await policy.run("gpt", broken)
+        assert (await policy.run("gpt", _ok)).status_code == 200
+
+    asyncio.run(scenario())
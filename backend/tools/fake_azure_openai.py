@@ -0,0 +1,322 @@
+"""
+Deterministic stand-in for the Azure OpenAI routes this backend calls, for offline pipeline runs.
+
+Routes:
+    POST /openai/deployments/{deployment}/chat/completions   (extraction OCR + Pass 3, generation, drafting)
+    POST /openai/deployments/{deployment}/embeddings         (vector_store.py via AzureOpenAIEmbeddings)
+    POST /openai/files                                       (extraction fallback upload)
+    POST /openai/v1/responses                                (extraction fallback capture)
+
+Modes:
+    canned  - synthesize schema-correct answers from the prompt (default)
+    record  - forward to --upstream, answer with the real response and append it to --cassette
+    replay  - answer from --cassette; misses fall back to canned answers unless --strict
+
+Latency (--latency fixed:S | uniform:LO,HI | lognormal:MU,SIGMA, plus --latency-per-token), injected 429s
+(--rate-429 with --retry-after-ms) and optional RPM/TPM enforcement are drawn from an RNG seeded by
+--seed, the request body and how many times that body has been seen, so runs are reproducible.
+
+Usage (from backend/):
+    python -m tools.fake_azure_openai --port 8011 --latency lognormal:-0.5,0.4 --rate-429 0.02
+    # then point the app at it:
+    #   AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8011  AZURE_OPENAI_EMBEDDING_ENDPOINT=http://127.0.0.1:8011
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+# Headers worth keeping from a recorded upstream response
+_RECORDED_HEADERS = ("content-type", "retry-after", "retry-after-ms", "x-ratelimit-limit-requests",
+                     "x-ratelimit-limit-tokens", "x-ratelimit-remaining-requests", "x-ratelimit-remaining-tokens")
+
+def parse_latency(spec: str):
+    """'fixed:0.4', 'uniform:0.2,1.5' or 'lognormal:-0.5,0.4' -> sampler(rng) in seconds."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] if args else []
+    if kind == "fixed":
+        return lambda rng: values[0] if values else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"unknown latency spec: {spec}")
+
+def _approx_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256("\x00".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+# --- Canned answers ---------------------------------------------------------
+
+def _message_text(message: Dict[str, Any]) -> Tuple[str, bool]:
+    content = message.get("content")
+    if isinstance(content, str):
+        return content, False
+    texts, has_image = [], False
+    for part in content or []:
+        if isinstance(part, dict):
+            if part.get("type") in ("image_url", "input_image", "input_file"):
+                has_image = True
+            texts.append(part.get("text") or "")
+    return "\n".join(texts), has_image
+
+def _numbered_items(text: str, limit: int = 12) -> List[Tuple[str, str]]:
+    """Numbered lines ('3. The CP alleges...') or, failing that, the longest sentences."""
+    items = re.findall(r"^\s*(\d{1,3})[.)]\s+(.{10,})$", text, flags=re.MULTILINE)
+    if items:
+        return items[:limit]
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if len(s.strip()) > 30]
+    return [(str(i + 1), s) for i, s in enumerate(sentences[:limit])]
+
+def _ocr_page_text(seed: str) -> str:
+    rng = random.Random(seed)
+    start = rng.randint(1, 40)
+    lines = [f"CHARGE OF DISCRIMINATION - Page reference {seed[:8]}"]
+    for n in range(start, start + rng.randint(2, 5)):
+        lines.append(f"{n}. On or about {rng.randint(1, 12)}/{rng.randint(1, 28)}/2023, the Charging Party alleges that a supervisor "
+                     f"treated them differently from similarly situated colleagues in the matter recorded as item {seed[n % 32:n % 32 + 6]}.")
+    return "\n".join(lines)
+
+def canned_chat_content(payload: Dict[str, Any]) -> str:
+    messages = payload.get("messages") or []
+    system = next((_message_text(m)[0] for m in messages if m.get("role") == "system"), "")
+    user_text, has_image = "", False
+    for m in messages:
+        if m.get("role") == "user":
+            user_text, has_image = _message_text(m)
+    seed = _digest(json.dumps(messages, sort_keys=True))
+    wants_json = (payload.get("response_format") or {}).get("type") == "json_object"
+
+    if has_image:
+        return _ocr_page_text(seed)
+    if not wants_json:
+        return ("POSITION STATEMENT\n\nThe Respondent denies each allegation set forth in the Charge.\n\n"
+                f"The Respondent acted for legitimate, non-discriminatory business reasons (ref {seed[:8]}).")
+    if "[SENIOR LEGAL DATA ENGINEER]" in system:
+        items = _numbered_items(user_text)
+        return json.dumps({
+            "document_metadata": {"charging_party": "Jane Doe", "respondent": "Boston Children's Hospital", "date_filed": "01/15/2024",
+                                  "all_detected_categories": ["Discrimination", "Retaliation"], "legal_case_summary": "Synthetic charge for offline runs."},
+            "allegations_list": [{"point_number": n, "allegation_text": t, "lawyer_comment": f"The Respondent denies allegation {n}."} for n, t in items],
+            "defense_and_proofs": [{"point_ref": n, "suggested_proofs": ["Personnel file", f"Email record {seed[:6]}"]} for n, _ in items]
+        })
+    if "[SENIOR LEGAL ANALYST]" in system or "[SURGICAL" in system:
+        points = [{"label": n, "allegation": t, "suggested_proof": "Personnel file", "response": "Denied."} for n, t in _numbered_items(user_text)]
+        if "[SURGICAL" in system:
+            return json.dumps({"point": points[0] if points else {}})
+        return json.dumps({"points": points})
+    if '"responses"' in system:
+        labels = re.findall(r"ALLEGATION NO\. ([^:]+):", user_text)
+        return json.dumps({"responses": [{"label": l.strip(), "response_label": f"Response No. {l.strip()}",
+                                          "drafted_response": f"The Respondent denies Allegation No. {l.strip()}."} for l in labels]})
+    if "drafted_response" in system:
+        label = (re.findall(r"ALLEGATION NO\. ([^:]+):", user_text) or ["1"])[0].strip()
+        return json.dumps({"response_label": f"Response No. {label}", "drafted_response": f"The Respondent denies Allegation No. {label}."})
+    # Drafting section modules: answer with every key the prompt's RETURN JSON template names
+    keys = re.findall(r'"(\w+)"\s*:\s*"\.\.\."', system) or ["content"]
+    return json.dumps({k: f"Synthetic {k.replace('_', ' ')} drafted for offline runs (ref {seed[:8]})." for k in keys})
+
+def canned_embedding(item: Any, dimensions: int) -> List[float]:
+    rng = random.Random(_digest(json.dumps(item)))
+    vec = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+# --- Server -------------------------------------------------------------------
+
+class FakeAzure:
+    def __init__(self, args):
+        self.args = args
+        self.latency = parse_latency(args.latency)
+        self.mode = args.mode
+        self.cassette_path = Path(args.cassette) if args.cassette else None
+        self.cassette: Dict[str, Dict[str, Any]] = {}
+        self._seen: Dict[str, int] = defaultdict(int)
+        self._window: deque = deque() # (timestamp, tokens) over the last 60s for RPM/TPM enforcement
+        self._write_lock = threading.Lock()
+        self.upstream: Optional[httpx.AsyncClient] = None
+        if self.mode in ("replay", "record") and self.cassette_path is None:
+            raise SystemExit("--cassette is required for record/replay")
+        if self.mode == "replay" and self.cassette_path.exists():
+            for line in self.cassette_path.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self.cassette[entry["key"]] = entry
+        if self.mode == "record":
+            if not args.upstream:
+                raise SystemExit("--upstream is required for record mode")
+            self.upstream = httpx.AsyncClient(base_url=args.upstream.rstrip("/"), timeout=1200.0)
+
+    def request_key(self, path: str, body: bytes) -> str:
+        try:
+            canonical = json.dumps(json.loads(body), sort_keys=True)
+        except ValueError:
+            canonical = hashlib.sha256(body).hexdigest()
+        return _digest(path, canonical)
+
+    def _rng(self, key: str) -> random.Random:
+        self._seen[key] += 1
+        return random.Random(_digest(self.args.seed, key, self._seen[key]))
+
+    def _quota_headers(self, tokens: int) -> Tuple[Optional[float], Dict[str, str]]:
+        """Sliding 60s RPM/TPM window; returns (retry_after_seconds or None, x-ratelimit headers)."""
+        now = time.monotonic()
+        while self._window and now - self._window[0][0] > 60:
+            self._window.popleft()
+        used_requests = len(self._window)
+        used_tokens = sum(t for _, t in self._window)
+        headers = {}
+        if self.args.rpm:
+            headers["x-ratelimit-limit-requests"] = str(self.args.rpm)
+            headers["x-ratelimit-remaining-requests"] = str(max(self.args.rpm - used_requests - 1, 0))
+        if self.args.tpm:
+            headers["x-ratelimit-limit-tokens"] = str(self.args.tpm)
+            headers["x-ratelimit-remaining-tokens"] = str(max(self.args.tpm - used_tokens - tokens, 0))
+        over = (self.args.rpm and used_requests + 1 > self.args.rpm) or (self.args.tpm and used_tokens + tokens > self.args.tpm)
+        if over:
+            return max(60 - (now - self._window[0][0]), 0.1) if self._window else 1.0, headers
+        self._window.append((now, tokens))
+        return None, headers
+
+    def record(self, entry: Dict[str, Any]):
+        with self._write_lock:
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    async def forward(self, request: Request, path: str, body: bytes, key: str) -> Response:
+        headers = {k: v for k, v in request.headers.items() if k.lower() in ("api-key", "authorization", "content-type")}
+        started = time.monotonic()
+        upstream = await self.upstream.post(f"{path}?{request.url.query}" if request.url.query else path, content=body, headers=headers)
+        kept = {k: v for k, v in upstream.headers.items() if k.lower() in _RECORDED_HEADERS}
+        self.record({"key": key, "path": path, "status": upstream.status_code, "headers": kept,
+                     "body": upstream.text, "latency": round(time.monotonic() - started, 3)})
+        return Response(content=upstream.content, status_code=upstream.status_code, headers=kept)
+
+    async def handle(self, request: Request, path: str, canned) -> Response:
+        body = await request.body()
+        key = self.request_key(path, body)
+        if self.mode == "record":
+            return await self.forward(request, path, body, key)
+
+        rng = self._rng(key)
+        if self.mode == "replay" and key in self.cassette:
+            entry = self.cassette[key]
+            await asyncio.sleep(entry.get("latency", 0.0) if self.args.replay_latency == "recorded" else self.latency(rng))
+            return Response(content=entry["body"].encode("utf-8"), status_code=entry["status"], headers=entry.get("headers") or {})
+        if self.mode == "replay" and self.args.strict:
+            return JSONResponse({"error": {"code": "CassetteMiss", "message": f"No recorded response for {path} ({key[:12]})"}}, status_code=404)
+
+        payload = json.loads(body) if body and request.headers.get("content-type", "").startswith("application/json") else {}
+        tokens = _approx_tokens(body.decode("utf-8", errors="ignore")) + int(payload.get("max_completion_tokens") or payload.get("max_tokens") or 0)
+        retry_after, headers = self._quota_headers(tokens)
+        if retry_after is None and rng.random() < self.args.rate_429:
+            retry_after = self.args.retry_after_ms / 1000.0
+        if retry_after is not None:
+            headers.update({"retry-after-ms": str(int(retry_after * 1000)), "retry-after": str(math.ceil(retry_after))})
+            return JSONResponse({"error": {"code": "429", "message": "Requests to this deployment have exceeded the rate limit."}}, status_code=429, headers=headers)
+
+        result = canned(payload, body)
+        completion_tokens = _approx_tokens(json.dumps(result))
+        await asyncio.sleep(self.latency(rng) + completion_tokens * self.args.latency_per_token)
+        return JSONResponse(result, headers=headers)
+
+def build_app(fake: FakeAzure) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        if fake.upstream is not None:
+            await fake.upstream.aclose()
+
+    app = FastAPI(title="Fake Azure OpenAI", lifespan=lifespan)
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat_completions(deployment: str, request: Request):
+        def canned(payload, _body):
+            content = canned_chat_content(payload)
+            prompt_tokens = _approx_tokens(json.dumps(payload.get("messages") or []))
+            completion_tokens = _approx_tokens(content)
+            return {
+                "id": f"chatcmpl-{_digest(content)[:24]}", "object": "chat.completion", "model": deployment,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+            }
+        return await fake.handle(request, f"/openai/deployments/{deployment}/chat/completions", canned)
+
+    @app.post("/openai/deployments/{deployment}/embeddings")
+    async def embeddings(deployment: str, request: Request):
+        def canned(payload, _body):
+            inputs = payload.get("input")
+            # AzureOpenAIEmbeddings sends token-id arrays; a single string or token list is one input
+            if isinstance(inputs, str) or (isinstance(inputs, list) and inputs and isinstance(inputs[0], int)):
+                inputs = [inputs]
+            dims = int(payload.get("dimensions") or fake.args.embedding_dims)
+            return {
+                "object": "list", "model": deployment,
+                "data": [{"object": "embedding", "index": i, "embedding": canned_embedding(item, dims)} for i, item in enumerate(inputs or [])],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0}
+            }
+        return await fake.handle(request, f"/openai/deployments/{deployment}/embeddings", canned)
+
+    @app.post("/openai/files")
+    async def files(request: Request):
+        def canned(_payload, body):
+            return {"id": f"file-{hashlib.sha256(body).hexdigest()[:24]}", "object": "file", "purpose": "assistants",
+                    "bytes": len(body), "status": "processed"}
+        return await fake.handle(request, "/openai/files", canned)
+
+    @app.post("/openai/v1/responses")
+    async def responses(request: Request):
+        def canned(payload, _body):
+            text = "\n".join(f"--- PAGE {i + 1} ---\n{_ocr_page_text(_digest(json.dumps(payload), i))}" for i in range(3))
+            return {"id": f"resp-{_digest(text)[:24]}", "object": "response", "status": "completed",
+                    "output": [{"type": "message", "role": "assistant", "content": [{"type": "output_text", "text": text}]}]}
+        return await fake.handle(request, "/openai/v1/responses", canned)
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic fake Azure OpenAI server for offline pipeline runs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--mode", choices=("canned", "record", "replay"), default="canned")
+    parser.add_argument("--cassette", default=None, help="JSONL file of recorded request/response pairs (record/replay)")
+    parser.add_argument("--upstream", default=None, help="Real Azure resource base URL to forward to in record mode")
+    parser.add_argument("--strict", action="store_true", help="Replay: answer cassette misses with 404 instead of canned responses")
+    parser.add_argument("--replay-latency", choices=("recorded", "model"), default="recorded", help="Replay with recorded upstream latency or the --latency model")
+    parser.add_argument("--latency", default="fixed:0", help="Base latency model: fixed:S | uniform:LO,HI | lognormal:MU,SIGMA")
+    parser.add_argument("--latency-per-token", type=float, default=0.0, help="Extra seconds per generated token (decode time)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probability of an injected 429 per request")
+    parser.add_argument("--retry-after-ms", type=int, default=1000, help="retry-after-ms sent with injected 429s")
+    parser.add_argument("--rpm", type=int, default=0, help="Enforce a requests-per-minute quota (0 = off)")
+    parser.add_argument("--tpm", type=int, default=0, help="Enforce a tokens-per-minute quota (0 = off)")
+    parser.add_argument("--embedding-dims", type=int, default=3072, help="Embedding size (text-embedding-3-large = 3072)")
+    parser.add_argument("--seed", default="0")
+    args = parser.parse_args()
+
+    try:
+        parse_latency(args.latency)
+    except (ValueError, IndexError) as e:
+        parser.error(str(e))
+    app = build_app(FakeAzure(args))
+    print(f"Fake Azure OpenAI ({args.mode}) on http://{args.host}:{args.port}", file=sys.stderr)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
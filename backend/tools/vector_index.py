@@ -0,0 +1,60 @@
+"""
+Create, validate or rebuild the ANN index on the legal_citations collection, and add the generated
+tsvector column and GIN index that lexical/hybrid search need. The app only checks the ANN index at
+startup; the tsvector column rewrites the embedding table, so it is only ever added from here.
+
+Build parameters come from settings (RAG_INDEX_TYPE, RAG_HNSW_M, RAG_HNSW_EF_CONSTRUCTION,
+RAG_IVFFLAT_LISTS, RAG_INDEX_MAINTENANCE_WORK_MEM) and can be overridden per run.
+
+Usage (from backend/):
+    python -m tools.vector_index --status
+    python -m tools.vector_index                              # create if missing/invalid/stale, then validate
+    python -m tools.vector_index --rebuild --type ivfflat --lists 200
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings
+from app.db import vector_store
+
+async def run(args) -> dict:
+    try:
+        if args.status:
+            return await vector_store.index_status(args.collection)
+        if args.collection == vector_store.COLLECTION_NAME:
+            status = await vector_store.init_vector_store(rebuild=args.rebuild)
+        else:
+            status = await vector_store.ensure_index(args.collection, rebuild=args.rebuild)
+        status["text_search"] = await vector_store.ensure_text_search(args.collection, rebuild=args.rebuild_text_search)
+        return status
+    finally:
+        await vector_store.engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the pgvector ANN index and full-text search for a PGVector collection.")
+    parser.add_argument("--collection", default=vector_store.COLLECTION_NAME)
+    parser.add_argument("--status", action="store_true", help="Only report the index state")
+    parser.add_argument("--rebuild", action="store_true", help="Drop and rebuild even if the index is valid")
+    parser.add_argument("--rebuild-text-search", action="store_true", help="Re-add the tsvector column (rewrites the table) and its GIN index")
+    parser.add_argument("--type", choices=["hnsw", "ivfflat"], default=None)
+    parser.add_argument("--m", type=int, default=None)
+    parser.add_argument("--ef-construction", type=int, default=None)
+    parser.add_argument("--lists", type=int, default=None)
+    parser.add_argument("--maintenance-work-mem", default=None, help='e.g. "2GB"')
+    args = parser.parse_args()
+
+    # Overrides apply to this process only; settings stay the source of truth for the app
+    for field, value in (("RAG_INDEX_TYPE", args.type), ("RAG_HNSW_M", args.m), ("RAG_HNSW_EF_CONSTRUCTION", args.ef_construction),
+                         ("RAG_IVFFLAT_LISTS", args.lists), ("RAG_INDEX_MAINTENANCE_WORK_MEM", args.maintenance_work_mem)):
+        if value is not None:
+            setattr(settings, field, value)
+
+    print(json.dumps(asyncio.run(run(args)), indent=2, default=str))
+
+if __name__ == "__main__":
+    main()